@@ -0,0 +1 @@
+"""Benchmarks for Patrick's SEO tools. Run a module with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,30 @@
+"""Memory of a parsed export before and after the compact_dtypes schema pass.
+
+    python -m benchmarks.bench_compact_dtypes --rows 100000 1000000
+"""
+import argparse
+import time
+
+from benchmarks.bench_csv_ingest import make_export
+from seo_tools import ingest
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'parsed MB':>10} {'compact MB':>11} {'ratio':>6} {'pass (s)':>9}")
+    for rows in args.rows:
+        frame = ingest.read_csv(make_export(rows))
+        start = time.perf_counter()
+        report = ingest.compact_dtypes(frame)
+        elapsed = time.perf_counter() - start
+        print(f"{rows:>9} {report.before / 1e6:>10.1f} {report.after / 1e6:>11.1f} "
+              f"{report.before / report.after:>5.1f}x {elapsed:>9.3f}")
+    for column, (old, new) in report.changed.items():
+        print(f"  {column}: {old} -> {new}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Peak memory and time of the streaming delimiter converter against the old pandas round trip.
+
+    python -m benchmarks.bench_csv_convert --sizes 8 32 128
+
+Sizes are in MB of semicolon-delimited input. Every measurement runs in a fresh
+subprocess so its peak RSS is not polluted by earlier runs. The streaming
+converter's peak should stay flat as the input grows.
+"""
+import argparse
+import io
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from seo_tools.convert import convert_stream
+
+HEADER = "URL;Unique Inlinks;Ahrefs Backlinks - Exact;Word Count;Sessions;Views;Impressions;Clicks;Average position;Laatste wijziging\r\n"
+
+
+def write_input(path: str, megabytes: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    target = megabytes * 1_000_000
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        f.write(HEADER)
+        written, i = 0, 0
+        while written < target:
+            line = (f"iphoned.nl/nieuws/artikel-{i};{rng.randint(0, 30)};{rng.randint(0, 5)}.0;{rng.randint(0, 2000)}.0;"
+                    f"{rng.randint(0, 500)}.0;{rng.randint(0, 600)}.0;{rng.randint(0, 9000)}.0;{rng.randint(0, 80)}.0;"
+                    f"{rng.uniform(1, 90):.2f};{rng.randint(1, 28)}-{rng.randint(1, 12)}-{rng.randint(2012, 2024)}\r\n")
+            f.write(line)
+            written += len(line)
+            i += 1
+
+
+def pandas_convert(path: str) -> None:
+    # The converter page before streaming: whole-file decode, python-engine sniffing, StringIO output
+    with open(path, 'rb') as file:
+        file.read().decode('utf-8')
+        file.seek(0)
+        df = pd.read_csv(file, encoding='utf-8', sep=None, engine='python')
+    output = io.StringIO()
+    df.to_csv(output, index=False, sep=',')
+    output.getvalue()
+
+
+def streaming_convert(path: str) -> None:
+    with open(path, 'rb') as source, tempfile.TemporaryFile() as target:
+        convert_stream(source, target)
+
+
+APPROACHES = {'pandas': pandas_convert, 'streaming': streaming_convert}
+
+
+def child(approach: str, path: str) -> None:
+    start = time.perf_counter()
+    APPROACHES[approach](path)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    print(f"{elapsed} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}")
+
+
+def measure(approach: str, path: str):
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_csv_convert', '--child', approach, path],
+                            check=True, capture_output=True, text=True).stdout
+    elapsed, peak = output.split()
+    return float(elapsed), float(peak)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 32, 128], help="Input sizes in MB")
+    parser.add_argument('--skip-pandas-above', type=int, default=None, help="Only run the streaming converter above this size (MB)")
+    parser.add_argument('--child', nargs=2, metavar=('APPROACH', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'input MB':>8} {'approach':>10} {'time (s)':>9} {'MB/s':>7} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in args.sizes:
+            path = os.path.join(directory, f"input-{megabytes}.csv")
+            write_input(path, megabytes)
+            for approach in APPROACHES:
+                if approach == 'pandas' and args.skip_pandas_above is not None and megabytes > args.skip_pandas_above:
+                    continue
+                elapsed, peak = measure(approach, path)
+                print(f"{megabytes:>8} {approach:>10} {elapsed:>9.2f} {megabytes / elapsed:>7.1f} {peak:>12.0f}")
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Peak memory and time of the streaming deduplication against concat + drop_duplicates.
+
+    python -m benchmarks.bench_csv_dedup --sizes 8 32 128
+
+Sizes are in MB of the first input; a second file half that size repeats its
+first half, and the two are deduplicated together. Every measurement runs in
+a fresh subprocess so its peak RSS is not polluted by earlier runs.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_csv_convert import write_input
+from seo_tools.dedup import dedup_csvs
+
+
+def pandas_dedup(paths, target: str) -> None:
+    # The Duplicate Remover before streaming: both files in memory, concatenated, all columns compared
+    frames = [pd.read_csv(path, sep=';') for path in paths]
+    pd.concat(frames, ignore_index=True).drop_duplicates().to_csv(target, index=False)
+
+
+def streaming_dedup(paths, target: str) -> None:
+    dedup_csvs(paths, target)
+
+
+def partitioned_dedup(paths, target: str) -> None:
+    dedup_csvs(paths, target, partitions=16)
+
+
+APPROACHES = {'pandas': pandas_dedup, 'streaming': streaming_dedup, 'partitioned': partitioned_dedup}
+
+
+def child(approach: str, target: str, paths) -> None:
+    start = time.perf_counter()
+    APPROACHES[approach](paths, target)
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux
+    print(f"{elapsed} {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}")
+
+
+def measure(approach: str, target: str, paths):
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_csv_dedup', '--child', approach, target, *paths],
+                            check=True, capture_output=True, text=True).stdout
+    elapsed, peak = output.split()
+    return float(elapsed), float(peak)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[8, 32, 128], help="Size of the first input in MB")
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child[0], args.child[1], args.child[2:])
+        return
+
+    print(f"{'input MB':>8} {'approach':>12} {'time (s)':>9} {'peak RSS MB':>12} {'rows out':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for megabytes in args.sizes:
+            # Same seed for half the size: the second file repeats the first half of the first
+            paths = [os.path.join(directory, 'a.csv'), os.path.join(directory, 'b.csv')]
+            write_input(paths[0], megabytes)
+            write_input(paths[1], megabytes // 2 or 1)
+            target = os.path.join(directory, 'out.csv')
+            for approach in APPROACHES:
+                elapsed, peak = measure(approach, target, paths)
+                with open(target, 'rb') as f:
+                    rows = sum(1 for _ in f) - 1
+                print(f"{megabytes + (megabytes // 2 or 1):>8} {approach:>12} {elapsed:>9.2f} {peak:>12.0f} {rows:>10}")
+
+
+if __name__ == '__main__':
+    main()
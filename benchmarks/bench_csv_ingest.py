@@ -0,0 +1,95 @@
+"""Compare the shared CSV ingestion with the per-page readers it replaced.
+
+    python -m benchmarks.bench_csv_ingest --rows 10000 100000 500000
+
+"pruning page" decodes the whole upload, sniffs 1 KB and parses with the Python
+engine; "merge page" additionally runs chardet over the entire file. The shared
+reader is timed cold with the C and pyarrow engines, and warm (memoized).
+"""
+import argparse
+import csv
+import io
+import random
+import time
+
+import chardet
+import pandas as pd
+
+from seo_tools import ingest
+
+HEADER = "URL;Unique Inlinks;Ahrefs Backlinks - Exact;Word Count;Sessions;Views;Impressions;Clicks;Average position;Laatste wijziging\r\n"
+
+
+def make_export(rows: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    lines = [HEADER]
+    for i in range(rows):
+        sessions = '' if rng.random() < 0.05 else f"{rng.randint(0, 500)}.0"
+        modified = '' if rng.random() < 0.05 else f"{rng.randint(1, 28)}-{rng.randint(1, 12)}-{rng.randint(2012, 2024)}"
+        lines.append(f"iphoned.nl/nieuws/artikel-{i};{rng.randint(0, 30)};{rng.randint(0, 5)}.0;{rng.randint(0, 2000)}.0;"
+                     f"{sessions};{rng.randint(0, 600)}.0;{rng.randint(0, 9000)}.0;{rng.randint(0, 80)}.0;"
+                     f"{rng.uniform(1, 90):.2f};{modified}\r\n")
+    return ''.join(lines).encode('utf-8-sig')
+
+
+def sniff_1k(text: str) -> str:
+    return csv.Sniffer().sniff(text[:1024]).delimiter
+
+
+def pruning_page_reader(data: bytes) -> pd.DataFrame:
+    text = data.decode('utf-8')
+    return pd.read_csv(io.StringIO(text), sep=sniff_1k(text), engine='python')
+
+
+def merge_page_reader(data: bytes) -> pd.DataFrame:
+    encoding = chardet.detect(data)['encoding']
+    delimiter = sniff_1k(data[:1024].decode(encoding, errors='ignore'))
+    return pd.read_csv(io.BytesIO(data), sep=delimiter, encoding=encoding, engine='python')
+
+
+def shared_cold(engine: str):
+    def read(data: bytes) -> pd.DataFrame:
+        ingest.clear_cache()
+        return ingest.read_csv(data, engine=engine)
+    return read
+
+
+def shared_warm(data: bytes) -> pd.DataFrame:
+    return ingest.read_csv(data)
+
+
+def prime(data: bytes) -> None:
+    ingest.clear_cache()
+    ingest.read_csv(data)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000, 500_000])
+    parser.add_argument('--skip-legacy-above', type=int, default=None, help="Only time the shared reader above this many rows")
+    args = parser.parse_args()
+
+    readers = [
+        ('pruning page (python engine)', pruning_page_reader, True),
+        ('merge page (chardet + python)', merge_page_reader, True),
+        ('shared, cold, C engine', shared_cold('c'), False),
+        ('shared, cold, pyarrow engine', shared_cold('pyarrow'), False),
+        ('shared, memoized', shared_warm, False),
+    ]
+    print(f"{'rows':>9} {'reader':<32} {'time (s)':>9}")
+    for rows in args.rows:
+        data = make_export(rows)
+        for name, read, legacy in readers:
+            if legacy and args.skip_legacy_above is not None and rows > args.skip_legacy_above:
+                continue
+            if read is shared_warm:
+                prime(data)
+            start = time.perf_counter()
+            frame = read(data)
+            elapsed = time.perf_counter() - start
+            assert len(frame) == rows, f"{name} read {len(frame)} rows"
+            print(f"{rows:>9} {name:<32} {elapsed:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compare the vectorized URL normalization and hash join with the old apply + outer merge.
+
+    python -m benchmarks.bench_csv_merge --rows 100000 1000000
+
+Builds two crawls of the same site whose URLs differ in scheme, ``www.``, case
+and trailing slashes, and checks that both implementations find the same
+matched and unmatched rows.
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.merge import merge_frames, normalize_urls
+
+
+def make_crawls(rows: int, overlap: float = 0.8, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    paths = np.array([f"iphoned.nl/nieuws/artikel-{i}" for i in range(int(rows * (2 - overlap)))], dtype=object)
+    left_paths = paths[:rows]
+    right_paths = paths[-rows:]
+
+    def variants(values):
+        scheme = rng.choice(np.array(['', 'http://', 'https://'], dtype=object), len(values))
+        www = rng.choice(np.array(['', 'www.'], dtype=object), len(values))
+        slash = rng.choice(np.array(['', '/'], dtype=object), len(values))
+        urls = scheme + www + values + slash
+        upper = rng.random(len(values)) < 0.1
+        urls[upper] = [url.upper() for url in urls[upper]]
+        return urls
+
+    left = pd.DataFrame({'url': variants(left_paths), 'sessions': rng.poisson(40, rows), 'views': rng.poisson(50, rows)})
+    right = pd.DataFrame({'address url': variants(right_paths)[rng.permutation(rows)], 'clicks': rng.poisson(10, rows),
+                          'impressions': rng.poisson(800, rows)})
+    return left, right
+
+
+def old_standardize_url(url):
+    url = url.lower().strip()
+    url = re.sub(r'^https?://', '', url)
+    url = re.sub(r'^www\.', '', url)
+    url = url.rstrip('/')
+    return url
+
+
+def old_merge(df1, df2, url_col1, url_col2):
+    # merge_csvs before the hash join, without the Streamlit output
+    df1[url_col1] = df1[url_col1].apply(old_standardize_url)
+    df2[url_col2] = df2[url_col2].apply(old_standardize_url)
+    merged_df = pd.merge(df1, df2, left_on=url_col1, right_on=url_col2, how='outer', indicator=True)
+    left_only = len(merged_df[merged_df['_merge'] == 'left_only'])
+    right_only = len(merged_df[merged_df['_merge'] == 'right_only'])
+    merged_df = merged_df[merged_df['_merge'] == 'both'].drop(columns=['_merge'])
+    return merged_df, left_only, right_only
+
+
+def new_merge(df1, df2, url_col1, url_col2):
+    df1[url_col1] = normalize_urls(df1[url_col1])
+    df2[url_col2] = normalize_urls(df2[url_col2])
+    result = merge_frames([df1, df2], [url_col1, url_col2], ['1', '2'])
+    return result.merged, len(result.unmatched['1']), len(result.unmatched['2'])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000], help="Rows per input file")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'old (s)':>8} {'new (s)':>8} {'speedup':>8} {'matched':>9}")
+    for rows in args.rows:
+        left, right = make_crawls(rows)
+        timings, results = [], []
+        for merge in (old_merge, new_merge):
+            start = time.perf_counter()
+            results.append(merge(left.copy(), right.copy(), 'url', 'address url'))
+            timings.append(time.perf_counter() - start)
+        (old, old_left, old_right), (new, new_left, new_right) = results
+        assert (len(old), old_left, old_right) == (len(new), new_left, new_right), "row counts differ"
+        old_pairs = sorted(zip(old['url'], old['sessions'], old['clicks']))
+        new_pairs = sorted(zip(new['url'], new['sessions'], new['clicks']))
+        assert old_pairs == new_pairs, "matched rows differ"
+        print(f"{rows:>9} {timings[0]:>8.2f} {timings[1]:>8.2f} {timings[0] / timings[1]:>7.1f}x {len(new):>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Compare parse_dates with the two date parsers the pruning pages used.
+
+    python -m benchmarks.bench_date_parsing --rows 100000 1000000
+
+"dateutil" is the per-row ``parser.parse`` of the old content pruning page,
+"to_datetime" the ``pd.to_datetime(errors='coerce')`` call in working.py. The
+column mimics an export: day-first dates like ``3-7-2018`` repeated across
+rows, 5% empty and a few unparseable values. "misread" counts rows where a
+parser's date differs from the day-first reading.
+"""
+import argparse
+import random
+import time
+import warnings
+
+import pandas as pd
+from dateutil import parser as dateutil_parser
+
+from seo_tools.dates import parse_dates
+
+
+def make_column(rows: int, seed: int = 0) -> pd.Series:
+    rng = random.Random(seed)
+    values = []
+    for _ in range(rows):
+        roll = rng.random()
+        if roll < 0.05:
+            values.append('')
+        elif roll < 0.051:
+            values.append('onbekend')
+        else:
+            values.append(f"{rng.randint(1, 28)}-{rng.randint(1, 12)}-{rng.randint(2012, 2024)}")
+    return pd.Series(values, name='Laatste wijziging')
+
+
+def dateutil_path(column: pd.Series) -> pd.Series:
+    def parse_date(date_string):
+        try:
+            return dateutil_parser.parse(date_string)
+        except (ValueError, TypeError):
+            return None
+    return pd.to_datetime(column.astype(str).apply(parse_date))
+
+
+def to_datetime_path(column: pd.Series) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        return pd.to_datetime(column, errors='coerce')
+
+
+def parse_dates_path(column: pd.Series) -> pd.Series:
+    return parse_dates(column).dates
+
+
+PARSERS = {'dateutil': dateutil_path, 'to_datetime': to_datetime_path, 'parse_dates': parse_dates_path}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--skip-dateutil-above', type=int, default=None, help="Skip dateutil above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'parser':<12} {'time (s)':>9} {'unparsed':>9} {'misread':>8}")
+    for rows in args.rows:
+        column = make_column(rows)
+        # Reference: explicit day-first format
+        expected = pd.to_datetime(column, format='%d-%m-%Y', errors='coerce')
+        for name, parse in PARSERS.items():
+            if name == 'dateutil' and args.skip_dateutil_above is not None and rows > args.skip_dateutil_above:
+                continue
+            start = time.perf_counter()
+            dates = parse(column)
+            elapsed = time.perf_counter() - start
+            unparsed = int((dates.isna() & (column != '')).sum())
+            misread = int((dates.notna() & expected.notna() & (dates != expected)).sum())
+            print(f"{rows:>9} {name:<12} {elapsed:>9.3f} {unparsed:>9} {misread:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""Compare single-pass page extraction with the old BeautifulSoup find/find_all approach.
+
+    python -m benchmarks.bench_html_extraction [--corpus DIR] [--repeat 200]
+
+Needs beautifulsoup4 for the baseline. Results of the html.parser backend are
+checked against the baseline for every page in the corpus.
+"""
+import argparse
+import os
+import re
+import time
+from typing import Dict, List
+
+from bs4 import BeautifulSoup
+
+from seo_tools.extract import available_backends, extract_page
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'html')
+
+
+def soup_extract(html: str) -> Dict[str, object]:
+    # The extraction main.py did before seo_tools.extract: one tree, then a scan per field
+    soup = BeautifulSoup(html, 'html.parser')
+    fields = {'title': None, 'meta_description': None, 'canonical_url': None}
+    if soup.title is not None:
+        fields['title'] = soup.title.text.strip()
+    meta_description_tag = soup.find('meta', attrs={'name': 'description'})
+    if meta_description_tag:
+        fields['meta_description'] = meta_description_tag.get('content')
+    fields['headings'] = [tag.text.strip() for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
+    fields['images'] = [img['src'] for img in soup.find_all('img', src=True)]
+    fields['internal_links'] = [a['href'] for a in soup.find_all('a', href=True) if a['href'].startswith('/')]
+    fields['external_links'] = [a['href'] for a in soup.find_all('a', href=True) if not a['href'].startswith('/') and not a['href'].startswith('#')]
+    fields['social_media_links'] = [a['href'] for a in soup.find_all('a', href=True) if re.search(r'facebook|twitter|instagram|linkedin|youtube', a['href'])]
+    canonical_url_tag = soup.find('link', rel='canonical')
+    if canonical_url_tag:
+        fields['canonical_url'] = canonical_url_tag.get('href')
+    return fields
+
+
+def single_pass_extract(html: str, backend: str) -> Dict[str, object]:
+    return vars(extract_page(html, backend))
+
+
+def load_corpus(directory: str) -> List[str]:
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(directory, name), encoding='utf-8', errors='replace') as f:
+                pages.append(f.read())
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', default=FIXTURES, help="Directory of saved .html pages")
+    parser.add_argument('--repeat', type=int, default=200, help="Passes over the corpus per approach")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        raise SystemExit(f"No .html files in {args.corpus}")
+    megabytes = sum(len(page.encode('utf-8')) for page in pages) * args.repeat / 1e6
+
+    for index, page in enumerate(pages):
+        expected, actual = soup_extract(page), single_pass_extract(page, 'html.parser')
+        for key, value in expected.items():
+            if actual[key] != value:
+                print(f"page {index}: {key} differs: {value!r} != {actual[key]!r}")
+
+    approaches = [('BeautifulSoup + find_all', soup_extract)]
+    approaches += [(f"single pass ({backend})", lambda html, backend=backend: single_pass_extract(html, backend))
+                   for backend in available_backends()]
+
+    print(f"{len(pages)} pages x {args.repeat} passes ({megabytes:.1f} MB of HTML)")
+    baseline = None
+    for name, extract in approaches:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for page in pages:
+                extract(page)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{name:<28} {elapsed:8.3f}s {megabytes / elapsed:8.1f} MB/s {baseline / elapsed:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
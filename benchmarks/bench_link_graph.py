@@ -0,0 +1,92 @@
+"""Link graph metrics on a synthetic site, and parsing internal links from an audit CSV.
+
+    python -m benchmarks.bench_link_graph [--pages 1000000] [--links 20] [--audit-pages 100000]
+
+Every page links to the home page, a few of the ``--categories`` category
+pages and, for the rest of its ``--links`` links, to other articles chosen
+with a preference for popular ones. These edges go straight into
+``LinkGraph.from_edges``, which times the CSR build, PageRank and click
+depth at full size. The CSV part writes an audit of ``--audit-pages`` pages
+in main.py's format and reads it back through ``audit_link_graph``. The peak
+RSS of the whole run is printed last.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.suite import peak_rss_mb
+from seo_tools.linkgraph import LinkGraph, audit_link_graph, click_depth, pagerank, unique_inlinks
+
+
+def site_edges(pages: int, links: int, categories: int, seed: int = 0):
+    """Source and target page numbers; page 0 is the home page, pages 1..categories are categories."""
+    rng = np.random.default_rng(seed)
+    sources = np.repeat(np.arange(pages, dtype=np.int32), links)
+    targets = np.empty(pages * links, dtype=np.int32)
+    slots = targets.reshape(pages, links)
+    slots[:, 0] = 0
+    slots[:, 1:4] = rng.integers(1, categories + 1, (pages, 3))
+    # Popular articles get more links: a Zipf draw over a shuffled order of the articles
+    popular = rng.permutation(np.arange(categories + 1, pages, dtype=np.int32))
+    slots[:, 4:] = popular[(rng.zipf(1.2, (pages, links - 4)) - 1) % len(popular)]
+    # The categories list their articles, so every article can be reached from the home page
+    articles = np.arange(categories + 1, pages, dtype=np.int32)
+    sources = np.concatenate([sources, np.zeros(categories, dtype=np.int32), (articles % categories + 1).astype(np.int32)])
+    targets = np.concatenate([targets, np.arange(1, categories + 1, dtype=np.int32), articles])
+    return sources, targets
+
+
+def write_audit(path: str, pages: int, links: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['URL', 'Domain', 'Internal Links'])
+        for page in range(pages):
+            linked = ['/'] + [f"/artikel-{i}" for i in (rng.zipf(1.2, links - 1) - 1) % pages]
+            writer.writerow([f"https://www.example.com/artikel-{page}", 'www.example.com', linked])
+
+
+def timed(label: str, count: int, unit: str, function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<18} {elapsed:8.2f}s {count / elapsed:12.0f} {unit}/s")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=1_000_000)
+    parser.add_argument('--links', type=int, default=20, help="Internal links per page")
+    parser.add_argument('--categories', type=int, default=200)
+    parser.add_argument('--audit-pages', type=int, default=100_000, help="Pages in the audit CSV (0 to skip)")
+    args = parser.parse_args()
+
+    sources, targets = site_edges(args.pages, args.links, args.categories)
+    urls = np.array([f"example.com/artikel-{i}" for i in range(args.pages)], dtype=object)
+    print(f"{args.pages} pages, {len(sources)} links")
+    graph = timed('build csr', len(sources), 'links', LinkGraph.from_edges, urls, sources, targets)
+    del sources, targets
+    print(f"{graph.edges} unique links, {(graph.indptr.nbytes + graph.indices.nbytes) / 1e6:.0f} MB of CSR arrays")
+    inlinks = timed('unique inlinks', graph.edges, 'links', unique_inlinks, graph)
+    rank = timed('pagerank', graph.edges, 'links', pagerank, graph)
+    depth = timed('click depth', graph.edges, 'links', click_depth, graph)
+    print(f"inlinks: max {inlinks.max()}, median {np.median(inlinks):.0f}; pagerank: home {rank[0]:.0f}, "
+          f"median {np.median(rank):.2f}; depth: max {depth.max()}, {int((depth < 0).sum())} unreachable")
+
+    if args.audit_pages:
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, 'audit.csv')
+            write_audit(path, args.audit_pages, args.links)
+            print(f"audit of {args.audit_pages} pages, {os.path.getsize(path) / 1e6:.0f} MB")
+            audit_graph = timed('read audit', args.audit_pages, 'pages', audit_link_graph, [path])
+            print(f"{audit_graph.nodes} URLs, {audit_graph.edges} unique links")
+    print(f"peak RSS {peak_rss_mb():.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
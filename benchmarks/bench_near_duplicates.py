@@ -0,0 +1,83 @@
+"""MinHash signatures and LSH clustering on synthetic article texts.
+
+    python -m benchmarks.bench_near_duplicates [--documents 100000] [--words 300]
+
+Documents are drawn from a Zipf-distributed vocabulary. A share of them
+(``--copies``) are rewrites of an earlier document with ``--edits`` of the
+words replaced, like news posts covering the same story. The benchmark reports
+signature and clustering time. Recall is the share of rewrites whose true
+shingle Jaccard similarity reaches the threshold and that land in the
+original's cluster. Clustered pairs below ``threshold - 0.1`` count as false
+positives.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.neardup import CLUSTER_COLUMN, DEFAULT_SIMILARITY, minhash, near_duplicate_clusters, shingle_hashes
+
+
+def make_documents(documents: int, words: int, copies: float, edits: float, seed: int = 0):
+    """The texts, and for each rewrite the index of the document it copies (-1 for originals)."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"woord{i}" for i in range(20_000)])
+    texts, sources = [], np.full(documents, -1)
+    for index in range(documents):
+        if index and rng.random() < copies:
+            source = int(rng.integers(0, index))
+            tokens = texts[source].split()
+            for position in np.flatnonzero(rng.random(len(tokens)) < edits):
+                tokens[position] = vocabulary[rng.zipf(1.3) % len(vocabulary)]
+            sources[index] = source
+        else:
+            tokens = vocabulary[rng.zipf(1.3, words) % len(vocabulary)]
+        texts.append(' '.join(tokens))
+    return texts, sources
+
+
+def jaccard(a: str, b: str) -> float:
+    left, right = set(shingle_hashes(a).tolist()), set(shingle_hashes(b).tolist())
+    return len(left & right) / len(left | right)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--documents', type=int, default=100_000)
+    parser.add_argument('--words', type=int, default=300, help="Words per document")
+    parser.add_argument('--copies', type=float, default=0.1, help="Share of documents that rewrite an earlier one")
+    parser.add_argument('--edits', type=float, default=0.01, help="Share of words a rewrite replaces")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_SIMILARITY)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    texts, sources = make_documents(args.documents, args.words, args.copies, args.edits)
+    print(f"{args.documents} documents of {args.words} words, {int((sources >= 0).sum())} rewrites "
+          f"({time.perf_counter() - start:.1f}s to generate)")
+
+    start = time.perf_counter()
+    signatures = np.stack([minhash(text) for text in texts])
+    elapsed = time.perf_counter() - start
+    print(f"{'signatures':<12} {elapsed:8.2f}s {args.documents / elapsed:10.0f} documents/s")
+
+    start = time.perf_counter()
+    clusters = near_duplicate_clusters(signatures, args.threshold)
+    elapsed = time.perf_counter() - start
+    print(f"{'clustering':<12} {elapsed:8.2f}s {args.documents / elapsed:10.0f} documents/s, "
+          f"{clusters[CLUSTER_COLUMN].nunique()} clusters of {int(clusters[CLUSTER_COLUMN].notna().sum())} documents")
+
+    cluster = clusters[CLUSTER_COLUMN].to_numpy(dtype='float64', na_value=np.nan)
+    rewrites = np.flatnonzero(sources >= 0)
+    similar = np.array([jaccard(texts[i], texts[sources[i]]) >= args.threshold for i in rewrites], dtype=bool)
+    found = cluster[rewrites] == cluster[sources[rewrites]]
+    print(f"recall {found[similar].mean():.3f} over {int(similar.sum())} rewrites at or above {args.threshold}")
+
+    members = pd.Series(np.arange(args.documents))[~np.isnan(cluster)].groupby(cluster[~np.isnan(cluster)])
+    sample = [group.to_numpy()[:2] for _, group in members if len(group) > 1][:2000]
+    false = sum(jaccard(texts[a], texts[b]) < args.threshold - 0.1 for a, b in sample)
+    print(f"{false} of {len(sample)} sampled clustered pairs below {args.threshold - 0.1:.1f} similarity")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Parsing throughput of the audit's process pool against parsing inline, per worker count.
+
+    python -m benchmarks.bench_parse_pool [--corpus DIR] [--pages 4000] [--workers 1 2 4 8]
+
+The saved pages in the corpus are cycled until ``--pages`` pages are parsed.
+Every pool's fields are checked against the inline parse. Throughput can only
+scale up to the number of cores on the machine (reported in the header).
+"""
+import argparse
+import itertools
+import os
+import time
+
+from benchmarks.bench_html_extraction import FIXTURES, load_corpus
+from seo_tools.parse_pool import ParsePool, parse_page
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--corpus', default=FIXTURES, help="Directory of saved .html pages")
+    parser.add_argument('--pages', type=int, default=4000, help="Pages parsed per measurement")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--backend', default='html.parser')
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        raise SystemExit(f"No .html files in {args.corpus}")
+    pages = [(f"https://example.com/page-{i}", html) for i, html in zip(range(args.pages), itertools.cycle(corpus))]
+    megabytes = sum(len(html.encode('utf-8')) for _, html in pages) / 1e6
+    print(f"{len(pages)} pages ({megabytes:.1f} MB of HTML), {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    expected = [parse_page(url, html, args.backend) for url, html in pages]
+    baseline = time.perf_counter() - start
+    print(f"{'inline':<12} {baseline:8.3f}s {len(pages) / baseline:9.0f} pages/s {1.0:6.1f}x")
+
+    for workers in args.workers:
+        with ParsePool(workers, args.backend) as pool:
+            # Start the worker processes before timing
+            list(pool.map(pages[:workers]))
+            start = time.perf_counter()
+            fields = [fields for _, fields in pool.map(pages)]
+            elapsed = time.perf_counter() - start
+        if fields != expected:
+            print(f"{workers} workers: fields differ from the inline parse")
+        print(f"{f'{workers} workers':<12} {elapsed:8.3f}s {len(pages) / elapsed:9.0f} pages/s {baseline / elapsed:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
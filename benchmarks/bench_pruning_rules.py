@@ -0,0 +1,102 @@
+"""Compare the vectorized pruning rules with the old row-wise ``should_delete`` apply.
+
+    python -m benchmarks.bench_pruning_rules --sizes 10000 100000 1000000
+"""
+import argparse
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.pruning import compile_rules, delete_mask
+
+THRESHOLDS = {
+    'Sessions': 1000,
+    'Views': 1000,
+    'Clicks': 50,
+    'Impressions': 500,
+    'Average position': 19.0,
+    'Word Count': 500,
+    'Unique Inlinks': 0,
+    'Ahrefs Keywords Top 3 - Exact': 1,
+    'Ahrefs Keywords Top 10 - Exact': 2,
+}
+OLDER_THAN = datetime.date(2023, 1, 1)
+
+
+def make_frame(rows: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'URL': [f"example.nl/nieuws/artikel-{i}" for i in range(rows)],
+        'Unique Inlinks': rng.integers(0, 20, rows),
+        'Ahrefs Backlinks - Exact': rng.poisson(0.5, rows).astype(float),
+        'Ahrefs Keywords Top 3 - Exact': rng.poisson(0.3, rows).astype(float),
+        'Ahrefs Keywords Top 10 - Exact': rng.poisson(1.0, rows).astype(float),
+        'Word Count': rng.integers(0, 2000, rows).astype(float),
+        'Sessions': rng.poisson(40, rows).astype(float),
+        'Views': rng.poisson(50, rows).astype(float),
+        'Impressions': rng.poisson(800, rows).astype(float),
+        'Clicks': rng.poisson(10, rows).astype(float),
+        'Average position': rng.uniform(1, 90, rows).round(2),
+    })
+    for column in ('Sessions', 'Clicks', 'Average position'):
+        data.loc[rng.random(rows) < 0.05, column] = np.nan
+    days = rng.integers(0, 10 * 365, rows)
+    dates = pd.Timestamp('2014-01-01') + pd.to_timedelta(days, unit='D')
+    data['Laatste wijziging'] = pd.Series(dates).dt.date
+    data.loc[rng.random(rows) < 0.05, 'Laatste wijziging'] = None
+    data['Unique Inlinks'] = data['Unique Inlinks'].astype('Int64')
+    return data
+
+
+def apply_path(data: pd.DataFrame) -> np.ndarray:
+    # The row-wise implementation process_data used before the rule engine
+    def should_delete(row):
+        conditions = []
+        for key, value in THRESHOLDS.items():
+            if key in row:
+                if key == 'Average position':
+                    conditions.append(row[key] > value)
+                else:
+                    conditions.append(row[key] < value)
+        if OLDER_THAN and pd.notnull(row['Laatste wijziging']):
+            conditions.append(row['Laatste wijziging'] < OLDER_THAN)
+        return all(conditions)
+
+    return data.apply(should_delete, axis=1).to_numpy(dtype=bool)
+
+
+def vectorized_path(data: pd.DataFrame) -> np.ndarray:
+    rules = compile_rules(THRESHOLDS, data.columns)
+    return delete_mask(data, rules, OLDER_THAN)
+
+
+def timed(func, data):
+    start = time.perf_counter()
+    result = func(data)
+    return result, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--skip-apply-above', type=int, default=None,
+                        help="Only time the vectorized path for sizes above this many rows")
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'apply (s)':>10} {'vectorized (s)':>15} {'speedup':>8}")
+    for rows in args.sizes:
+        data = make_frame(rows)
+        new, new_time = timed(vectorized_path, data)
+        if args.skip_apply_above is not None and rows > args.skip_apply_above:
+            print(f"{rows:>10} {'-':>10} {new_time:>15.4f} {'-':>8}")
+            continue
+        old, old_time = timed(apply_path, data)
+        if not np.array_equal(old, new):
+            raise SystemExit(f"Results differ at {rows} rows: {int((old != new).sum())} mismatches")
+        print(f"{rows:>10} {old_time:>10.3f} {new_time:>15.4f} {old_time / new_time:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Streaming sitemap discovery against a local stub server serving fixture sitemaps.
+
+    python -m benchmarks.bench_sitemaps [--children 40] [--urls 10000] [--latency 0.05]
+
+The stub serves a sitemap index of gzipped child sitemaps (``--urls`` page
+URLs each; every child repeats 1% of the previous child's URLs) and waits
+``--latency`` seconds before each response, like a remote host. Sequential
+discovery (``iter_sitemap_urls``) and concurrent discovery (``discover_urls``)
+must both find every URL once. Peak memory is traced for the parsing only;
+the set of seen URLs grows with the site by design.
+"""
+import argparse
+import asyncio
+import gzip
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from seo_tools.sitemaps import SitemapParser, discover_urls, iter_sitemap_urls
+
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
+def child_sitemap(index: int, urls: int) -> bytes:
+    first = index * urls - index * urls // 100
+    entries = ''.join(f"<url><loc>https://example.com/artikel-{i}</loc><lastmod>2026-01-01</lastmod></url>"
+                      for i in range(first, first + urls))
+    return gzip.compress(f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{NAMESPACE}">{entries}</urlset>'.encode())
+
+
+def fixture_sitemaps(base_url: str, children: int, urls: int) -> Dict[str, bytes]:
+    files = {f"/sitemap-{index}.xml.gz": child_sitemap(index, urls) for index in range(children)}
+    entries = ''.join(f"<sitemap><loc>{base_url}{path}</loc></sitemap>" for path in files)
+    files['/sitemap.xml'] = f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="{NAMESPACE}">{entries}</sitemapindex>'.encode()
+    return files
+
+
+def start_server(files: Dict[str, bytes], latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self) -> None:
+            time.sleep(latency)
+            body = files.get(self.path)
+            self.send_response(200 if body is not None else 404)
+            body = body or b''
+            self.send_header('Content-Type', 'application/gzip' if self.path.endswith('.gz') else 'application/xml')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def collect(sitemap: str, concurrency: int) -> int:
+    return len([url async for url in discover_urls([sitemap], concurrency)])
+
+
+def parse_peak_mb(body: bytes) -> float:
+    tracemalloc.start()
+    parser = SitemapParser()
+    for offset in range(0, len(body), 64 * 1024):
+        parser.feed(body[offset:offset + 64 * 1024])
+    parser.close()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--children', type=int, default=40, help="Child sitemaps in the index")
+    parser.add_argument('--urls', type=int, default=10_000, help="Page URLs per child sitemap")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds the stub waits before each response")
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    # The index holds absolute URLs, so the files are made once the server's port is known
+    files: Dict[str, bytes] = {}
+    server = start_server(files, args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    files.update(fixture_sitemaps(base_url, args.children, args.urls))
+    expected = args.children * args.urls - (args.children - 1) * (args.urls // 100)
+    megabytes = sum(len(body) for body in files.values()) / 1e6
+    print(f"{args.children} child sitemaps x {args.urls} URLs ({expected} unique, {megabytes:.1f} MB gzipped), "
+          f"{args.latency * 1000:.0f} ms latency")
+
+    start = time.perf_counter()
+    found = sum(1 for _ in iter_sitemap_urls([f"{base_url}/sitemap.xml"]))
+    elapsed = time.perf_counter() - start
+    print(f"{'sequential':<22} {elapsed:8.2f}s {found / elapsed:10.0f} URLs/s {found} found")
+
+    start = time.perf_counter()
+    found = asyncio.run(collect(f"{base_url}/sitemap.xml", args.concurrency))
+    elapsed = time.perf_counter() - start
+    print(f"{f'concurrent ({args.concurrency})':<22} {elapsed:8.2f}s {found / elapsed:10.0f} URLs/s {found} found")
+    if found != expected:
+        print(f"expected {expected} URLs")
+
+    body = gzip.decompress(files['/sitemap-0.xml.gz'])
+    print(f"parser peak for one {len(body) / 1e6:.1f} MB sitemap: {parse_peak_mb(body):.2f} MB")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Cost of a slider move in the what-if sweep against re-running process_data.
+
+    python -m benchmarks.bench_threshold_sweep --sizes 100000 1000000 --moves 50
+
+Each "move" changes one threshold to a random value and recounts the URLs
+marked for deletion. The sweep's counts are checked against process_data.
+"""
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from benchmarks.bench_pruning_rules import OLDER_THAN, THRESHOLDS, make_frame
+from seo_tools.pruning import prepare_data, process_data
+from seo_tools.sweep import ThresholdIndex
+
+STEPS = {'Average position': [5.0, 10.0, 19.0, 30.0, 50.0]}
+
+
+def moves(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    thresholds = dict(THRESHOLDS)
+    for _ in range(count):
+        column = rng.choice(list(thresholds))
+        thresholds[column] = rng.choice(STEPS.get(column, [0, 1, 2, 10, 50, 100, 500, 1000]))
+        yield dict(thresholds)
+
+
+def rescan_count(data: pd.DataFrame, thresholds) -> int:
+    processed = process_data(data.copy(), thresholds, OLDER_THAN).dropna(subset=['Laatste wijziging'])
+    return int((processed['Action'] != 'Geen actie').sum())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--moves', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'index build (s)':>16} {'rescan / move (ms)':>19} {'sweep / move (ms)':>18} {'speedup':>8}")
+    for rows in args.sizes:
+        data = prepare_data(make_frame(rows))
+        start = time.perf_counter()
+        index = ThresholdIndex(data)
+        build = time.perf_counter() - start
+
+        rescan_time = sweep_time = 0.0
+        for thresholds in moves(args.moves):
+            start = time.perf_counter()
+            expected = rescan_count(data, thresholds)
+            rescan_time += time.perf_counter() - start
+            start = time.perf_counter()
+            counts = index.counts(thresholds, OLDER_THAN)
+            sweep_time += time.perf_counter() - start
+            if counts.action != expected:
+                raise SystemExit(f"Counts differ at {rows} rows: {counts.action} != {expected}")
+        rescan_ms, sweep_ms = 1000 * rescan_time / args.moves, 1000 * sweep_time / args.moves
+        print(f"{rows:>9} {build:>16.3f} {rescan_ms:>19.2f} {sweep_ms:>18.3f} {rescan_ms / sweep_ms:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
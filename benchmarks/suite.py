@@ -0,0 +1,303 @@
+"""Reproducible benchmark suite: each tool's core function on synthetic exports.
+
+    python -m benchmarks.suite --sizes 10000 100000 1000000
+    python -m benchmarks.suite --sizes 10000000 --tools prune-chunked convert dedup
+    python -m benchmarks.suite --sizes 100000 --compare previous
+
+Inputs come from ``benchmarks.synthetic`` (same columns and layout as
+testnamen.csv) and are cached in ``--data-dir``, so repeated runs read the
+same files. Every measurement runs in a fresh subprocess; peak memory is the
+child's peak RSS. The audit crawlers (``audit`` is main.process_csv, ``crawl``
+the concurrent crawler) fetch from a local stub server instead of the
+internet, with at most ``--audit-rows`` URLs.
+
+Results are appended to ``--results`` as JSON lines, one per tool and size,
+with the commit they were measured on. ``--compare`` prints the ratio to an
+earlier run: ``previous``, or a run id from that file.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from seo_tools.instrument import Recorder, recording
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+DEFAULT_RESULTS = os.path.join(os.path.dirname(__file__), 'results', 'suite.jsonl')
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'patricks-tools-bench')
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'html', 'article.html')
+OLDER_THAN = datetime.date(2023, 1, 1)
+# The second export overlaps the first on 80% of its URLs, written as https://www. variants
+OVERLAP = 0.8
+DUPLICATES = 0.02
+
+
+def export_path(data_dir: str, rows: int) -> str:
+    return os.path.join(data_dir, f"export-{rows}-v{synthetic.VERSION}.csv")
+
+
+def partner_path(data_dir: str, rows: int) -> str:
+    return os.path.join(data_dir, f"partner-{rows}-v{synthetic.VERSION}.csv")
+
+
+def ensure_inputs(data_dir: str, rows: int) -> None:
+    os.makedirs(data_dir, exist_ok=True)
+    for path, kwargs in ((export_path(data_dir, rows), {'seed': 0, 'duplicates': DUPLICATES}),
+                         (partner_path(data_dir, rows), {'seed': 1, 'start': int(rows * (1 - OVERLAP)), 'url_prefix': 'https://www.'})):
+        if not os.path.exists(path):
+            temporary = f"{path}.{os.getpid()}.tmp"
+            synthetic.write_export(temporary, rows, **kwargs)
+            os.replace(temporary, path)
+
+
+## Tools; each returns the paths it read
+
+def prune(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    # The pruning page's in-memory path
+    from seo_tools.ingest import read_csv
+    from seo_tools.pruning import DEFAULT_THRESHOLDS, compact, normalize_columns, prepare_data, process_data
+
+    source = export_path(data_dir, rows)
+    with open(source, 'rb') as f:
+        data = compact(prepare_data(normalize_columns(read_csv(f))))
+    thresholds = {key: value for key, value in DEFAULT_THRESHOLDS.items() if key in data.columns}
+    process_data(data, thresholds, OLDER_THAN).dropna(subset=['Laatste wijziging'])
+    return [source]
+
+
+def prune_chunked(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    from seo_tools.batch import prune_file
+
+    source = export_path(data_dir, rows)
+    prune_file(source, os.path.join(workdir, 'pruned.csv'), older_than_date=OLDER_THAN)
+    return [source]
+
+
+def merge(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    from seo_tools.batch import merge_files
+
+    sources = [export_path(data_dir, rows), partner_path(data_dir, rows)]
+    merge_files(sources, workdir)
+    return sources
+
+
+def convert(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    from seo_tools.batch import convert_file
+
+    source = export_path(data_dir, rows)
+    convert_file(source, os.path.join(workdir, 'converted.csv'))
+    return [source]
+
+
+def dedup(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    from seo_tools.dedup import KEY_URL, dedup_csvs
+
+    sources = [export_path(data_dir, rows), partner_path(data_dir, rows)]
+    dedup_csvs(sources, os.path.join(workdir, 'deduplicated.csv'), key=KEY_URL)
+    return sources
+
+
+def audit(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    import main
+
+    # process_csv looks these up at call time; point them at the stub server
+    main.PAGE_SPEED_ENDPOINT = f"{base_url}/pagespeed?url={{url}}"
+    main.MOBILE_FRIENDLY_ENDPOINT = f"{base_url}/mobile?url={{url}}"
+    main.SSL_ENDPOINT = f"{base_url}/ssl?host={{domain}}"
+    urls = os.path.join(workdir, 'urls.csv')
+    synthetic.write_urls(urls, base_url, rows)
+    main.process_csv(urls, os.path.join(workdir, 'audit.csv'))
+    return [urls]
+
+
+def crawl(data_dir: str, rows: int, workdir: str, base_url: str) -> List[str]:
+    from seo_tools.crawler import CrawlSettings, run_crawl
+
+    settings = CrawlSettings(page_speed_endpoint=f"{base_url}/pagespeed?url={{url}}",
+                             mobile_friendly_endpoint=f"{base_url}/mobile?url={{url}}",
+                             ssl_endpoint=f"{base_url}/ssl?host={{domain}}")
+    urls = os.path.join(workdir, 'urls.csv')
+    synthetic.write_urls(urls, base_url, rows)
+    run_crawl(urls, os.path.join(workdir, 'audit.csv'), settings)
+    return [urls]
+
+
+TOOLS: Dict[str, Callable[[str, int, str, str], List[str]]] = {
+    'prune': prune, 'prune-chunked': prune_chunked, 'merge': merge, 'convert': convert, 'dedup': dedup,
+    'audit': audit, 'crawl': crawl,
+}
+# Tools that fetch every row over HTTP; their row count is capped by --audit-rows
+HTTP_TOOLS = ('audit', 'crawl')
+
+
+## Stub server for the audit crawlers
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    with open(FIXTURE, 'rb') as f:
+        page = f.read()
+    responses = {
+        '/robots.txt': (b"User-agent: *\nDisallow: /zoeken\nSitemap: /sitemap.xml\n", 'text/plain'),
+        '/sitemap.xml': (b'<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"></urlset>', 'application/xml'),
+        '/pagespeed': (json.dumps({'reports': {'lighthouse': {'data': {'score': 87}}}}).encode(), 'application/json'),
+        '/mobile': (b"Page is mobile friendly", 'text/plain'),
+        '/ssl': (json.dumps({'status': 'READY', 'rating': 'A', 'cert': {'notAfter': 1767225600000, 'issuerDN': 'CN=Stub CA', 'validity': 'valid'}}).encode(),
+                 'application/json'),
+    }
+
+    def do_GET(self) -> None:
+        body, content_type = self.responses.get(self.path.split('?')[0], (self.page, 'text/html; charset=utf-8'))
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+## Measurement
+
+def peak_rss_mb() -> float:
+    # VmHWM starts over at exec; ru_maxrss would include the parent's peak at fork time
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # In KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def child(tool: str, rows: int, data_dir: str, base_url: str) -> None:
+    recorder = Recorder(tool=tool, trace_memory=False)
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        with recording(recorder):
+            inputs = TOOLS[tool](data_dir, rows, workdir, base_url)
+        seconds = time.perf_counter() - start
+        input_bytes = sum(os.path.getsize(path) for path in inputs)
+    stages = recorder.summary().set_index('stage')['wall_seconds'].round(4)
+    print(json.dumps({'seconds': seconds, 'input_bytes': input_bytes, 'peak_rss_mb': peak_rss_mb(),
+                      'stages': {name.strip(): value for name, value in stages.items()}}))
+
+
+def measure(tool: str, rows: int, data_dir: str, base_url: str) -> dict:
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.suite', '--child', tool, str(rows), data_dir, base_url],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], check=True, capture_output=True, text=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    return pd.read_json(path, lines=True)
+
+
+def baseline_run(results: pd.DataFrame, run_id: str, compare: str) -> Optional[str]:
+    if results.empty:
+        return None
+    runs = list(dict.fromkeys(results['run_id']))
+    if compare != 'previous':
+        return compare if compare in runs else None
+    earlier = runs[:runs.index(run_id)] if run_id in runs else runs
+    return earlier[-1] if earlier else None
+
+
+def print_comparison(results: pd.DataFrame, run_id: str, baseline: str) -> None:
+    columns = ['tool', 'rows', 'seconds', 'peak_rss_mb']
+    current = results.loc[results['run_id'] == run_id, columns]
+    before = results.loc[results['run_id'] == baseline, columns]
+    table = current.merge(before, on=['tool', 'rows'], suffixes=('', '_before'))
+    table['time ratio'] = table['seconds'] / table['seconds_before']
+    table['memory ratio'] = table['peak_rss_mb'] / table['peak_rss_mb_before']
+    print(f"\nCompared with run {baseline} (ratios below 1 are improvements):")
+    print(table.round(3).to_string(index=False))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Rows per synthetic export (10k to 10M)")
+    parser.add_argument('--tools', nargs='+', choices=list(TOOLS), default=list(TOOLS))
+    parser.add_argument('--audit-rows', type=int, default=500, help="At most this many URLs for the audit crawlers")
+    parser.add_argument('--repeat', type=int, default=1, help="Run every measurement this often and keep the fastest")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Where the generated inputs are cached")
+    parser.add_argument('--results', default=DEFAULT_RESULTS, help="JSON lines file the results are appended to")
+    parser.add_argument('--compare', metavar='RUN', help="'previous' or a run id to compare this run with")
+    parser.add_argument('--child', nargs=4, metavar=('TOOL', 'ROWS', 'DATA_DIR', 'BASE_URL'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        tool, rows, data_dir, base_url = args.child
+        child(tool, int(rows), data_dir, base_url)
+        return
+
+    run_id = uuid.uuid4().hex[:12]
+    environment = {'run_id': run_id, 'started': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+                   'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__}
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print(f"run {run_id}")
+    print(f"{'tool':>13} {'rows':>9} {'time (s)':>9} {'rows/s':>10} {'MB/s':>7} {'peak RSS MB':>12}")
+    try:
+        for rows in args.sizes:
+            ensure_inputs(args.data_dir, rows)
+            for tool in args.tools:
+                tool_rows = min(rows, args.audit_rows) if tool in HTTP_TOOLS else rows
+                result = min((measure(tool, tool_rows, args.data_dir, base_url) for _ in range(args.repeat)), key=lambda r: r['seconds'])
+                record = {**environment, 'tool': tool, 'rows': tool_rows, 'input_mb': result['input_bytes'] / 1e6,
+                          'seconds': result['seconds'], 'rows_per_second': tool_rows / result['seconds'],
+                          'mb_per_second': result['input_bytes'] / 1e6 / result['seconds'], 'peak_rss_mb': result['peak_rss_mb'],
+                          'stages': result['stages']}
+                with open(args.results, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+                print(f"{tool:>13} {tool_rows:>9} {record['seconds']:>9.2f} {record['rows_per_second']:>10.0f} "
+                      f"{record['mb_per_second']:>7.1f} {record['peak_rss_mb']:>12.0f}")
+    finally:
+        server.shutdown()
+
+    if args.compare:
+        results = load_results(args.results)
+        baseline = baseline_run(results, run_id, args.compare)
+        if baseline is None:
+            print(f"\nNo earlier run {args.compare!r} in {args.results} to compare with.")
+        else:
+            print_comparison(results, run_id, baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Synthetic SEO exports shaped like ``testnamen.csv``, at any size.
+
+    python -m benchmarks.synthetic exports/1m.csv --rows 1000000
+
+Same columns, semicolon delimiter, UTF-8 BOM, CRLF line endings, float
+formatting ('29.0') and day-first dates ('20-9-2022', about 3% empty) as the
+real export. Metrics are heavy-tailed like real traffic. Rows are generated
+and written in chunks, so 10M-row files take no more memory than 250k rows,
+and the output depends only on the arguments: the same seed gives the same file.
+"""
+import argparse
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Bumped whenever the generated rows change, so cached benchmark inputs are regenerated
+VERSION = 1
+SECTIONS = ['nieuws', 'nieuws', 'nieuws', 'nieuws', 'apps', 'reviews', 'tips', 'video']
+CHUNK_ROWS = 250_000
+# Empty fields in the date column, as in testnamen.csv, and in a few metric columns
+MISSING_DATES = 0.033
+MISSING_METRICS = 0.01
+
+
+def export_chunk(start: int, rows: int, seed: int = 0, domain: str = 'iphoned.nl', url_prefix: str = '',
+                 duplicates: float = 0.0) -> pd.DataFrame:
+    """Rows ``start`` to ``start + rows`` of a synthetic export, as the strings the CSV holds.
+
+    Row ``i`` gets the URL ``<url_prefix><domain>/<section>/artikel-<i>``, so
+    two exports with overlapping row ranges share URLs (and, with a different
+    ``url_prefix`` such as ``https://www.``, share them only after
+    normalization). ``duplicates`` is the fraction of rows replaced by a copy
+    of an earlier row in the chunk.
+    """
+    rng = np.random.default_rng([seed, start])
+    index = np.arange(start, start + rows)
+    sections = np.asarray(SECTIONS)[index % len(SECTIONS)]
+    urls = pd.Series(sections, dtype=object).radd(f"{url_prefix}{domain}/") + '/artikel-' + index.astype(str)
+
+    sessions = np.floor(rng.lognormal(1.6, 2.4, rows))
+    views = sessions + rng.poisson(np.maximum(sessions, 1) * 0.2)
+    impressions = np.floor(rng.lognormal(4.5, 2.6, rows))
+    clicks = np.minimum(np.floor(sessions * rng.uniform(0.3, 1.0, rows)), impressions)
+    frame = pd.DataFrame({
+        'URL': urls,
+        'Unique Inlinks': rng.integers(1, 6, rows) + rng.poisson(0.1, rows) * 30,
+        'Ahrefs Backlinks - Exact': rng.poisson(0.6, rows).astype(float),
+        'Ahrefs Keywords Top 3 - Exact': rng.poisson(0.18, rows).astype(float),
+        'Ahrefs Keywords Top 10 - Exact': rng.poisson(0.8, rows).astype(float),
+        'Word Count': np.where(rng.random(rows) < 0.05, 0.0, np.round(rng.gamma(4.0, 120.0, rows))),
+        'Sessions': sessions,
+        'Views': views,
+        'Impressions': impressions,
+        'Clicks': clicks,
+        'Average position': np.round(rng.uniform(1, 60, rows), 2),
+    })
+    for column in ('Sessions', 'Clicks', 'Average position'):
+        frame.loc[rng.random(rows) < MISSING_METRICS, column] = np.nan
+
+    # Day-first without zero padding; CMS exports repeat a few thousand publication days
+    days = pd.Timestamp('2012-01-01') + pd.to_timedelta(rng.integers(0, 12 * 365, rows), unit='D')
+    dates = pd.Series(days.day.astype(str) + '-' + days.month.astype(str) + '-' + days.year.astype(str))
+    dates[rng.random(rows) < MISSING_DATES] = ''
+    frame['Laatste wijziging'] = dates.to_numpy()
+
+    if duplicates:
+        copies = np.flatnonzero(rng.random(rows) < duplicates)
+        copies = copies[copies > 0]
+        frame.iloc[copies] = frame.iloc[rng.integers(0, copies)].to_numpy()
+    return frame
+
+
+def write_export(path: str, rows: int, seed: int = 0, domain: str = 'iphoned.nl', url_prefix: str = '',
+                 start: int = 0, duplicates: float = 0.0, chunk_rows: int = CHUNK_ROWS) -> None:
+    """Write ``rows`` synthetic export rows (``start`` onwards) to ``path`` in the layout of testnamen.csv."""
+    # One text stream, so the BOM is written once before the header
+    with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+        for offset in range(start, start + rows, chunk_rows):
+            chunk = export_chunk(offset, min(chunk_rows, start + rows - offset), seed, domain, url_prefix, duplicates)
+            chunk.to_csv(f, sep=';', index=False, header=offset == start, lineterminator='\r\n')
+
+
+def write_urls(path: str, base_url: str, rows: int, start: int = 0) -> None:
+    """A headerless one-URL-per-line file for the audit crawlers, pointing at ``base_url``."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for offset in range(start, start + rows, CHUNK_ROWS):
+            index = np.arange(offset, min(offset + CHUNK_ROWS, start + rows))
+            sections = np.asarray(SECTIONS)[index % len(SECTIONS)]
+            f.writelines(f"{base_url}/{section}/artikel-{i}\n" for section, i in zip(sections, index))
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help="CSV file to write")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', type=int, default=0, help="Index of the first row (overlapping ranges share URLs)")
+    parser.add_argument('--url-prefix', default='', help="Prefix for every URL, e.g. 'https://www.'")
+    parser.add_argument('--duplicates', type=float, default=0.0, help="Fraction of rows that repeat an earlier row")
+    args = parser.parse_args(argv)
+    write_export(args.path, args.rows, args.seed, url_prefix=args.url_prefix, start=args.start, duplicates=args.duplicates)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+import os
+from typing import Callable, List
+
+import streamlit as st
+
+from performance_panel import remember_run
+from seo_tools.batch import Job
+from seo_tools.instrument import Recorder
+from seo_tools.jobs import DONE, FAILED, QUEUED, JobQueue, JobState
+
+# How often a page showing an unfinished job checks on it
+POLL_SECONDS = 1.0
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    # One queue, and so one worker pool, for all sessions of this server
+    return JobQueue()
+
+
+def submit_job(tool: str, uploads: List, make_job: Callable[[List[str], str], Job]) -> str:
+    """Queue the Job ``make_job(input_paths, output_dir)`` returns, with ``uploads`` copied to its inputs."""
+    queue = get_job_queue()
+    job_id = queue.create()
+    paths = [queue.save_input(job_id, upload.name, upload) for upload in uploads]
+    queue.submit(job_id, tool, make_job(paths, queue.output_directory(job_id)))
+    # The job id in the URL brings a reloaded (or bookmarked) page back to the job
+    st.query_params['job'] = job_id
+    st.session_state.setdefault(f'jobs_{tool}', []).insert(0, job_id)
+    return job_id
+
+
+def read_output(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def show_job(queue: JobQueue, state: JobState) -> None:
+    st.subheader(f"Background job: {state.name}")
+    if state.status == QUEUED:
+        st.progress(0.0, text="Waiting for a free worker...")
+    elif state.status == FAILED:
+        st.error(f"The job failed: {state.error}")
+    elif state.status != DONE:
+        st.progress(state.progress, text=f"{state.message or 'Starting'} ({state.seconds:.0f}s)")
+    else:
+        st.success(f"Done in {state.seconds:.1f}s")
+        st.json(state.summary, expanded=False)
+        for path in queue.outputs(state.id):
+            name = os.path.basename(path)
+            # The file is only read when the button is clicked
+            st.download_button(
+                label=f"Download {name}",
+                data=lambda path=path: read_output(path),
+                file_name=name,
+                mime="text/csv",
+                on_click="ignore",
+                key=f"job-download-{state.id}-{name}",
+            )
+
+
+def job_panel(tool: str) -> None:
+    """The page's background job (the one in the URL): progress while it runs, downloads once it is done."""
+    queue = get_job_queue()
+    recent = st.session_state.get(f'jobs_{tool}', [])
+    if len(recent) > 1:
+        with st.expander("Your background jobs"):
+            states = [state for state in map(queue.state, recent) if state is not None]
+            chosen = st.selectbox("Job", states, format_func=lambda state: f"{state.name} ({state.status})", key=f"jobs-{tool}")
+            if chosen is not None and st.button("Show job", key=f"jobs-{tool}-show"):
+                st.query_params['job'] = chosen.id
+
+    job_id = st.query_params.get('job')
+    if not job_id:
+        return
+    state = queue.state(job_id)
+    if state is None or state.tool != tool:
+        st.warning("This background job no longer exists; results are kept for a week.")
+        return
+
+    polling = not state.ended
+
+    def refresh() -> None:
+        current = queue.state(job_id)
+        if polling and current.ended:
+            # Rerun the whole page, which stops the polling and shows the results
+            st.rerun()
+        show_job(queue, current)
+
+    st.fragment(refresh, run_every=POLL_SECONDS if polling else None)()
+    profile = queue.profile(job_id)
+    if state.status == DONE and profile:
+        previous = st.session_state.get(f'performance_{tool}')
+        recorder = Recorder.read_jsonl(profile)
+        if previous is None or previous.run_id != recorder.run_id:
+            recorder.tool = tool
+            remember_run(recorder)
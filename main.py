@@ -1,133 +1,135 @@
-import csv
-import re
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
-
-def process_csv(file_path, output_file):
-    with open(file_path, 'r', encoding='utf-8') as input_file, open(output_file, 'w', newline='', encoding='utf-8') as output_file:
-        csv_reader = csv.reader(input_file)
-        csv_writer = csv.writer(output_file)
-
-        # Write header row
-        csv_writer.writerow(['URL', 'Domain', 'Page Title', 'Meta Description', 'Header Tags', 'Image Tags', 'Internal Links', 'External Links', 'Social Media Links', 'Canonical URL', 'Robots.txt', 'Sitemap.xml', 'Page Speed', 'Mobile Friendly', 'SSL', 'SSL Expiration', 'SSL Issuer', 'SSL Validity', 'SSL Rating', 'SEO Score', 'SEO Rating', 'SEO Recommendations', 'SEO Score (out of 100)'])
-
-        urls_meeting_criteria = 0  # Counter for URLs meeting all criteria
-
-        for row in csv_reader:
-            url = row[0]
-            domain = urlparse(url).netloc
-            page_title = ''
-            meta_description = ''
-            header_tags = []
-            image_tags = []
-            internal_links = []
-            external_links = []
-            social_media_links = []
-            canonical_url = ''
-            robots_txt = ''
-            sitemap_xml = ''
-            page_speed = ''
-            mobile_friendly = ''
-            ssl = ''
-            ssl_expiration = ''
-            ssl_issuer = ''
-            ssl_validity = ''
-            ssl_rating = ''
-            seo_score = ''
-            seo_rating = ''
-            seo_recommendations = ''
-            seo_score_out_of_100 = ''
-
-            # Get page title
-            try:
-                response = requests.get(url)
-                soup = BeautifulSoup(response.text, 'html.parser')
-                page_title = soup.title.text.strip()
-            except Exception as e:
-                print(f"Error getting page title for {url}: {e}")
-
-            # Get meta description
-            try:
-                meta_description_tag = soup.find('meta', attrs={'name': 'description'})
-                if meta_description_tag:
-                    meta_description = meta_description_tag['content']
-            except Exception as e:
-                print(f"Error getting meta description for {url}: {e}")
-
-            # Get header tags
-            try:
-                header_tags = [tag.text.strip() for tag in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
-            except Exception as e:
-                print(f"Error getting header tags for {url}: {e}")
-
-            # Get image tags
-            try:
-                image_tags = [img['src'] for img in soup.find_all('img', src=True)]
-            except Exception as e:
-                print(f"Error getting image tags for {url}: {e}")
-
-            # Get internal links
-            try:
-                internal_links = [a['href'] for a in soup.find_all('a', href=True) if a['href'].startswith('/')]
-            except Exception as e:
-                print(f"Error getting internal links for {url}: {e}")
-
-            # Get external links
-            try:
-                external_links = [a['href'] for a in soup.find_all('a', href=True) if not a['href'].startswith('/') and not a['href'].startswith('#')]
-            except Exception as e:
-                print(f"Error getting external links for {url}: {e}")
-
-            # Get social media links
-            try:
-                social_media_links = [a['href'] for a in soup.find_all('a', href=True) if re.search(r'facebook|twitter|instagram|linkedin|youtube', a['href'])]
-            except Exception as e:
-                print(f"Error getting social media links for {url}: {e}")
-
-            # Get canonical URL
-            try:
-                canonical_url_tag = soup.find('link', rel='canonical')
-                if canonical_url_tag:
-                    canonical_url = canonical_url_tag['href']
-            except Exception as e:
-                print(f"Error getting canonical URL for {url}: {e}")
-
-            # Get robots.txt
-            try:
-                robots_txt = requests.get(f"{url}/robots.txt").text
-            except Exception as e:
-                print(f"Error getting robots.txt for {url}: {e}")
-
-            # Get sitemap.xml
-            try:
-                sitemap_xml = requests.get(f"{url}/sitemap.xml").text
-            except Exception as e:
-                print(f"Error getting sitemap.xml for {url}: {e}")
-
-            # Get page speed
-            try:
-                page_speed = requests.get(f"https://gtmetrix.com/api/0.1/test?url={url}").json()['reports']['lighthouse']['data']['score']
-            except Exception as e:
-                print(f"Error getting page speed for {url}: {e}")
-
-            # Get mobile friendly
-            try:
-                mobile_friendly = requests.get(f"https://search.google.com/test/mobile-friendly?url={url}").text
-            except Exception as e:
-                print(f"Error getting mobile friendly for {url}: {e}")
-
-            # Get SSL information
-            try:
-                ssl_info = requests.get(f"https://api.ssllabs.com/api/v3/analyze?host={domain}").json()
-                ssl = ssl_info['status']
-                ssl_expiration = ssl_info['cert']['notAfter']
-                ssl_issuer = ssl_info['cert']['issuerDN']
-                ssl_validity = ssl_info['cert']['validity']
-                ssl_rating = ssl_info['rating']
-            except Exception as e:
-                print(f"Error getting SSL information for {url}: {e}")
-
-            # Get SEO score
-            try:
- 
\ No newline at end of file
+import argparse
+import csv
+import requests
+from urllib.parse import urlparse
+
+from seo_tools.audit import AUDIT_COLUMNS, MOBILE_FRIENDLY_ENDPOINT, PAGE_SPEED_ENDPOINT, RETRY_STATUSES, SSL_ENDPOINT, audit_page, audit_row, empty_result, extract_page_speed, extract_ssl_fields, lookup_body, read_urls, site_root, ssl_ready
+from seo_tools.cache import DomainCache
+from seo_tools.http_cache import ACCEPT_ENCODING, HttpCache
+from seo_tools.journal import CrawlJournal, CrawlPlanner, RetryPolicy
+from seo_tools.sitemaps import SitemapStats, is_url, iter_sitemap_urls
+
+def get_text(url):
+    response = requests.get(url)
+    return lookup_body(url, response.status_code, response.text)
+
+def process_csv(file_path, output_file, cache=None, parser_backend='html.parser', journal=None, retry=None, http_cache=None, sitemaps=None):
+    cache = cache or DomainCache()
+    # A sitemap URL instead of a file: pages are audited as the sitemaps are read
+    urls = iter_sitemap_urls([file_path], sitemaps) if is_url(file_path) else read_urls(file_path)
+    # Duplicate URLs are fetched once; with a journal, URLs done in an earlier run are skipped
+    planner = CrawlPlanner(journal, retry)
+    plan = planner.plan
+    with open(output_file, 'w', newline='', encoding='utf-8') as output:
+        csv_writer = csv.writer(output)
+
+        # Write header row
+        csv_writer.writerow(AUDIT_COLUMNS)
+
+        for url in planner.todo(urls):
+            domain = urlparse(url).netloc
+            root = site_root(url)
+            result = empty_result(url)
+            error = None
+
+            # Get on-page fields (title, meta description, headings, images, links, canonical) in one pass
+            # With an HTTP cache, unchanged pages answer 304 and their stored fields are reused
+            try:
+                headers = http_cache.request_headers(url) if http_cache is not None else {'Accept-Encoding': ACCEPT_ENCODING}
+                response = requests.get(url, headers=headers)
+                error = audit_page(url, response.status_code, response.headers, response.text, result, parser_backend, http_cache)
+                if response.status_code in RETRY_STATUSES:
+                    error = f"HTTP {response.status_code}"
+            except Exception as e:
+                print(f"Error getting page for {url}: {e}")
+                error = f"{type(e).__name__}: {e}"
+
+            # Get robots.txt
+            try:
+                result['Robots.txt'] = cache.get_or_load('robots.txt', domain, lambda: get_text(f"{root}/robots.txt"))
+            except Exception as e:
+                print(f"Error getting robots.txt for {url}: {e}")
+
+            # Get sitemap.xml
+            try:
+                result['Sitemap.xml'] = cache.get_or_load('sitemap.xml', domain, lambda: get_text(f"{root}/sitemap.xml"))
+            except Exception as e:
+                print(f"Error getting sitemap.xml for {url}: {e}")
+
+            # Get page speed
+            try:
+                extract_page_speed(url, requests.get(PAGE_SPEED_ENDPOINT.format(url=url)).json(), result)
+            except Exception as e:
+                print(f"Error getting page speed for {url}: {e}")
+
+            # Get mobile friendly
+            try:
+                result['Mobile Friendly'] = get_text(MOBILE_FRIENDLY_ENDPOINT.format(url=url))
+            except Exception as e:
+                print(f"Error getting mobile friendly for {url}: {e}")
+
+            # Get SSL information
+            try:
+                extract_ssl_fields(url, cache.get_or_load('ssl', domain, lambda: requests.get(SSL_ENDPOINT.format(domain=domain)).json(), ssl_ready), result)
+            except Exception as e:
+                print(f"Error getting SSL information for {url}: {e}")
+
+            if journal is not None:
+                journal.record(url, result, error)
+            csv_writer.writerow(audit_row(result))
+
+    if journal is not None:
+        # Every input URL in input order, including the ones done by earlier runs
+        journal.write_output(plan.urls, output_file)
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SEO audit for a CSV with one URL per row.")
+    parser.add_argument('input', help="CSV file with URLs in the first column, or the URL of a sitemap or sitemap index")
+    parser.add_argument('output', help="CSV file to write the audit to")
+    parser.add_argument('--concurrent', action='store_true', help="Crawl with asyncio instead of one URL at a time")
+    parser.add_argument('--concurrency', type=int, default=50, help="Maximum requests in flight overall")
+    parser.add_argument('--per-host', type=int, default=4, help="Maximum requests in flight per host")
+    parser.add_argument('--timeout', type=float, default=30.0, help="Total timeout per request in seconds")
+    parser.add_argument('--retries', type=int, default=3, help="Retries per request on timeouts, connection errors and 429/5xx")
+    parser.add_argument('--parser', choices=['html.parser', 'lxml', 'auto'], default='html.parser', help="HTML parser backend; auto picks lxml when it is installed")
+    parser.add_argument('--parse-workers', type=int, default=0, help="With --concurrent: processes that parse page HTML, so parsing is not limited to one core")
+    parser.add_argument('--cache-file', help="sqlite file that keeps robots.txt, sitemap.xml and SSL lookups between runs")
+    parser.add_argument('--cache-ttl', type=float, default=24.0, help="Hours before a cached domain lookup is fetched again")
+    parser.add_argument('--cache-size', type=int, default=1024, help="Domain lookups kept in memory")
+    parser.add_argument('--http-cache', help="sqlite file with page bodies and validators; repeat audits only download changed pages")
+    parser.add_argument('--journal', help="sqlite checkpoint file; a rerun with the same file skips the URLs it has done")
+    parser.add_argument('--max-attempts', type=int, default=3, help="With --journal: attempts per URL over all runs before a failing URL is given up")
+    parser.add_argument('--retry-after', type=float, default=0.0, help="With --journal: minutes after a failure before the URL is tried again")
+    args = parser.parse_args()
+
+    cache = DomainCache(max_entries=args.cache_size, ttl=args.cache_ttl * 3600, path=args.cache_file)
+    journal = CrawlJournal(args.journal) if args.journal else None
+    http_cache = HttpCache(args.http_cache) if args.http_cache else None
+    retry = RetryPolicy(max_attempts=args.max_attempts, retry_after=args.retry_after * 60)
+
+    if args.concurrent:
+        from seo_tools.crawler import CrawlSettings, run_crawl
+
+        settings = CrawlSettings(concurrency=args.concurrency, per_host=args.per_host, timeout=args.timeout, retries=args.retries, parser_backend=args.parser, parse_workers=args.parse_workers)
+        stats = run_crawl(args.input, args.output, settings, cache, journal, retry, http_cache)
+        print(stats.summary())
+    else:
+        sitemaps = SitemapStats() if is_url(args.input) else None
+        plan = process_csv(args.input, args.output, cache, args.parser, journal, retry, http_cache, sitemaps)
+        print(f"Plan: {plan.summary()}")
+        if sitemaps is not None:
+            print(sitemaps.summary())
+        print(cache.summary())
+        if http_cache is not None:
+            print(http_cache.summary())
+    cache.close()
+    if http_cache is not None:
+        http_cache.close()
+    if journal is not None:
+        journal.close()
+
+
+if __name__ == "__main__":
+    main()
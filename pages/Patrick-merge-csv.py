@@ -1,121 +1,144 @@
 import streamlit as st
-import pandas as pd
-import csv
-import io
-import chardet
-import re
+import shutil
+import tempfile
 
-def detect_encoding(file):
-    raw_data = file.read()
-    file.seek(0)  # Reset file pointer
-    result = chardet.detect(raw_data)
-    return result['encoding']
+from job_panel import job_panel, submit_job
+from performance_panel import page_recorder, performance_panel, remember_run
+from seo_tools.batch import Job, merge_files
+from seo_tools.ingest import read_csv
+from seo_tools.instrument import recording, stage
+from seo_tools.merge import merge_external, merge_frames, needs_external_merge, prepare_frame, source_names
 
-def detect_delimiter(file, encoding):
-    sample = file.read(1024).decode(encoding)
-    file.seek(0)  # Reset file pointer
-    sniffer = csv.Sniffer()
-    try:
-        dialect = sniffer.sniff(sample)
-        return dialect.delimiter
-    except:
-        # If sniffer fails, try common delimiters
-        for delimiter in [',', ';', '\t', '|']:
-            try:
-                pd.read_csv(io.StringIO(sample), sep=delimiter, nrows=5)
-                return delimiter
-            except:
-                continue
-    return ','  # Default to comma if no delimiter is detected
-
-def read_csv_with_auto_detect(file):
-    encoding = detect_encoding(file)
-    delimiter = detect_delimiter(file, encoding)
-    df = pd.read_csv(file, sep=delimiter, encoding=encoding, engine='python')
-    return df
-
-def standardize_url(url):
-    url = url.lower().strip()
-    url = re.sub(r'^https?://', '', url)  # Remove http:// or https://
-    url = re.sub(r'^www\.', '', url)  # Remove www.
-    url = url.rstrip('/')  # Remove trailing slash
-    return url
-
-def merge_csvs(file1, file2):
-    df1 = read_csv_with_auto_detect(file1)
-    df2 = read_csv_with_auto_detect(file2)
+def merge_csvs(files):
+    names = source_names(file.name for file in files)
+    frames = []
+    url_cols = []
+    memory_before = memory_after = 0
+    for file, name in zip(files, names):
+        df = read_csv(file)
+        
+        # Lowercase column names, standardize the URL column (assuming it contains 'url' in its name) and compact the rest
+        try:
+            url_col, report = prepare_frame(df)
+        except ValueError:
+            st.error(f"URL column not found in {name}.")
+            return None, None
+        memory_before += report.before
+        memory_after += report.after
+        frames.append(df)
+        url_cols.append(url_col)
     
-    # Strip whitespace from column names and convert to lowercase
-    df1.columns = df1.columns.str.strip().str.lower()
-    df2.columns = df2.columns.str.strip().str.lower()
+    # Join on standardized URL columns; matched and unmatched rows come out of one pass
+    result = merge_frames(frames, url_cols, names)
+    merged_df = result.merged
     
-    # Identify URL column (assuming it's named 'url' or contains 'url' in its name)
-    url_col1 = next((col for col in df1.columns if 'url' in col), None)
-    url_col2 = next((col for col in df2.columns if 'url' in col), None)
+    # Debug information
+    st.write(f"Memory: {memory_before / 1e6:.1f} MB parsed, {memory_after / 1e6:.1f} MB after compacting column types")
+    for df, name in zip(frames, names):
+        st.write(f"Total rows in {name}: {len(df)}")
+    st.write(f"Matched rows: {len(merged_df)}")
+    for name, unmatched in result.unmatched.items():
+        st.write(f"Unmatched rows from {name}: {len(unmatched)}")
     
-    if url_col1 and url_col2:
-        # Standardize URLs
-        df1[url_col1] = df1[url_col1].apply(standardize_url)
-        df2[url_col2] = df2[url_col2].apply(standardize_url)
-        
-        # Merge on standardized URL column
-        merged_df = pd.merge(df1, df2, left_on=url_col1, right_on=url_col2, how='outer', indicator=True)
-        
-        # Debug information
-        st.write(f"Total rows in file 1: {len(df1)}")
-        st.write(f"Total rows in file 2: {len(df2)}")
-        st.write(f"Rows in merged dataframe: {len(merged_df)}")
-        st.write(f"Matched rows: {len(merged_df[merged_df['_merge'] == 'both'])}")
-        st.write(f"Unmatched rows from file 1: {len(merged_df[merged_df['_merge'] == 'left_only'])}")
-        st.write(f"Unmatched rows from file 2: {len(merged_df[merged_df['_merge'] == 'right_only'])}")
-        
-        # Sample of unmatched URLs
-        st.write("Sample of unmatched URLs from file 1:")
-        st.write(merged_df[merged_df['_merge'] == 'left_only'][url_col1].head())
-        st.write("Sample of unmatched URLs from file 2:")
-        st.write(merged_df[merged_df['_merge'] == 'right_only'][url_col2].head())
-        
-        unmatched = merged_df[merged_df['_merge'] != 'both']
-        merged_df = merged_df[merged_df['_merge'] == 'both'].drop(columns=['_merge'])
-    else:
-        st.error("URL column not found in one or both files.")
-        return None, None
+    # Sample of unmatched URLs
+    for name, url_col in zip(names, url_cols):
+        st.write(f"Sample of unmatched URLs from {name}:")
+        st.write(result.unmatched[name][url_col].head())
 
-    return merged_df, unmatched
+    return merged_df, result.unmatched
 
-def main():
-    st.title("Patrick's CSV Merger")
-    st.markdown("This tool merges two CSV files based on common columns, automatically detecting delimiters and encodings.")
+def merge_csvs_on_disk(files, memory_budget):
+    # Uploads too large to join in memory: partitioned hash join that spills to disk
+    previous = st.session_state.pop('merge_workdir', None)
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+    workdir = tempfile.mkdtemp(prefix='csv-merge-')
+    st.session_state['merge_workdir'] = workdir
+    for file in files:
+        file.seek(0)
+    names = source_names(file.name for file in files)
+    return merge_external(files, names, workdir, memory_budget, total_bytes=sum(file.size for file in files))
 
-    file1 = st.file_uploader("Upload File 1", type="csv")
-    file2 = st.file_uploader("Upload File 2", type="csv")
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
 
-    if file1 and file2:
-        if st.button("Merge CSVs"):
-            merged_df, unmatched = merge_csvs(file1, file2)
-            if merged_df is not None:
-                st.success(f"Files merged successfully! Rows: {merged_df.shape[0]}, Columns: {merged_df.shape[1]}")
-                st.dataframe(merged_df.head())
+def merge_job(memory_budget):
+    def make_job(paths, output_dir):
+        return Job(f"{len(paths)} files", output_dir, merge_files, args=(paths, output_dir), kwargs={'memory_budget': memory_budget})
+    return make_job
 
-                csv = merged_df.to_csv(index=False)
+def run_merge(files, memory_budget):
+    if needs_external_merge(sum(file.size for file in files), memory_budget):
+        st.info("The uploads exceed the memory budget; merging them in partitions on disk.")
+        result = merge_csvs_on_disk(files, memory_budget)
+        st.success(f"Files merged successfully! Rows: {result.matched_rows}")
+        st.download_button(
+            label="Download merged CSV",
+            data=lambda: read_file(result.merged_path),
+            file_name="merged_csv.csv",
+            mime="text/csv"
+        )
+        for name, rows in result.unmatched_rows.items():
+            if rows:
+                st.warning(f"There were {rows} unmatched rows in {name}.")
                 st.download_button(
-                    label="Download merged CSV",
-                    data=csv,
-                    file_name="merged_csv.csv",
+                    label=f"Download unmatched rows from {name}",
+                    data=lambda path=result.unmatched_paths[name]: read_file(path),
+                    file_name=f"unmatched_rows_{name}.csv",
                     mime="text/csv"
                 )
+        return
 
-                if not unmatched.empty:
-                    st.warning(f"There were {len(unmatched)} unmatched rows.")
-                    unmatched_csv = unmatched.to_csv(index=False)
-                    st.download_button(
-                        label="Download unmatched rows",
-                        data=unmatched_csv,
-                        file_name="unmatched_rows.csv",
-                        mime="text/csv"
-                    )
+    merged_df, unmatched = merge_csvs(files)
+    if merged_df is not None:
+        st.success(f"Files merged successfully! Rows: {merged_df.shape[0]}, Columns: {merged_df.shape[1]}")
+        st.dataframe(merged_df.head())
+
+        with stage('export csv', rows=len(merged_df)):
+            csv = merged_df.to_csv(index=False)
+        st.download_button(
+            label="Download merged CSV",
+            data=csv,
+            file_name="merged_csv.csv",
+            mime="text/csv"
+        )
+
+        for name, rows in unmatched.items():
+            if not rows.empty:
+                st.warning(f"There were {len(rows)} unmatched rows in {name}.")
+                with stage('export csv', rows=len(rows)):
+                    unmatched_csv = rows.to_csv(index=False)
+                st.download_button(
+                    label=f"Download unmatched rows from {name}",
+                    data=unmatched_csv,
+                    file_name=f"unmatched_rows_{name}.csv",
+                    mime="text/csv"
+                )
+
+def main():
+    st.title("Patrick's CSV Merger")
+    st.markdown("This tool merges two or more CSV files on their URL column, automatically detecting delimiters and encodings.")
+
+    files = st.file_uploader("Upload CSV files", type="csv", accept_multiple_files=True)
+    memory_budget = st.number_input("Memory budget (MB)", value=1024, min_value=64) * 1024 * 1024
+
+    if files and len(files) >= 2:
+        background = st.checkbox("Run in the background (for large files)")
+        start = st.button("Merge CSVs")
+        if start and background:
+            submit_job('merge', files, merge_job(memory_budget))
+        elif start:
+            recorder = page_recorder('merge')
+            try:
+                with recording(recorder):
+                    run_merge(files, memory_budget)
+            finally:
+                remember_run(recorder)
     else:
-        st.info("Please upload both CSV files to merge.")
+        st.info("Please upload at least two CSV files to merge.")
+    job_panel('merge')
+    performance_panel('merge')
 
 if __name__ == "__main__":
     main()
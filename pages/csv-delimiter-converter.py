@@ -1,51 +1,66 @@
 import streamlit as st
-import pandas as pd
-import io
+import os
+import tempfile
 
-def detect_encoding(file):
-    # Try to decode with utf-8 first, then fallback to latin-1
-    try:
-        file.read().decode('utf-8')
-        file.seek(0)
-        return 'utf-8'
-    except UnicodeDecodeError:
-        file.seek(0)
-        return 'latin-1'
+from job_panel import job_panel, submit_job
+from performance_panel import page_recorder, performance_panel, remember_run
+from seo_tools.batch import Job, convert_file
+from seo_tools.convert import convert_stream
+from seo_tools.instrument import recording
 
 def convert_csv(input_file):
+    # Stream the re-delimited rows into a temporary file instead of building the output in memory
+    output = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
     try:
-        # Detect the file encoding
-        encoding = detect_encoding(input_file)
-        
-        # Read the input CSV file with automatic delimiter detection
-        df = pd.read_csv(input_file, encoding=encoding, sep=None, engine='python')
-        
-        # Convert the DataFrame to a comma-delimited CSV
-        output = io.StringIO()
-        df.to_csv(output, index=False, sep=',')
-        return output.getvalue(), None
+        with output:
+            convert_stream(input_file, output, delimiter=',')
+        return output.name, None
     except Exception as e:
+        os.remove(output.name)
         return None, str(e)
 
+def convert_job(paths, output_dir):
+    output = os.path.join(output_dir, "converted_comma_delimited.csv")
+    return Job(os.path.basename(paths[0]), output, convert_file, args=(paths[0], output), kwargs={'delimiter': ','})
+
+def read_converted(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
 st.title("CSV Delimiter Converter")
 
 st.markdown("Deze tool converteert een CSV-bestand naar een komma-gescheiden CSV, ongeacht het oorspronkelijke scheidingsteken.")
 
 uploaded_file = st.file_uploader("Upload een CSV-bestand", type="csv")
+background = st.checkbox("Op de achtergrond uitvoeren (voor grote bestanden)")
+
+if uploaded_file is not None and background:
+    if st.button("Converteren"):
+        submit_job('convert', [uploaded_file], convert_job)
+elif uploaded_file is not None:
+    # Convert each upload once; reruns reuse the converted file
+    previous = st.session_state.get('converted_csv')
+    if previous is None or previous[0] != uploaded_file.file_id:
+        if previous is not None and previous[1] and os.path.exists(previous[1]):
+            os.remove(previous[1])
+        recorder = page_recorder('convert')
+        with recording(recorder):
+            st.session_state['converted_csv'] = (uploaded_file.file_id, *convert_csv(uploaded_file))
+        remember_run(recorder)
+    _, converted_csv, error = st.session_state['converted_csv']
 
-if uploaded_file is not None:
-    # Convert the uploaded file
-    converted_csv, error = convert_csv(uploaded_file)
-    
     if error:
         st.error(f"Er is een fout opgetreden: {error}")
     elif converted_csv:
-        # Provide a download button for the converted CSV
+        # Provide a download button for the converted CSV; the file is only read when it is clicked
         st.download_button(
             label="Download Geconverteerde CSV",
-            data=converted_csv,
+            data=lambda: read_converted(converted_csv),
             file_name="converted_comma_delimited.csv",
             mime="text/csv"
         )
     else:
         st.warning("Er is iets misgegaan bij het converteren van het bestand. Probeer het opnieuw.")
+
+job_panel('convert')
+performance_panel('convert')
@@ -1,143 +1,114 @@
-import streamlit as st
-import pandas as pd
-from dateutil import parser
-import csv
-import io
-import traceback
-
-## Data Processing Functions
-
-def parse_date(date_string):
-    try:
-        return parser.parse(date_string).date()
-    except (ValueError, TypeError):
-        return None
-
-def process_data(data, thresholds, older_than_date):
-    data['Average position'] = data['Average position'].astype(float)
-    data['Laatste wijziging'] = data['Laatste wijziging'].astype(str).apply(parse_date)
-    data['Unique Inlinks'] = data['Unique Inlinks'].astype(int)
-
-    def should_delete(row):
-        conditions = []
-        for key, value in thresholds.items():
-            if key == 'Average position':
-                conditions.append(row[key] > value)
-            elif key in row:
-                conditions.append(row[key] < value)
-            elif key == 'Ahrefs URL Rating - Exact':
-                conditions.append(row[key] < value)
-            elif key == 'Ahrefs Keywords Top 3 - Exact':
-                conditions.append(row[key] < value)
-            elif key == 'Ahrefs Keywords Top 10 - Exact':
-                conditions.append(row[key] < value)
-        if older_than_date and row['Laatste wijziging']:
-            conditions.append(row['Laatste wijziging'] < older_than_date)
-        return all(conditions)
-
-    data['To Delete'] = data.apply(should_delete, axis=1)
-    data['Backlinks controleren'] = (data['To Delete'] & (data['Ahrefs Backlinks - Exact'] > thresholds.get('Backlinks', float('inf'))))
-    data['Action'] = 'Geen actie'
-    data.loc[data['To Delete'], 'Action'] = 'Verwijderen'
-    data.loc[data['Backlinks controleren'], 'Action'] = 'Backlinks controleren'
-    return data
-
-## UI Setup Functions
-
-def setup_ui():
-    st.title("Patrick's Cleanup Tool")
-    st.markdown("Hier onder kun je aangeven waar je post :blue-background[minimaal] aan moet voldoen om :blue-background[niet] in aanmerking te komen voor verwijdering.")
-    st.markdown("Wanneer je dus een waarde van 1000 invult bij Sessions komen alle URLs met minder dan 1000 sessie in aanmerking voor verwijderen (als alle overige metrics ook kloppen)")
-    st.markdown("Maak een kopie van het template hieronder en vul deze met jouw data. ")
-    st.markdown("Vervolgens kun je hem hierboven uploaden en zal de tool aan de hand van de door jou ingestelde criteria de URLs die wegkunnen markeren")
-    st.markdown("[het template hieronder](https://docs.google.com/spreadsheets/d/1GtaLaXO62Rf8Xo2gNiw6wkAXrHoE-bBJr8Uf3_e8lNw/edit?usp=sharing)")
-
-def display_results(data):
-    if data.empty:
-        st.write("No URLs require action.")
-    else:
-        st.dataframe(data)
-        csv_string = data.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv_string,
-            file_name="processed_data.csv",
-            mime="text/csv"
-        )
-
-def detect_delimiter(file_content):
-    sniffer = csv.Sniffer()
-    try:
-        dialect = sniffer.sniff(file_content[:1024])
-        return dialect.delimiter
-    except csv.Error:
-        # If sniffer fails, try common delimiters
-        for delimiter in [',', ';', '\t', '|']:
-            try:
-                pd.read_csv(io.StringIO(file_content[:1024]), sep=delimiter, nrows=5)
-                return delimiter
-            except:
-                continue
-    return None
-
-## Main Application Logic
-
-def main():
-    setup_ui()
-    uploaded_file = st.file_uploader("Select CSV file", type="csv")
-    thresholds = {
-        'Sessions': st.number_input("Sessions", value=1000, min_value=0),
-        'Views': st.number_input("Views", value=1000, min_value=0),
-        'Clicks': st.number_input("Clicks", value=50, min_value=0),
-        'Impressions': st.number_input("Impressions", value=500, min_value=0),
-        'Average position': st.number_input("Average position", value=19.0, min_value=0.0),
-        'Backlinks': st.number_input("Backlinks", value=1, min_value=0),
-        'Word Count': st.number_input("Word Count", value=500, min_value=0),
-        'Unique Inlinks': st.number_input("Unique Inlinks", value=0, min_value=0),
-        'Ahrefs URL Rating - Exact': st.number_input("Ahrefs URL Rating - Exact", value=5, min_value=0),
-        'Ahrefs Keywords Top 3 - Exact': st.number_input("Ahrefs Keywords Top 3 - Exact", value=1, min_value=0),
-        'Ahrefs Keywords Top 10 - Exact': st.number_input("Ahrefs Keywords Top 10 - Exact", value=2, min_value=0),
-    }
-    older_than = st.date_input("Older than", value=pd.to_datetime("2023-01-01"))
-    threshold_checks = {}
-    for key in thresholds:
-        threshold_checks[key] = st.checkbox(f"Apply {key} threshold", value=True)
-    output_mode = st.radio("Output mode", ["Show all URLs", "Show only URLs with actions"])
-    start_button = st.button("Start Processing")
-    
-    if start_button and uploaded_file is not None:
-        try:
-            csv_content = uploaded_file.getvalue().decode('utf-8')
-            
-            # Detect the delimiter
-            delimiter = detect_delimiter(csv_content)
-            
-            if delimiter is None:
-                st.error("Could not determine delimiter. Please check your CSV file format.")
-                return
-            
-            # Read the CSV using the detected delimiter
-            data = pd.read_csv(io.StringIO(csv_content), sep=delimiter, engine='python')
-                       
-            required_columns = ['Sessions', 'Views', 'Clicks', 'Impressions', 'Average position', 'Ahrefs Backlinks - Exact', 'Word Count', 'Laatste wijziging', 'Unique Inlinks']
-            missing_columns = [col for col in required_columns if col not in data.columns]
-            
-            if missing_columns:
-                st.error(f"Missing columns in CSV: {', '.join(missing_columns)}")
-                st.write("Please ensure your CSV file contains all required columns.")
-            else:
-                applied_thresholds = {k: v for k, v in thresholds.items() if threshold_checks[k]}
-                processed_data = process_data(data, applied_thresholds, older_than)
-                if output_mode == "Show only URLs with actions":
-                    action_data = processed_data[processed_data['Action'] != 'Geen actie']
-                else:
-                    action_data = processed_data
-                display_results(action_data)
-        except Exception as e:
-            st.error(f"Failed to process CSV file: {str(e)}")
-            st.write("Error details:", traceback.format_exc())
-    elif start_button and uploaded_file is None:
-        st.error("Please upload a CSV file before starting the process.")
-
-if __name__ == "__main__":
-    main()
+import streamlit as st
+import pandas as pd
+import traceback
+
+from performance_panel import page_recorder, performance_panel, remember_run
+from seo_tools.dates import parse_dates
+from seo_tools.ingest import read_csv
+from seo_tools.instrument import recording, stage
+from seo_tools.pruning import compile_rules, delete_mask
+
+## Data Processing Functions
+
+def process_data(data, thresholds, older_than_date):
+    data['Average position'] = data['Average position'].astype(float)
+    # Day-first, each distinct date string parsed once
+    parsed = parse_dates(data['Laatste wijziging'])
+    data['Laatste wijziging'] = parsed.dates.dt.date
+    data.attrs['unparsed_dates'] = parsed.unparsed
+    data['Unique Inlinks'] = data['Unique Inlinks'].astype(int)
+
+    with stage('apply rules', rows=len(data)):
+        rules = compile_rules(thresholds, data.columns)
+        data['To Delete'] = delete_mask(data, rules, older_than_date, dates=parsed.dates)
+        data['Backlinks controleren'] = (data['To Delete'] & (data['Ahrefs Backlinks - Exact'] > thresholds.get('Backlinks', float('inf'))))
+        data['Action'] = 'Geen actie'
+        data.loc[data['To Delete'], 'Action'] = 'Verwijderen'
+        data.loc[data['Backlinks controleren'], 'Action'] = 'Backlinks controleren'
+    return data
+
+## UI Setup Functions
+
+def setup_ui():
+    st.title("Patrick's Cleanup Tool")
+    st.markdown("Hier onder kun je aangeven waar je post :blue-background[minimaal] aan moet voldoen om :blue-background[niet] in aanmerking te komen voor verwijdering.")
+    st.markdown("Wanneer je dus een waarde van 1000 invult bij Sessions komen alle URLs met minder dan 1000 sessie in aanmerking voor verwijderen (als alle overige metrics ook kloppen)")
+    st.markdown("Maak een kopie van het template hieronder en vul deze met jouw data. ")
+    st.markdown("Vervolgens kun je hem hierboven uploaden en zal de tool aan de hand van de door jou ingestelde criteria de URLs die wegkunnen markeren")
+    st.markdown("[het template hieronder](https://docs.google.com/spreadsheets/d/1GtaLaXO62Rf8Xo2gNiw6wkAXrHoE-bBJr8Uf3_e8lNw/edit?usp=sharing)")
+
+def display_results(data):
+    if data.empty:
+        st.write("No URLs require action.")
+    else:
+        st.dataframe(data)
+        with stage('export csv', rows=len(data)):
+            csv_string = data.to_csv(index=False)
+        st.download_button(
+            label="Download CSV",
+            data=csv_string,
+            file_name="processed_data.csv",
+            mime="text/csv"
+        )
+
+## Main Application Logic
+
+def run_pruning(uploaded_file, thresholds, threshold_checks, older_than, output_mode):
+    # Read the CSV; encoding and delimiter are detected automatically
+    data = read_csv(uploaded_file)
+
+    required_columns = ['Sessions', 'Views', 'Clicks', 'Impressions', 'Average position', 'Ahrefs Backlinks - Exact', 'Word Count', 'Laatste wijziging', 'Unique Inlinks']
+    missing_columns = [col for col in required_columns if col not in data.columns]
+
+    if missing_columns:
+        st.error(f"Missing columns in CSV: {', '.join(missing_columns)}")
+        st.write("Please ensure your CSV file contains all required columns.")
+    else:
+        applied_thresholds = {k: v for k, v in thresholds.items() if threshold_checks[k]}
+        processed_data = process_data(data, applied_thresholds, older_than)
+        if processed_data.attrs.get('unparsed_dates'):
+            st.warning(f"{processed_data.attrs['unparsed_dates']} values in 'Laatste wijziging' are not a recognised date.")
+        if output_mode == "Show only URLs with actions":
+            action_data = processed_data[processed_data['Action'] != 'Geen actie']
+        else:
+            action_data = processed_data
+        display_results(action_data)
+
+def main():
+    setup_ui()
+    uploaded_file = st.file_uploader("Select CSV file", type="csv")
+    thresholds = {
+        'Sessions': st.number_input("Sessions", value=1000, min_value=0),
+        'Views': st.number_input("Views", value=1000, min_value=0),
+        'Clicks': st.number_input("Clicks", value=50, min_value=0),
+        'Impressions': st.number_input("Impressions", value=500, min_value=0),
+        'Average position': st.number_input("Average position", value=19.0, min_value=0.0),
+        'Backlinks': st.number_input("Backlinks", value=1, min_value=0),
+        'Word Count': st.number_input("Word Count", value=500, min_value=0),
+        'Unique Inlinks': st.number_input("Unique Inlinks", value=0, min_value=0),
+        'Ahrefs URL Rating - Exact': st.number_input("Ahrefs URL Rating - Exact", value=5, min_value=0),
+        'Ahrefs Keywords Top 3 - Exact': st.number_input("Ahrefs Keywords Top 3 - Exact", value=1, min_value=0),
+        'Ahrefs Keywords Top 10 - Exact': st.number_input("Ahrefs Keywords Top 10 - Exact", value=2, min_value=0),
+    }
+    older_than = st.date_input("Older than", value=pd.to_datetime("2023-01-01"))
+    threshold_checks = {}
+    for key in thresholds:
+        threshold_checks[key] = st.checkbox(f"Apply {key} threshold", value=True)
+    output_mode = st.radio("Output mode", ["Show all URLs", "Show only URLs with actions"])
+    start_button = st.button("Start Processing")
+    
+    if start_button and uploaded_file is not None:
+        recorder = page_recorder('content-pruning')
+        try:
+            with recording(recorder):
+                run_pruning(uploaded_file, thresholds, threshold_checks, older_than, output_mode)
+        except Exception as e:
+            st.error(f"Failed to process CSV file: {str(e)}")
+            st.write("Error details:", traceback.format_exc())
+        remember_run(recorder)
+    elif start_button and uploaded_file is None:
+        st.error("Please upload a CSV file before starting the process.")
+    performance_panel('content-pruning')
+
+if __name__ == "__main__":
+    main()
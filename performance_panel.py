@@ -0,0 +1,44 @@
+import os
+
+import streamlit as st
+
+from seo_tools.instrument import Recorder
+
+# Every run's stage records are also appended to this JSON lines file when it is set
+PERF_LOG = os.environ.get('PATRICKS_TOOLS_PERF_LOG')
+# tracemalloc slows every run in the process down several times, so peak memory is opt-in
+TRACE_MEMORY = os.environ.get('PATRICKS_TOOLS_TRACE_MEMORY', '') not in ('', '0')
+
+
+def page_recorder(tool: str) -> Recorder:
+    """A recorder for a page run: wall and CPU time and rows, plus peak memory if the panel asks for it."""
+    return Recorder(tool=tool, trace_memory=st.session_state.get(f'trace_memory_{tool}', TRACE_MEMORY))
+
+
+def remember_run(recorder: Recorder) -> None:
+    """Keep the run's records for the Performance panel across reruns."""
+    st.session_state[f'performance_{recorder.tool}'] = recorder
+    if PERF_LOG:
+        recorder.write_jsonl(PERF_LOG)
+
+
+def performance_panel(tool: str) -> None:
+    """Collapsible table of the last run's stages: wall and CPU time, peak memory and rows."""
+    recorder = st.session_state.get(f'performance_{tool}')
+    with st.expander("Performance"):
+        st.checkbox("Measure peak memory (makes runs several times slower)", value=TRACE_MEMORY, key=f'trace_memory_{tool}')
+        if recorder is None or not recorder.records:
+            st.caption("Nog geen run gemeten.")
+            return
+        st.dataframe(recorder.summary(), hide_index=True, column_config={
+            'wall_seconds': st.column_config.NumberColumn("Wall (s)", format="%.3f"),
+            'cpu_seconds': st.column_config.NumberColumn("CPU (s)", format="%.3f"),
+            'peak_mb': st.column_config.NumberColumn("Peak (MB)", format="%.1f"),
+        })
+        st.download_button(
+            label="Download JSON lines",
+            data=recorder.to_jsonl(),
+            file_name=f"performance_{tool}_{recorder.run_id}.jsonl",
+            mime="application/jsonl",
+            on_click="ignore",
+        )
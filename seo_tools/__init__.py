@@ -0,0 +1 @@
+"""Streamlit-free building blocks shared by Patrick's SEO tools."""
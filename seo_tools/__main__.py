@@ -0,0 +1,5 @@
+import sys
+
+from seo_tools.cli import main
+
+sys.exit(main())
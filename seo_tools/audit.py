@@ -0,0 +1,128 @@
+"""Page-level SEO audit fields shared by the sequential and concurrent crawlers in main.py."""
+import csv
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+from urllib.parse import urlparse
+
+from seo_tools.extract import extract_page
+from seo_tools.http_cache import NOT_MODIFIED, HttpCache
+from seo_tools.neardup import encode_signature, minhash
+
+AUDIT_COLUMNS = ['URL', 'Domain', 'Page Title', 'Meta Description', 'Header Tags', 'Image Tags', 'Internal Links', 'External Links', 'Social Media Links', 'Canonical URL', 'Robots.txt', 'Sitemap.xml', 'Page Speed', 'Mobile Friendly', 'SSL', 'SSL Expiration', 'SSL Issuer', 'SSL Validity', 'SSL Rating', 'SEO Score', 'SEO Rating', 'SEO Recommendations', 'SEO Score (out of 100)', 'Content MinHash']
+
+PAGE_SPEED_ENDPOINT = "https://gtmetrix.com/api/0.1/test?url={url}"
+MOBILE_FRIENDLY_ENDPOINT = "https://search.google.com/test/mobile-friendly?url={url}"
+SSL_ENDPOINT = "https://api.ssllabs.com/api/v3/analyze?host={domain}"
+# Columns filled from the page HTML by extract_page_fields
+PAGE_FIELDS = ['Page Title', 'Meta Description', 'Header Tags', 'Image Tags', 'Internal Links', 'External Links', 'Social Media Links', 'Canonical URL', 'Content MinHash']
+# Responses worth another attempt; anything else is returned to the caller as-is.
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def empty_result(url: str) -> Dict[str, Any]:
+    result = {column: '' for column in AUDIT_COLUMNS}
+    for column in ('Header Tags', 'Image Tags', 'Internal Links', 'External Links', 'Social Media Links'):
+        result[column] = []
+    result['URL'] = url
+    result['Domain'] = urlparse(url).netloc
+    return result
+
+
+def site_root(url: str) -> str:
+    """Return ``scheme://host`` for ``url``, where robots.txt and sitemap.xml live.
+
+    URLs without a scheme have no host to key on and are returned unchanged.
+    """
+    parsed = urlparse(url)
+    if not parsed.netloc:
+        return url
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def extract_page_fields(url: str, html: str, result: Dict[str, Any], backend: str = 'html.parser') -> None:
+    """Fill the on-page fields of ``result`` from the page HTML in a single parse."""
+    try:
+        fields = extract_page(html, backend)
+    except Exception as e:
+        print(f"Error parsing page for {url}: {e}")
+        return
+    result['Page Title'] = fields.title or ''
+    result['Meta Description'] = fields.meta_description or ''
+    result['Header Tags'] = fields.headings
+    result['Image Tags'] = fields.images
+    result['Internal Links'] = fields.internal_links
+    result['External Links'] = fields.external_links
+    result['Social Media Links'] = fields.social_media_links
+    result['Canonical URL'] = fields.canonical_url or ''
+    # The text itself is not kept; its signature is enough to find near-duplicate pages
+    result['Content MinHash'] = encode_signature(minhash(fields.text))
+
+
+def audit_page(url: str, status: int, headers: Mapping[str, str], html: str, result: Dict[str, Any],
+               backend: str = 'html.parser', http_cache: Optional[HttpCache] = None,
+               fields: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Fill the on-page fields of ``result`` from a page response, reusing ``http_cache`` on a 304.
+
+    ``fields`` are the on-page fields when ``html`` was already parsed elsewhere
+    (see ``seo_tools.parse_pool``). Returns an error when a 304 arrives for a
+    page the cache no longer has.
+    """
+    if http_cache is not None and status == NOT_MODIFIED:
+        cached = http_cache.not_modified(url)
+        if cached is None:
+            return "HTTP 304 for a page that is not cached"
+        if cached.parser == backend:
+            result.update(cached.fields)
+        else:
+            extract_page_fields(url, cached.body, result, backend)
+        return None
+    if fields is not None:
+        result.update(fields)
+    else:
+        extract_page_fields(url, html, result, backend)
+    if http_cache is not None and status == 200:
+        http_cache.store(url, headers, html, {column: result[column] for column in PAGE_FIELDS}, backend)
+    return None
+
+
+def lookup_body(url: str, status: int, body: str) -> str:
+    """``body`` of a successful response; an error page raises, so it is neither stored nor cached."""
+    if not 200 <= status < 300:
+        raise ValueError(f"HTTP {status} from {url}")
+    return body
+
+
+def ssl_ready(ssl_info: Any) -> bool:
+    """Whether an SSL Labs ``analyze`` response is finished; DNS and IN_PROGRESS ones have no certificate yet."""
+    return isinstance(ssl_info, dict) and ssl_info.get('status') == 'READY'
+
+
+def extract_ssl_fields(url: str, ssl_info: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    """Fill the SSL fields of ``result`` from an SSL Labs ``analyze`` response."""
+    try:
+        result['SSL'] = ssl_info['status']
+        result['SSL Expiration'] = ssl_info['cert']['notAfter']
+        result['SSL Issuer'] = ssl_info['cert']['issuerDN']
+        result['SSL Validity'] = ssl_info['cert']['validity']
+        result['SSL Rating'] = ssl_info['rating']
+    except Exception as e:
+        print(f"Error getting SSL information for {url}: {e}")
+
+
+def extract_page_speed(url: str, report: Optional[Dict[str, Any]], result: Dict[str, Any]) -> None:
+    try:
+        result['Page Speed'] = report['reports']['lighthouse']['data']['score']
+    except Exception as e:
+        print(f"Error getting page speed for {url}: {e}")
+
+
+def audit_row(result: Dict[str, Any]) -> List[Any]:
+    # Results journaled or cached before a column was added leave it empty
+    return [result.get(column, '') for column in AUDIT_COLUMNS]
+
+
+def read_urls(file_path: str) -> Iterator[str]:
+    """The URLs in the first column of ``file_path``, one per row."""
+    with open(file_path, 'r', encoding='utf-8') as input_file:
+        for row in csv.reader(input_file):
+            if row and row[0].strip():
+                yield row[0].strip()
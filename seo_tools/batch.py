@@ -0,0 +1,189 @@
+"""Streamlit-free API for running the pruning, merge, convert, dedup and link graph tools on files.
+
+Every job function reads its inputs from disk and writes its outputs there,
+and returns a small summary dict. ``run_jobs`` runs many of them in a process
+pool, one job per client site or file. Nothing here imports streamlit.
+"""
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from seo_tools.convert import convert_stream
+from seo_tools.dedup import KEY_ROW, dedup_csvs
+from seo_tools.delta import load_baseline, prune_delta, save_baseline
+from seo_tools.ingest import exceeds_memory_budget, read_csv, read_header
+from seo_tools.instrument import Recorder, recording
+from seo_tools.linkgraph import DEPTH_COLUMN, audit_link_graph, link_metrics
+from seo_tools.merge import merge_external, merge_frames, prepare_frame, source_names
+from seo_tools.neardup import DEFAULT_SIMILARITY, audit_clusters
+from seo_tools.pruning import DATE_COLUMN, DEFAULT_THRESHOLDS, compact, normalize_columns, prepare_data, prune_csv
+
+
+def near_duplicate_clusters_file(audit: str, similarity: float = DEFAULT_SIMILARITY) -> pd.DataFrame:
+    """Near-duplicate clusters of the pages in a main.py audit CSV."""
+    return audit_clusters(pd.read_csv(audit, usecols=['URL', 'Content MinHash'], dtype=str), similarity)
+
+
+def prune_file(source: str, target: str, thresholds: Optional[Dict[str, float]] = None,
+               older_than_date: Optional[datetime.date] = None, actions_only: bool = False,
+               near_duplicates: Optional[str] = None, similarity: float = DEFAULT_SIMILARITY,
+               link_graph: Optional[str] = None) -> Dict[str, Any]:
+    """Mark the URLs in ``source`` for deletion, like the pruning page, and write them to ``target``.
+
+    With ``near_duplicates``, a main.py audit CSV of the same site, the
+    near-duplicate cluster and similarity columns are added first. With
+    ``link_graph``, also an audit CSV, so are the unique inlinks, internal
+    PageRank and click depth computed from its internal links.
+    """
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    columns = normalize_columns(pd.DataFrame(columns=read_header(source))).columns
+    if DATE_COLUMN not in columns:
+        raise ValueError(f"Missing column in CSV: {DATE_COLUMN}")
+    page_columns = []
+    if near_duplicates:
+        page_columns.append(near_duplicate_clusters_file(near_duplicates, similarity))
+    if link_graph:
+        page_columns.append(link_metrics(audit_link_graph([link_graph])))
+    page_columns = pd.concat(page_columns, axis=1) if page_columns else None
+    if page_columns is not None:
+        columns = columns.union(page_columns.columns, sort=False)
+    counts = prune_csv(source, target, thresholds, older_than_date, actions_only, page_columns=page_columns)
+    # The page refuses files without a threshold's column; here the threshold is skipped and reported
+    counts['skipped_thresholds'] = [key for key in thresholds if key not in columns]
+    return counts
+
+
+def prune_delta_file(source: str, target: str, baseline: str, thresholds: Optional[Dict[str, float]] = None,
+                     older_than_date: Optional[datetime.date] = None, actions_only: bool = False) -> Dict[str, Any]:
+    """``prune_file`` for a new export of a site pruned before, reprocessing only the rows that changed.
+
+    Compares with the baseline file ``baseline`` and replaces it afterwards.
+    URLs that are new, removed or changed Action are written to
+    ``<target>_diff.csv``. Unlike ``prune_file`` the export is read whole.
+    """
+    thresholds = DEFAULT_THRESHOLDS if thresholds is None else thresholds
+    with open(source, 'rb') as f:
+        data = compact(prepare_data(normalize_columns(read_csv(f))))
+    if DATE_COLUMN not in data.columns:
+        raise ValueError(f"Missing column in CSV: {DATE_COLUMN}")
+    delta = prune_delta(data, thresholds, older_than_date, load_baseline(baseline))
+    processed = delta.result.dropna(subset=[DATE_COLUMN])
+    counts = {'total': len(processed), 'unparsed_dates': data.attrs.get('unparsed_dates', 0)}
+    for action in ('Verwijderen', 'Backlinks controleren'):
+        counts[action] = int((processed['Action'] == action).sum())
+    if actions_only:
+        processed = processed[processed['Action'] != 'Geen actie']
+    processed.to_csv(target, index=False)
+    delta.report.to_csv(f"{os.path.splitext(target)[0]}_diff.csv", index=False)
+    save_baseline(delta.baseline, baseline)
+    counts.update(new=delta.new, removed=delta.removed, changed=delta.changed, reprocessed=delta.reprocessed,
+                  action_changes=len(delta.report))
+    counts['skipped_thresholds'] = [key for key in thresholds if key not in data.columns]
+    return counts
+
+
+def link_graph_file(sources: Sequence[str], target: str) -> Dict[str, Any]:
+    """Write the unique inlinks, internal PageRank and click depth of the pages in main.py audit CSVs to ``target``."""
+    graph = audit_link_graph(sources)
+    metrics = link_metrics(graph)
+    metrics.to_csv(target, index_label='URL')
+    return {'pages': len(metrics), 'urls': graph.nodes, 'links': graph.edges,
+            'unreachable': int(metrics[DEPTH_COLUMN].isna().sum())}
+
+
+def convert_file(source: str, target: str, delimiter: str = ',') -> Dict[str, Any]:
+    with open(source, 'rb') as source_file, open(target, 'wb') as target_file:
+        return {'rows': convert_stream(source_file, target_file, delimiter=delimiter)}
+
+
+def dedup_files(sources: Sequence[str], target: str, key: str = KEY_ROW, columns: Optional[Sequence[str]] = None,
+                partitions: int = 0) -> Dict[str, Any]:
+    stats = dedup_csvs(list(sources), target, key=key, columns=columns, partitions=partitions,
+                       workdir=os.path.dirname(target) or None)
+    return {**asdict(stats), 'duplicates': stats.duplicates}
+
+
+def merge_files(sources: Sequence[str], output_dir: str, memory_budget: Optional[int] = None) -> Dict[str, Any]:
+    """Merge ``sources`` on their URL column into ``merged.csv`` and ``unmatched_<name>.csv`` files."""
+    os.makedirs(output_dir, exist_ok=True)
+    names = source_names(sources)
+    if memory_budget is not None and exceeds_memory_budget(sum(os.path.getsize(source) for source in sources), memory_budget):
+        result = merge_external(list(sources), names, output_dir, memory_budget)
+        return {'matched_rows': result.matched_rows, 'unmatched_rows': result.unmatched_rows, 'external': True}
+
+    frames, keys = [], []
+    for source, name in zip(sources, names):
+        with open(source, 'rb') as f:
+            frame = read_csv(f)
+        try:
+            key, _ = prepare_frame(frame)
+        except ValueError:
+            raise ValueError(f"URL column not found in {name}")
+        frames.append(frame)
+        keys.append(key)
+    result = merge_frames(frames, keys, names)
+    result.merged.to_csv(os.path.join(output_dir, 'merged.csv'), index=False)
+    for name, rows in result.unmatched.items():
+        rows.to_csv(os.path.join(output_dir, f"unmatched_{name}.csv"), index=False)
+    return {'matched_rows': len(result.merged), 'unmatched_rows': {name: len(rows) for name, rows in result.unmatched.items()},
+            'external': False}
+
+
+@dataclass
+class JobResult:
+    name: str
+    output: str
+    seconds: float = 0.0
+    summary: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class Job:
+    name: str
+    output: str
+    function: Callable[..., Dict[str, Any]]
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    # JSON lines file the job's stage timings and memory peaks are appended to
+    profile: Optional[str] = None
+
+
+def _call(job: Job) -> Dict[str, Any]:
+    if job.profile is None:
+        return job.function(*job.args, **job.kwargs)
+    recorder = Recorder(tool=f"{job.function.__name__}:{job.name}")
+    try:
+        with recording(recorder):
+            return job.function(*job.args, **job.kwargs)
+    finally:
+        recorder.write_jsonl(job.profile)
+
+
+def _run(job: Job) -> JobResult:
+    start = time.perf_counter()
+    try:
+        summary = _call(job)
+        return JobResult(job.name, job.output, time.perf_counter() - start, summary)
+    except Exception as e:
+        return JobResult(job.name, job.output, time.perf_counter() - start, error=f"{type(e).__name__}: {e}")
+
+
+def run_jobs(jobs: List[Job], workers: Optional[int] = None) -> Iterator[JobResult]:
+    """Run ``jobs`` in a process pool of ``workers`` processes and yield their results as they finish.
+
+    With one worker (or one job) the jobs run in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            yield _run(job)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        for future in as_completed([pool.submit(_run, job) for job in jobs]):
+            yield future.result()
@@ -0,0 +1,91 @@
+"""Domain-keyed cache for the per-site lookups of the SEO audit (robots.txt, sitemap.xml, SSL).
+
+Entries live in a size-bounded in-memory LRU and, when a path is given, in a
+sqlite file so a rerun of the audit does not fetch them again. Both tiers
+expire entries after ``ttl`` seconds.
+"""
+import json
+import sqlite3
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+
+class DomainCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 24 * 3600, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._memory: 'OrderedDict[Tuple[str, str], Tuple[float, Any]]' = OrderedDict()
+        self.hits: Counter = Counter()
+        self.disk_hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS domain_cache ("
+                             "kind TEXT NOT NULL, domain TEXT NOT NULL, expires REAL NOT NULL, value TEXT NOT NULL, "
+                             "PRIMARY KEY (kind, domain))")
+            self._db.execute("DELETE FROM domain_cache WHERE expires < ?", (time.time(),))
+            self._db.commit()
+
+    def get(self, kind: str, domain: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss. Every call counts as a hit or a miss."""
+        key = (kind, domain)
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] >= now:
+                self._memory.move_to_end(key)
+                self.hits[kind] += 1
+                return entry[1]
+            del self._memory[key]
+        if self._db is not None:
+            row = self._db.execute("SELECT expires, value FROM domain_cache WHERE kind = ? AND domain = ?", key).fetchone()
+            if row is not None and row[0] >= now:
+                value = json.loads(row[1])
+                self._remember(key, row[0], value)
+                self.hits[kind] += 1
+                self.disk_hits[kind] += 1
+                return value
+        self.misses[kind] += 1
+        return None
+
+    def get_or_load(self, kind: str, domain: str, load: Callable[[], Any],
+                    cacheable: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        """Return the cached value or call ``load`` and cache its result.
+
+        Errors are not cached, and neither are results ``cacheable`` rejects,
+        such as a lookup that is not finished yet.
+        """
+        if not domain:
+            return load()
+        value = self.get(kind, domain)
+        if value is None:
+            value = load()
+            if cacheable(value):
+                self.set(kind, domain, value)
+        return value
+
+    def set(self, kind: str, domain: str, value: Any) -> None:
+        expires = time.time() + self.ttl
+        self._remember((kind, domain), expires, value)
+        if self._db is not None:
+            self._db.execute("INSERT OR REPLACE INTO domain_cache (kind, domain, expires, value) VALUES (?, ?, ?, ?)",
+                             (kind, domain, expires, json.dumps(value)))
+            self._db.commit()
+
+    def _remember(self, key: Tuple[str, str], expires: float, value: Any) -> None:
+        self._memory[key] = (expires, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def summary(self) -> str:
+        kinds = sorted(set(self.hits) | set(self.misses))
+        parts = [f"{kind} {self.hits[kind]} hits ({self.disk_hits[kind]} from disk) / {self.misses[kind]} misses" for kind in kinds]
+        return "Domain cache: " + ("; ".join(parts) if parts else "not used")
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,185 @@
+"""Command line entry point for nightly batch runs, without Streamlit.
+
+    python -m seo_tools prune exports/*.csv -o pruned/ --older-than 2023-01-01 -j 8
+    python -m seo_tools convert exports/*.csv -o converted/
+    python -m seo_tools dedup clients/*/ -o deduplicated/ --key url
+    python -m seo_tools merge clients/*/ -o merged/
+    python -m seo_tools prune exports/*.csv -o pruned/ --profile runs.jsonl
+    python -m seo_tools prune exports/2026-10.csv -o pruned/ --baseline baselines/site.parquet
+    python -m seo_tools prune exports/*.csv -o pruned/ --near-duplicates audit.csv --threshold "Near-duplicate similarity=0.9"
+    python -m seo_tools links audit.csv -o links/
+    python -m seo_tools prune exports/*.csv -o pruned/ --link-graph audit.csv --threshold "Click Depth=4"
+
+prune and convert run one job per file. dedup, merge and links take either files,
+which form a single job, or directories, each of which is one job over the
+CSV files in it (for example one directory per client site). With
+--baseline, prune compares the export with the previous run of the same site
+and only reprocesses the rows that changed. links computes unique inlinks,
+internal PageRank and click depth from the internal links in main.py audits.
+"""
+import argparse
+import datetime
+import glob
+import os
+import sys
+from typing import List, Optional, Tuple
+
+from seo_tools.batch import Job, convert_file, dedup_files, link_graph_file, merge_files, prune_delta_file, prune_file, run_jobs
+from seo_tools.dedup import KEY_COLUMNS, KEYS, KEY_ROW
+from seo_tools.merge import source_names
+from seo_tools.neardup import DEFAULT_SIMILARITY
+from seo_tools.pruning import DEFAULT_THRESHOLDS
+
+
+def _names(paths: List[str]) -> List[str]:
+    # Same-named inputs from different directories get _2, _3, ... so their outputs do not overwrite each other
+    return source_names([os.path.normpath(path) for path in paths])
+
+
+def _groups(inputs: List[str]) -> List[Tuple[str, List[str]]]:
+    """``(name, files)`` per job: directories are one group each; plain files together form one group."""
+    directories = [path for path in inputs if os.path.isdir(path)]
+    if directories and len(directories) != len(inputs):
+        raise SystemExit("Pass either CSV files or directories, not both")
+    if not directories:
+        return [('all', inputs)]
+    groups = []
+    for name, directory in zip(_names(directories), directories):
+        files = sorted(glob.glob(os.path.join(directory, '*.csv')))
+        if not files:
+            raise SystemExit(f"No CSV files in {directory}")
+        groups.append((name, files))
+    return groups
+
+
+def parse_threshold(value: str):
+    key, _, number = value.partition('=')
+    if not number:
+        raise argparse.ArgumentTypeError(f"Expected COLUMN=VALUE, got {value!r}")
+    return key.strip(), float(number) if '.' in number else int(number)
+
+
+def prune_jobs(args) -> List[Job]:
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    thresholds.update(dict(args.threshold))
+    for key in args.skip_threshold:
+        thresholds.pop(key, None)
+    older_than = None if args.older_than == 'none' else datetime.date.fromisoformat(args.older_than)
+    kwargs = {'thresholds': thresholds, 'older_than_date': older_than, 'actions_only': args.actions_only}
+    if args.near_duplicates:
+        if args.baseline:
+            raise SystemExit("--near-duplicates cannot be combined with --baseline")
+        kwargs.update(near_duplicates=args.near_duplicates, similarity=args.similarity)
+    if args.link_graph:
+        if args.baseline:
+            raise SystemExit("--link-graph cannot be combined with --baseline")
+        kwargs.update(link_graph=args.link_graph)
+    if args.baseline:
+        # One baseline belongs to one site's series of exports
+        if len(args.inputs) != 1:
+            raise SystemExit("--baseline takes a single export")
+        source = args.inputs[0]
+        output = os.path.join(args.output_dir, f"{_names([source])[0]}_pruned.csv")
+        return [Job(source, output, prune_delta_file, args=(source, output, args.baseline), kwargs=kwargs)]
+    jobs = []
+    for name, source in zip(_names(args.inputs), args.inputs):
+        output = os.path.join(args.output_dir, f"{name}_pruned.csv")
+        jobs.append(Job(source, output, prune_file, args=(source, output), kwargs=kwargs))
+    return jobs
+
+
+def convert_jobs(args) -> List[Job]:
+    jobs = []
+    for name, source in zip(_names(args.inputs), args.inputs):
+        output = os.path.join(args.output_dir, f"{name}.csv")
+        jobs.append(Job(source, output, convert_file, args=(source, output), kwargs={'delimiter': args.delimiter}))
+    return jobs
+
+
+def dedup_jobs(args) -> List[Job]:
+    if args.key == KEY_COLUMNS and not args.columns:
+        raise SystemExit("--key columns needs --columns")
+    jobs = []
+    for name, group in _groups(args.inputs):
+        output = os.path.join(args.output_dir, f"{name}_deduplicated.csv")
+        jobs.append(Job(name, output, dedup_files, args=(group, output),
+                        kwargs={'key': args.key, 'columns': args.columns, 'partitions': args.partitions}))
+    return jobs
+
+
+def merge_jobs(args) -> List[Job]:
+    budget = args.memory_budget * 1024 * 1024 if args.memory_budget else None
+    jobs = []
+    for name, group in _groups(args.inputs):
+        output = os.path.join(args.output_dir, name)
+        jobs.append(Job(name, output, merge_files, args=(group, output), kwargs={'memory_budget': budget}))
+    return jobs
+
+
+def links_jobs(args) -> List[Job]:
+    jobs = []
+    for name, group in _groups(args.inputs):
+        output = os.path.join(args.output_dir, f"{name}_links.csv")
+        jobs.append(Job(name, output, link_graph_file, args=(group, output)))
+    return jobs
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m seo_tools', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def command(name: str, help_text: str, jobs) -> argparse.ArgumentParser:
+        sub = commands.add_parser(name, help=help_text)
+        sub.add_argument('inputs', nargs='+', help="CSV files (or, for dedup, merge and links, directories of CSV files)")
+        sub.add_argument('-o', '--output-dir', required=True, help="Directory to write the results to")
+        sub.add_argument('-j', '--workers', type=int, default=None, help="Parallel processes (default: one per CPU)")
+        sub.add_argument('--profile', metavar='FILE', help="Append per-stage timings and memory peaks to this JSON lines file")
+        sub.set_defaults(jobs=jobs)
+        return sub
+
+    prune = command('prune', "Mark URLs for deletion, like the content pruning page", prune_jobs)
+    prune.add_argument('--threshold', type=parse_threshold, action='append', default=[], metavar='COLUMN=VALUE',
+                       help="Override a default threshold, e.g. 'Sessions=500' (repeatable)")
+    prune.add_argument('--skip-threshold', action='append', default=[], metavar='COLUMN', help="Do not apply this threshold (repeatable)")
+    prune.add_argument('--older-than', default='2023-01-01', help="Only URLs last modified before this date (YYYY-MM-DD, or 'none')")
+    prune.add_argument('--actions-only', action='store_true', help="Only write URLs with an action")
+    prune.add_argument('--near-duplicates', metavar='AUDIT_CSV', help="main.py audit of the site; adds near-duplicate cluster "
+                                                                      "and similarity columns that --threshold can use")
+    prune.add_argument('--similarity', type=float, default=DEFAULT_SIMILARITY, help="With --near-duplicates: similarity (0-1) "
+                                                                                  "from which pages count as near-duplicates")
+    prune.add_argument('--link-graph', metavar='AUDIT_CSV', help="main.py audit of the site; adds Unique Inlinks, Internal PageRank "
+                                                                 "and Click Depth computed from its internal links")
+    prune.add_argument('--baseline', metavar='FILE', help="Previous run of this site (created if missing); only changed rows are "
+                                                          "reprocessed and a _diff.csv lists the URLs whose Action changed")
+
+    convert = command('convert', "Re-delimit CSV files", convert_jobs)
+    convert.add_argument('--delimiter', default=',', help="Output delimiter")
+
+    dedup = command('dedup', "Remove duplicate rows", dedup_jobs)
+    dedup.add_argument('--key', choices=KEYS, default=KEY_ROW, help="What makes rows duplicates")
+    dedup.add_argument('--columns', nargs='+', help="Key columns for --key columns")
+    dedup.add_argument('--partitions', type=int, default=0, help="Spill to this many partitions on disk first")
+
+    merge = command('merge', "Merge CSV files on their URL column", merge_jobs)
+    merge.add_argument('--memory-budget', type=int, default=None, help="MB; larger inputs are merged in partitions on disk")
+
+    command('links', "Unique inlinks, internal PageRank and click depth from main.py audits", links_jobs)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    os.makedirs(args.output_dir, exist_ok=True)
+    jobs = args.jobs(args)
+    for job in jobs:
+        job.profile = args.profile
+    failed = 0
+    for result in run_jobs(jobs, args.workers):
+        if result.error:
+            failed += 1
+            print(f"FAILED {result.name}: {result.error}", file=sys.stderr)
+        else:
+            print(f"ok     {result.name} -> {result.output} ({result.seconds:.1f}s) {result.summary}")
+    print(f"{len(jobs) - failed} of {len(jobs)} jobs succeeded")
+    return 1 if failed else 0
@@ -0,0 +1,61 @@
+"""Streaming CSV re-delimiting for the CSV Delimiter Converter.
+
+The encoding and dialect are detected from a bounded sample at the start of
+the file. Rows are then streamed through the csv module in fixed-size batches,
+so memory use does not grow with the size of the input.
+"""
+import csv
+import io
+import itertools
+from typing import BinaryIO
+
+from seo_tools.ingest import detect_encoding, read_sample, sniff_dialect
+from seo_tools.instrument import stage
+
+BATCH_ROWS = 10_000
+
+
+def _redelimit(source: BinaryIO, target: BinaryIO, encoding: str, dialect: type, delimiter: str, batch_rows: int) -> int:
+    text_source = io.TextIOWrapper(source, encoding=encoding, newline='')
+    text_target = io.TextIOWrapper(target, encoding='utf-8', newline='')
+    reader = csv.reader(text_source, dialect)
+    writer = csv.writer(text_target, delimiter=delimiter, lineterminator='\n')
+    rows = 0
+    try:
+        while True:
+            batch = list(itertools.islice(reader, batch_rows))
+            if not batch:
+                break
+            batch = [row for row in batch if row]
+            writer.writerows(batch)
+            rows += len(batch)
+    finally:
+        # Detach so the wrappers do not close the caller's streams
+        text_target.flush()
+        text_target.detach()
+        text_source.detach()
+    return rows
+
+
+def convert_stream(source: BinaryIO, target: BinaryIO, delimiter: str = ',', batch_rows: int = BATCH_ROWS) -> int:
+    """Re-delimit the CSV in ``source`` into ``target`` (UTF-8) and return the number of rows written.
+
+    Both streams are binary and ``source`` must be seekable. If the input turns
+    out not to be UTF-8 after the sample, the conversion restarts as latin-1.
+    """
+    with stage('sniff'):
+        sample = read_sample(source)
+        encoding = detect_encoding(sample)
+        dialect = sniff_dialect(sample.decode(encoding, errors='ignore'))
+    start = target.tell()
+    with stage('redelimit') as converting:
+        try:
+            converting.rows = _redelimit(source, target, encoding, dialect, delimiter, batch_rows)
+        except UnicodeDecodeError:
+            if encoding == 'latin-1':
+                raise
+            source.seek(0)
+            target.seek(start)
+            target.truncate()
+            converting.rows = _redelimit(source, target, 'latin-1', dialect, delimiter, batch_rows)
+    return converting.rows
@@ -0,0 +1,319 @@
+"""Concurrent asyncio crawler for the main.py SEO audit.
+
+URLs are fetched by a fixed pool of workers sharing one aiohttp session. The
+session's connector pools keep-alive connections per host and enforces both the
+global and the per-host concurrency limit. With ``parse_workers`` set, page
+HTML is parsed in a process pool (``seo_tools.parse_pool``) instead of on the
+event loop. Finished URLs go through a bounded queue to a single writer task,
+which writes each row to the output CSV as soon as the URL is done, so the
+output is in completion order; with a checkpoint journal it is rewritten in
+input order once the crawl is done.
+"""
+import asyncio
+import csv
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Mapping, Optional, Tuple, Union
+
+import aiohttp
+
+from seo_tools.audit import AUDIT_COLUMNS, MOBILE_FRIENDLY_ENDPOINT, PAGE_SPEED_ENDPOINT, RETRY_STATUSES, SSL_ENDPOINT, audit_page, audit_row, empty_result, extract_page_speed, extract_ssl_fields, lookup_body, read_urls, site_root, ssl_ready
+from seo_tools.cache import DomainCache
+from seo_tools.http_cache import ACCEPT_ENCODING, NOT_MODIFIED, HttpCache
+from seo_tools.journal import CrawlJournal, CrawlPlan, CrawlPlanner, RetryPolicy
+from seo_tools.parse_pool import ParsePool
+from seo_tools.sitemaps import SitemapStats, discover_urls, is_url
+
+
+@dataclass
+class CrawlSettings:
+    concurrency: int = 50
+    per_host: int = 4
+    timeout: float = 30.0
+    connect_timeout: float = 10.0
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    user_agent: Optional[str] = None
+    # 'html.parser', 'lxml' or 'auto' (lxml when installed)
+    parser_backend: str = 'html.parser'
+    # Processes parsing page HTML; 0 parses on the event loop
+    parse_workers: int = 0
+    # Third-party checks; set an endpoint to None to skip that check.
+    page_speed_endpoint: Optional[str] = PAGE_SPEED_ENDPOINT
+    mobile_friendly_endpoint: Optional[str] = MOBILE_FRIENDLY_ENDPOINT
+    ssl_endpoint: Optional[str] = SSL_ENDPOINT
+
+
+@dataclass
+class CrawlStats:
+    urls: int = 0
+    pages_failed: int = 0
+    requests: int = 0
+    retries: int = 0
+    failed_requests: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+    cache: Optional[DomainCache] = None
+    plan: Optional[CrawlPlan] = None
+    http_cache: Optional[HttpCache] = None
+    parse_pool: Optional[ParsePool] = None
+    sitemaps: Optional[SitemapStats] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> str:
+        rate = self.urls / self.elapsed if self.elapsed else 0.0
+        return (f"Crawled {self.urls} URLs in {self.elapsed:.1f}s ({rate:.1f} URLs/s), "
+                f"{self.pages_failed} pages failed; {self.requests} requests, "
+                f"{self.retries} retries, {self.failed_requests} failed requests"
+                + (f"\nPlan: {self.plan.summary()}" if self.plan is not None else "")
+                + (f"\n{self.cache.summary()}" if self.cache is not None else "")
+                + (f"\n{self.http_cache.summary()}" if self.http_cache is not None else "")
+                + (f"\n{self.parse_pool.summary()}" if self.parse_pool is not None else "")
+                + (f"\n{self.sitemaps.summary()}" if self.sitemaps is not None else ""))
+
+
+class Fetcher:
+    """GET requests over a shared session with retries and exponential backoff."""
+
+    def __init__(self, session: aiohttp.ClientSession, settings: CrawlSettings, stats: CrawlStats):
+        self.session = session
+        self.settings = settings
+        self.stats = stats
+
+    def _delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.settings.max_backoff)
+        delay = min(self.settings.backoff * 2 ** attempt, self.settings.max_backoff)
+        return delay * (0.5 + random.random())
+
+    async def fetch(self, url: str) -> Tuple[int, str]:
+        """Return ``(status, body)``. Raises the last error once retries are used up."""
+        status, body, _ = await self.fetch_response(url)
+        return status, body
+
+    async def fetch_response(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, str, Mapping[str, str]]:
+        """Return ``(status, body, response headers)``, retrying like ``fetch``."""
+        attempt = 0
+        while True:
+            self.stats.requests += 1
+            retry_after = None
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.settings.retries:
+                        retry_after = response.headers.get('Retry-After')
+                    else:
+                        return response.status, await response.text(errors='replace'), response.headers
+            except aiohttp.InvalidURL:
+                self.stats.failed_requests += 1
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= self.settings.retries:
+                    self.stats.failed_requests += 1
+                    raise
+            self.stats.retries += 1
+            await asyncio.sleep(self._delay(attempt, retry_after))
+            attempt += 1
+
+    async def fetch_text(self, url: str) -> str:
+        """The body of a 2xx response; other statuses raise."""
+        status, body = await self.fetch(url)
+        return lookup_body(url, status, body)
+
+    async def fetch_json(self, url: str) -> Any:
+        return json.loads(await self.fetch_text(url))
+
+
+class DomainLookups:
+    """Per-domain lookups through a DomainCache.
+
+    Concurrent workers asking for the same uncached domain share one request.
+    """
+
+    def __init__(self, cache: DomainCache):
+        self.cache = cache
+        self._pending: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    async def get(self, kind: str, domain: str, load: Callable[[], Awaitable[Any]],
+                  cacheable: Callable[[Any], bool] = lambda value: value is not None) -> Any:
+        if not domain:
+            return await load()
+        key = (kind, domain)
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.cache.hits[kind] += 1
+            return await pending
+        value = self.cache.get(kind, domain)
+        if value is not None:
+            return value
+        pending = asyncio.ensure_future(load())
+        self._pending[key] = pending
+        try:
+            value = await pending
+        finally:
+            del self._pending[key]
+        if cacheable(value):
+            self.cache.set(kind, domain, value)
+        return value
+
+
+async def audit_url(fetcher: Fetcher, lookups: DomainLookups, url: str, http_cache: Optional[HttpCache] = None,
+                    parse_pool: Optional[ParsePool] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """The URL's audit fields, and the error if the page itself could not be fetched."""
+    settings = fetcher.settings
+    page_headers = http_cache.request_headers(url) if http_cache is not None else None
+    result = empty_result(url)
+    domain = result['Domain']
+    root = site_root(url)
+
+    async def skipped():
+        return None
+
+    page, robots_txt, sitemap_xml, page_speed, mobile_friendly, ssl_info = await asyncio.gather(
+        fetcher.fetch_response(url, page_headers),
+        lookups.get('robots.txt', domain, lambda: fetcher.fetch_text(f"{root}/robots.txt")),
+        lookups.get('sitemap.xml', domain, lambda: fetcher.fetch_text(f"{root}/sitemap.xml")),
+        fetcher.fetch_json(settings.page_speed_endpoint.format(url=url)) if settings.page_speed_endpoint else skipped(),
+        fetcher.fetch_text(settings.mobile_friendly_endpoint.format(url=url)) if settings.mobile_friendly_endpoint else skipped(),
+        lookups.get('ssl', domain, lambda: fetcher.fetch_json(settings.ssl_endpoint.format(domain=domain)), ssl_ready) if settings.ssl_endpoint else skipped(),
+        return_exceptions=True,
+    )
+
+    error = None
+    if isinstance(page, BaseException):
+        fetcher.stats.pages_failed += 1
+        print(f"Error getting page for {url}: {page}")
+        error = f"{type(page).__name__}: {page}"
+    else:
+        status, body, headers = page
+        fields = None
+        if parse_pool is not None and status != NOT_MODIFIED:
+            fields = await parse_pool.parse(url, body)
+        error = audit_page(url, status, headers, body, result, settings.parser_backend, http_cache, fields)
+        if status in RETRY_STATUSES:
+            error = f"HTTP {status}"
+
+    for column, response in (('Robots.txt', robots_txt), ('Sitemap.xml', sitemap_xml), ('Mobile Friendly', mobile_friendly)):
+        if isinstance(response, BaseException):
+            print(f"Error getting {column} for {url}: {response}")
+        elif response is not None:
+            result[column] = response
+
+    if settings.page_speed_endpoint:
+        extract_page_speed(url, None if isinstance(page_speed, BaseException) else page_speed, result)
+    if settings.ssl_endpoint:
+        extract_ssl_fields(url, None if isinstance(ssl_info, BaseException) else ssl_info, result)
+    return result, error
+
+
+async def crawl(urls: Union[Iterable[str], AsyncIterable[str]], output_file: str, settings: Optional[CrawlSettings] = None,
+                cache: Optional[DomainCache] = None, journal: Optional[CrawlJournal] = None,
+                retry: Optional[RetryPolicy] = None, http_cache: Optional[HttpCache] = None) -> CrawlStats:
+    """Audit ``urls`` concurrently and stream one row per URL to ``output_file``.
+
+    ``urls`` may be an async iterable, such as ``discover_urls``; URLs are
+    audited as they arrive. Duplicate URLs are audited once. With a
+    ``journal``, URLs it has done are skipped, failed ones are retried as
+    ``retry`` allows, and the output is rebuilt from the journal at the end,
+    in input order.
+    """
+    settings = settings or CrawlSettings()
+    cache = cache or DomainCache()
+    planner = CrawlPlanner(journal, retry)
+    plan = planner.plan
+    parse_pool = ParsePool(settings.parse_workers, settings.parser_backend) if settings.parse_workers else None
+    stats = CrawlStats(cache=cache, plan=plan, http_cache=http_cache, parse_pool=parse_pool)
+    lookups = DomainLookups(cache)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=settings.concurrency * 2)
+    # Finished URLs for the writer; a slow disk holds up the fetch workers instead of buffering rows
+    done: asyncio.Queue = asyncio.Queue(maxsize=settings.concurrency * 2)
+
+    connector = aiohttp.TCPConnector(limit=settings.concurrency, limit_per_host=settings.per_host, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=settings.timeout, sock_connect=settings.connect_timeout)
+    headers = {'Accept-Encoding': ACCEPT_ENCODING}
+    if settings.user_agent:
+        headers['User-Agent'] = settings.user_agent
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as output:
+        csv_writer = csv.writer(output)
+        csv_writer.writerow(AUDIT_COLUMNS)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            fetcher = Fetcher(session, settings, stats)
+
+            async def worker():
+                while True:
+                    url = await queue.get()
+                    if url is None:
+                        return
+                    try:
+                        result, error = await audit_url(fetcher, lookups, url, http_cache, parse_pool)
+                    except Exception as e:
+                        print(f"Error auditing {url}: {e}")
+                        stats.pages_failed += 1
+                        result, error = empty_result(url), f"{type(e).__name__}: {e}"
+                    await done.put((url, result, error))
+
+            async def writer():
+                while True:
+                    item = await done.get()
+                    if item is None:
+                        return
+                    url, result, error = item
+                    if journal is not None:
+                        journal.record(url, result, error)
+                    csv_writer.writerow(audit_row(result))
+                    output.flush()
+                    stats.urls += 1
+
+            async def feeder():
+                if isinstance(urls, AsyncIterable):
+                    async for url in urls:
+                        if planner.add(url):
+                            await queue.put(url.strip())
+                else:
+                    for url in planner.todo(urls):
+                        await queue.put(url)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+                await done.put(None)
+
+            workers = [asyncio.create_task(worker()) for _ in range(settings.concurrency)]
+            tasks = [asyncio.create_task(writer()), asyncio.create_task(feeder()), *workers]
+            try:
+                # A failing writer (a full disk, a journal error) stops draining ``done``, which
+                # would block the workers and the feeder for good; stop the crawl and raise instead
+                finished, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in finished:
+                    task.result()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                if parse_pool is not None:
+                    parse_pool.close()
+
+    if journal is not None:
+        journal.write_output(plan.urls, output_file)
+    stats.finished = time.perf_counter()
+    return stats
+
+
+def run_crawl(file_path: str, output_file: str, settings: Optional[CrawlSettings] = None,
+              cache: Optional[DomainCache] = None, journal: Optional[CrawlJournal] = None,
+              retry: Optional[RetryPolicy] = None, http_cache: Optional[HttpCache] = None) -> CrawlStats:
+    """Audit the URLs in ``file_path``, or the URLs found in the sitemap (index) at that URL."""
+    settings = settings or CrawlSettings()
+    if not is_url(file_path):
+        return asyncio.run(crawl(read_urls(file_path), output_file, settings, cache, journal, retry, http_cache))
+    sitemaps = SitemapStats()
+    urls = discover_urls([file_path], stats=sitemaps, timeout=settings.timeout, user_agent=settings.user_agent)
+    stats = asyncio.run(crawl(urls, output_file, settings, cache, journal, retry, http_cache))
+    stats.sitemaps = sitemaps
+    return stats
@@ -0,0 +1,101 @@
+"""Vectorized parsing of the day-first dates in 'Laatste wijziging'.
+
+Exports repeat the same few thousand dates across hundreds of thousands of
+rows, so only the distinct strings are parsed and the result is mapped back
+to the rows by their factorized codes. The format is inferred once from a
+sample of those strings, choosing among day-first candidates (``20-9-2022``
+is 20 September, never month-first). The few strings that do not match the
+inferred format are retried with the other candidates, then with pandas'
+mixed-format parser in day-first mode.
+"""
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.instrument import staged
+
+# Day-first and ISO layouts seen in CMS and spreadsheet exports; the order breaks ties
+DATE_FORMATS = (
+    '%d-%m-%Y', '%d/%m/%Y', '%d.%m.%Y', '%d-%m-%y', '%d/%m/%y',
+    '%Y-%m-%d', '%Y/%m/%d',
+    '%d-%m-%Y %H:%M', '%d-%m-%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S',
+    '%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S',
+)
+SAMPLE_SIZE = 1000
+
+DUTCH_MONTHS = {
+    'januari': 1, 'februari': 2, 'maart': 3, 'april': 4, 'mei': 5, 'juni': 6, 'juli': 7,
+    'augustus': 8, 'september': 9, 'oktober': 10, 'november': 11, 'december': 12,
+    'jan': 1, 'feb': 2, 'mrt': 3, 'apr': 4, 'jun': 6, 'jul': 7, 'aug': 8, 'sep': 9, 'sept': 9,
+    'okt': 10, 'nov': 11, 'dec': 12,
+}
+# "20 september 2022", "20 sep. 2022"; longest names first so "sept" wins over "sep"
+DUTCH_DATE_PATTERN = r'^(\d{1,2})\s+(' + '|'.join(sorted(DUTCH_MONTHS, key=len, reverse=True)) + r')\.?\s+(\d{4})'
+
+
+@dataclass
+class DateParseResult:
+    dates: pd.Series
+    # Format inferred from the sample, None when no candidate matched it
+    format: Optional[str]
+    # Non-empty values that could not be parsed; they are NaT in ``dates``
+    unparsed: int
+    distinct: int
+
+
+def _dutch_month_names(values: pd.Series) -> pd.Series:
+    # "20 september 2022" -> "20-9-2022"
+    def to_numeric(match: re.Match) -> str:
+        return f"{match.group(1)}-{DUTCH_MONTHS[match.group(2)]}-{match.group(3)}"
+    return values.str.lower().str.replace(DUTCH_DATE_PATTERN, to_numeric, regex=True)
+
+
+def infer_format(sample: pd.Series, formats: Sequence[str] = DATE_FORMATS) -> Optional[str]:
+    """The candidate format that parses most of ``sample``."""
+    best, best_count = None, 0
+    for date_format in formats:
+        count = int(pd.to_datetime(sample, format=date_format, errors='coerce').notna().sum())
+        if count > best_count:
+            best, best_count = date_format, count
+    return best
+
+
+@staged('parse dates')
+def parse_dates(values: pd.Series, formats: Sequence[str] = DATE_FORMATS) -> DateParseResult:
+    """Parse a column of date strings, parsing every distinct string once.
+
+    Values that are already datetimes are returned as they are.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return DateParseResult(dates=values, format=None, unparsed=0, distinct=int(values.nunique()))
+    text = values.astype('string').str.strip()
+    codes, uniques = pd.factorize(text.mask(text == ''))
+    uniques = pd.Series(uniques, dtype='string')
+    if uniques.str.contains(r'[a-zA-Z]{3}', regex=True).any():
+        uniques = _dutch_month_names(uniques)
+
+    date_format = infer_format(uniques.head(SAMPLE_SIZE), formats)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+    if date_format is not None:
+        parsed = pd.to_datetime(uniques, format=date_format, errors='coerce').astype('datetime64[ns]')
+    for fallback in formats:
+        remaining = parsed.isna()
+        if not remaining.any():
+            break
+        if fallback != date_format:
+            parsed[remaining] = pd.to_datetime(uniques[remaining], format=fallback, errors='coerce')
+    remaining = parsed.isna()
+    if remaining.any():
+        with warnings.catch_warnings():
+            # Mixed-format parsing warns per call about falling back to dateutil
+            warnings.simplefilter('ignore', UserWarning)
+            parsed[remaining] = pd.to_datetime(uniques[remaining], format='mixed', dayfirst=True, errors='coerce')
+
+    dates = pd.Series(parsed.to_numpy().take(codes), index=values.index, name=values.name)
+    dates[codes < 0] = pd.NaT
+    unparsed = int(np.count_nonzero(parsed.isna().to_numpy()[codes[codes >= 0]]))
+    return DateParseResult(dates=dates, format=date_format, unparsed=unparsed, distinct=len(uniques))
@@ -0,0 +1,175 @@
+"""Streaming deduplication for the CSV Duplicate Remover.
+
+Any number of CSV files are read in chunks. Every row is reduced to a 64-bit
+digest of its key: the whole row, a set of columns, or the normalized URL (so
+``http://www.example.nl/a/`` and ``https://example.nl/a`` are the same page).
+Only the digests seen so far are kept in memory, as sorted NumPy runs at 8
+bytes per row, and the first row for every digest is written out as soon as
+its chunk is processed.
+
+For inputs whose digests do not fit in memory either, the partitioned mode
+first spills the rows to disk by digest and then deduplicates one partition at
+a time. Rows then come out grouped by partition instead of in input order.
+"""
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.ingest import StreamSource, read_csv_chunks, read_header
+from seo_tools.instrument import stage
+from seo_tools.merge import find_url_column, normalize_urls
+
+KEY_ROW = 'row'
+KEY_COLUMNS = 'columns'
+KEY_URL = 'url'
+KEYS = (KEY_ROW, KEY_COLUMNS, KEY_URL)
+
+CHUNK_ROWS = 100_000
+
+
+class DigestSet:
+    """Set of uint64 digests kept as a few sorted arrays, merged as they grow."""
+
+    def __init__(self):
+        self._runs: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return sum(len(run) for run in self._runs)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(run.nbytes for run in self._runs)
+
+    def add(self, digests: np.ndarray) -> np.ndarray:
+        """Add ``digests`` and return a mask of the ones not seen before (first occurrence only)."""
+        new = np.zeros(len(digests), dtype=bool)
+        new[np.unique(digests, return_index=True)[1]] = True
+        for run in self._runs:
+            positions = np.minimum(np.searchsorted(run, digests), len(run) - 1)
+            new &= run[positions] != digests
+        added = np.sort(digests[new])
+        if len(added):
+            self._runs.append(added)
+        # Keep run sizes geometric, so a lookup touches O(log n) runs
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            last = self._runs.pop()
+            self._runs[-1] = np.sort(np.concatenate([self._runs[-1], last]))
+        return new
+
+
+@dataclass
+class DedupStats:
+    rows_in: int = 0
+    rows_out: int = 0
+    partitions: int = 0
+    # Memory held by the digest set at its largest
+    digest_bytes: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.rows_in - self.rows_out
+
+
+def union_header(sources: Sequence[StreamSource]) -> List[str]:
+    """All column names of the sources, in order of first appearance."""
+    header = []
+    for source in sources:
+        header.extend(col for col in read_header(source) if col not in header)
+    return header
+
+
+def key_columns(header: Sequence[str], key: str, columns: Optional[Sequence[str]] = None) -> List[str]:
+    if key == KEY_ROW:
+        return list(header)
+    if key == KEY_COLUMNS:
+        missing = [col for col in columns or () if col not in header]
+        if not columns or missing:
+            raise ValueError(f"Key columns not found: {', '.join(missing) or '(none chosen)'}")
+        return list(columns)
+    if key == KEY_URL:
+        url_col = find_url_column(col.strip().lower() for col in header)
+        if url_col is None:
+            raise ValueError("URL column not found")
+        return [next(col for col in header if col.strip().lower() == url_col)]
+    raise ValueError(f"Unknown key {key!r}, expected one of {', '.join(KEYS)}")
+
+
+def row_digests(chunk: pd.DataFrame, key: str, columns: List[str]):
+    """64-bit digest of each row's key, and a mask of rows without a URL, which are always kept."""
+    if key != KEY_URL:
+        return pd.util.hash_pandas_object(chunk[columns], index=False).to_numpy(), np.zeros(len(chunk), dtype=bool)
+    urls = normalize_urls(chunk[columns[0]])
+    return pd.util.hash_pandas_object(urls.fillna(''), index=False).to_numpy(), urls.isna().to_numpy()
+
+
+def _unique_rows(chunk: pd.DataFrame, seen: DigestSet, key: str, columns: List[str]) -> pd.DataFrame:
+    digests, keep = row_digests(chunk, key, columns)
+    new = np.ones(len(chunk), dtype=bool)
+    new[~keep] = seen.add(digests[~keep])
+    return chunk.loc[new]
+
+
+def _write(target: str, frame: pd.DataFrame, header: bool) -> None:
+    frame.to_csv(target, mode='w' if header else 'a', header=header, index=False)
+
+
+def dedup_csvs(sources: Sequence[StreamSource], target: str, key: str = KEY_ROW,
+               columns: Optional[Sequence[str]] = None, partitions: int = 0,
+               workdir: Optional[str] = None, chunk_rows: int = CHUNK_ROWS) -> DedupStats:
+    """Write the rows of ``sources`` to ``target`` without duplicate keys; the first occurrence wins.
+
+    Columns are the union of the sources' columns; fields a source does not
+    have are left empty. ``partitions`` > 0 spills the rows to that many files
+    under ``workdir`` first, bounding the digest memory to one partition.
+    """
+    header = union_header(sources)
+    keys = key_columns(header, key, columns)
+    stats = DedupStats(partitions=partitions)
+    _write(target, pd.DataFrame(columns=header), header=True)
+
+    if not partitions:
+        seen = DigestSet()
+        for source in sources:
+            with stage('dedup') as deduplicating:
+                for chunk in read_csv_chunks(source, chunk_rows):
+                    chunk = chunk.reindex(columns=header, fill_value='')
+                    unique = _unique_rows(chunk, seen, key, keys)
+                    _write(target, unique, header=False)
+                    stats.rows_in += len(chunk)
+                    stats.rows_out += len(unique)
+                    deduplicating.rows = len(chunk)
+            stats.digest_bytes = max(stats.digest_bytes, seen.nbytes)
+        return stats
+
+    spill_dir = tempfile.mkdtemp(prefix='dedup-', dir=workdir)
+    try:
+        paths = [os.path.join(spill_dir, f"{number}.csv") for number in range(partitions)]
+        for source in sources:
+            with stage('partition') as partitioning:
+                for chunk in read_csv_chunks(source, chunk_rows):
+                    chunk = chunk.reindex(columns=header, fill_value='')
+                    stats.rows_in += len(chunk)
+                    digests, _ = row_digests(chunk, key, keys)
+                    for number, rows in chunk.groupby(digests % np.uint64(partitions), sort=False):
+                        rows.to_csv(paths[number], mode='a', header=not os.path.exists(paths[number]), index=False)
+                    partitioning.rows = len(chunk)
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            seen = DigestSet()
+            with stage('dedup partition') as deduplicating:
+                for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunk_rows):
+                    unique = _unique_rows(chunk, seen, key, keys)
+                    _write(target, unique, header=False)
+                    stats.rows_out += len(unique)
+                    deduplicating.rows = len(chunk)
+            stats.digest_bytes = max(stats.digest_bytes, seen.nbytes)
+            os.remove(path)
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
+    return stats
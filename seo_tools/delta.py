@@ -0,0 +1,172 @@
+"""Month-over-month pruning that reprocesses only the rows that changed since the last run.
+
+A baseline holds one row per row of the previous run: its URL, a hash of the
+rest of the row and the columns the pruning rules added. A new export of the
+same site is matched against the baseline by URL, and ``process_data`` runs
+only on new rows and on rows whose hash changed. Unchanged rows get their
+previous ``Action`` back. If the thresholds, the date or the columns differ
+from the baseline's, every row is reprocessed, and the Action diff is still
+reported against the baseline.
+
+Reading, hashing and matching the export still touch every row, but all of
+that is vectorized; only the rules are limited to the changed rows.
+"""
+import datetime
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.instrument import stage
+from seo_tools.pruning import DATE_COLUMN, PREPARED_CACHE_VERSION, prepare_data, process_data
+
+# normalize_columns lowercases the columns it has no mapping for, the URL column included
+URL_COLUMN = 'url'
+OUTPUT_COLUMNS = ['To Delete', 'Backlinks controleren', 'Action']
+# Bump when the baseline layout or the row hash changes, so old baselines are not trusted
+BASELINE_VERSION = 1
+
+
+@dataclass
+class PruningDelta:
+    # The processed export, as process_data returns it
+    result: pd.DataFrame
+    # What to keep for the next run
+    baseline: pd.DataFrame
+    # New and removed URLs, and URLs whose Action changed
+    report: pd.DataFrame
+    new: int = 0
+    removed: int = 0
+    changed: int = 0
+    unchanged: int = 0
+    reprocessed: int = 0
+    # Every row was reprocessed: no baseline, or one made with other settings
+    full: bool = False
+
+    def summary(self) -> str:
+        return (f"{self.new} new, {self.removed} removed, {self.changed} changed and {self.unchanged} unchanged rows; "
+                f"{self.reprocessed} reprocessed{' (all, no matching baseline)' if self.full else ''}, "
+                f"{len(self.report)} rows in the diff report")
+
+
+def settings_fingerprint(thresholds: Dict[str, float], older_than_date: Optional[datetime.date], columns: List[str]) -> str:
+    """Identifies everything besides the row contents that decides a row's Action."""
+    settings = {'version': [BASELINE_VERSION, PREPARED_CACHE_VERSION], 'thresholds': thresholds,
+                'older_than': str(older_than_date) if older_than_date else None, 'columns': columns}
+    return hashlib.sha1(json.dumps(settings, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def row_hashes(data: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """A 64-bit hash of each row's values in ``columns``.
+
+    Numbers are hashed as float64 and text as objects, so the hash does not
+    depend on the types compact_dtypes picked for this month's export.
+    """
+    values = {}
+    for column in columns:
+        series = data[column]
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            values[column] = series.astype('float64')
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            values[column] = series
+        else:
+            values[column] = series.astype(object)
+    return pd.util.hash_pandas_object(pd.DataFrame(values, index=data.index), index=False).to_numpy()
+
+
+def match_rows(previous_urls: np.ndarray, urls: np.ndarray) -> np.ndarray:
+    """The position of each of ``urls`` in ``previous_urls``, or -1.
+
+    A URL that appears more than once matches its repeats in order. Both sides
+    are factorized together, so rows are matched on integer keys rather than
+    by hashing every URL string twice.
+    """
+    codes, _ = pd.factorize(np.concatenate([previous_urls, urls]), use_na_sentinel=False)
+
+    def keys(side: np.ndarray) -> np.ndarray:
+        occurrence = pd.Series(side).groupby(side).cumcount().to_numpy()
+        return side.astype('int64') * (len(codes) + 1) + occurrence
+
+    return pd.Index(keys(codes[:len(previous_urls)])).get_indexer(keys(codes[len(previous_urls):]))
+
+
+def prune_delta(data: pd.DataFrame, thresholds: Dict[str, float], older_than_date: Optional[datetime.date],
+                baseline: Optional[pd.DataFrame] = None) -> PruningDelta:
+    """Process ``data`` like ``process_data``, reusing ``baseline`` for the rows that did not change."""
+    if URL_COLUMN not in data.columns:
+        raise ValueError("Delta mode needs a URL column")
+    data = prepare_data(data)
+    columns = sorted(str(column) for column in data.columns if column not in OUTPUT_COLUMNS)
+    fingerprint = settings_fingerprint(thresholds, older_than_date, columns)
+    urls = data[URL_COLUMN].to_numpy(dtype=object)
+    with stage('hash rows', rows=len(data)):
+        # The URL is the match key, so only the other columns need hashing
+        hashes = row_hashes(data, [column for column in columns if column != URL_COLUMN])
+
+    first_run = baseline is None
+    if first_run:
+        baseline = pd.DataFrame({URL_COLUMN: pd.Series(dtype=object), 'hash': pd.Series(dtype='uint64'),
+                                 'Action': pd.Series(dtype=object)})
+    with stage('match baseline', rows=len(data)):
+        position = match_rows(baseline[URL_COLUMN].to_numpy(dtype=object), urls)
+        is_new = position < 0
+        same = ~is_new & (baseline['hash'].to_numpy()[np.maximum(position, 0)] == hashes) if len(baseline) else ~is_new
+        full = baseline.attrs.get('fingerprint') != fingerprint
+        reuse = same & (not full)
+        removed = np.ones(len(baseline), dtype=bool)
+        removed[position[~is_new]] = False
+
+    todo = ~reuse
+    if todo.all():
+        result = process_data(data, thresholds, older_than_date)
+    else:
+        reprocessed = process_data(data[todo].copy(), thresholds, older_than_date)
+        with stage('reuse baseline', rows=int(reuse.sum())):
+            result = data
+            result[DATE_COLUMN] = result[DATE_COLUMN].dt.date
+            for column in OUTPUT_COLUMNS:
+                values = baseline[column].to_numpy(dtype=bool if column != 'Action' else object)[position]
+                values[todo] = reprocessed[column].to_numpy()
+                result[column] = values
+
+    actions = result['Action'].to_numpy(dtype=object)
+    previous = np.where(is_new, None, baseline['Action'].to_numpy(dtype=object)[np.maximum(position, 0)]) if len(baseline) else np.full(len(data), None)
+    # Without a baseline there is nothing to compare with, rather than every URL being new
+    report_rows = (is_new | (previous != actions)) & (not first_run)
+    report = pd.concat([
+        pd.DataFrame({'URL': urls[report_rows],
+                      'Change': np.select([is_new, ~same], ['new', 'changed'], 'unchanged')[report_rows],
+                      'Previous action': previous[report_rows], 'Action': actions[report_rows]}),
+        pd.DataFrame({'URL': baseline[URL_COLUMN][removed].to_numpy(), 'Change': 'removed',
+                      'Previous action': baseline['Action'][removed].to_numpy(), 'Action': None}),
+    ], ignore_index=True)
+
+    new_baseline = pd.DataFrame({URL_COLUMN: urls, 'hash': hashes,
+                                 **{column: result[column].to_numpy() for column in OUTPUT_COLUMNS}})
+    new_baseline.attrs['fingerprint'] = fingerprint
+    return PruningDelta(result=result, baseline=new_baseline, report=report, new=int(is_new.sum()), removed=int(removed.sum()),
+                        changed=int((~is_new & ~same).sum()), unchanged=int(same.sum()), reprocessed=int(todo.sum()), full=bool(full))
+
+
+def baseline_path(directory: str, site: str) -> str:
+    return os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9.-]+', '_', site.strip()) or 'site'}.parquet")
+
+
+def load_baseline(path: str) -> Optional[pd.DataFrame]:
+    """The baseline saved at ``path``, or None if there is none (or it cannot be read)."""
+    try:
+        return pd.read_parquet(path)
+    except (FileNotFoundError, OSError, ValueError):
+        return None
+
+
+def save_baseline(baseline: pd.DataFrame, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    baseline.to_parquet(temporary, index=False)
+    os.replace(temporary, path)
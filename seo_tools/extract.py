@@ -0,0 +1,193 @@
+"""Single-pass extraction of the on-page SEO fields.
+
+The document is walked once as a stream of start/end/data events, without
+building a tree. The same collector runs on the standard library
+``html.parser`` or, when installed, on lxml's parser target interface. The
+results match what the BeautifulSoup ``find``/``find_all`` calls in
+``seo_tools.audit`` used to return.
+"""
+import re
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+HEADING_TAGS = frozenset({'h1', 'h2', 'h3', 'h4', 'h5', 'h6'})
+# Elements whose text is not part of the page's visible text
+HIDDEN_TEXT_TAGS = frozenset({'script', 'style', 'noscript', 'template'})
+SOCIAL_MEDIA_PATTERN = re.compile(r'facebook|twitter|instagram|linkedin|youtube')
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional
+    etree = None
+
+
+@dataclass
+class PageFields:
+    title: Optional[str] = None
+    meta_description: Optional[str] = None
+    headings: List[str] = field(default_factory=list)
+    images: List[str] = field(default_factory=list)
+    canonical_url: Optional[str] = None
+    internal_links: List[str] = field(default_factory=list)
+    external_links: List[str] = field(default_factory=list)
+    social_media_links: List[str] = field(default_factory=list)
+    # Visible text of the page, for near-duplicate detection
+    text: str = ''
+
+
+class _Collector:
+    """Receives parser events and fills a PageFields."""
+
+    def __init__(self):
+        self.fields = PageFields()
+        self._title: Optional[List[str]] = None
+        self._title_depth = 0
+        self._title_done = False
+        self._meta_done = False
+        self._canonical_done = False
+        # Open headings as (tag, index into fields.headings, text parts)
+        self._headings: List[tuple] = []
+        self._text: List[str] = []
+        self._hidden = 0
+
+    def start(self, tag: str, attrs: Dict[str, str]) -> None:
+        if tag in HIDDEN_TEXT_TAGS:
+            self._hidden += 1
+        elif tag == 'a':
+            href = attrs.get('href')
+            if href is not None:
+                if href.startswith('/'):
+                    self.fields.internal_links.append(href)
+                elif not href.startswith('#'):
+                    self.fields.external_links.append(href)
+                if SOCIAL_MEDIA_PATTERN.search(href):
+                    self.fields.social_media_links.append(href)
+        elif tag in HEADING_TAGS:
+            self.fields.headings.append('')
+            self._headings.append((tag, len(self.fields.headings) - 1, []))
+        elif tag == 'img':
+            src = attrs.get('src')
+            if src is not None:
+                self.fields.images.append(src)
+        elif tag == 'title' and not self._title_done:
+            if self._title is None:
+                self._title = []
+            self._title_depth += 1
+        elif tag == 'meta' and not self._meta_done and attrs.get('name') == 'description':
+            self._meta_done = True
+            self.fields.meta_description = attrs.get('content')
+        elif tag == 'link' and not self._canonical_done and 'canonical' in (attrs.get('rel') or '').split():
+            self._canonical_done = True
+            self.fields.canonical_url = attrs.get('href')
+
+    def end(self, tag: str) -> None:
+        if tag in HIDDEN_TEXT_TAGS:
+            self._hidden = max(self._hidden - 1, 0)
+        elif tag in HEADING_TAGS:
+            for position in range(len(self._headings) - 1, -1, -1):
+                if self._headings[position][0] == tag:
+                    # Closing an outer heading also closes the headings nested in it
+                    for _ in range(len(self._headings) - position):
+                        self._close_heading()
+                    break
+        elif tag == 'title' and self._title is not None and not self._title_done:
+            self._title_depth -= 1
+            if self._title_depth == 0:
+                self._close_title()
+
+    def data(self, text: str) -> None:
+        if not self._hidden:
+            self._text.append(text)
+        if self._title is not None and not self._title_done:
+            self._title.append(text)
+        for _, _, parts in self._headings:
+            parts.append(text)
+
+    def close(self) -> PageFields:
+        while self._headings:
+            self._close_heading()
+        if self._title is not None and not self._title_done:
+            self._close_title()
+        self.fields.text = ' '.join(self._text)
+        return self.fields
+
+    def _close_heading(self) -> None:
+        _, index, parts = self._headings.pop()
+        self.fields.headings[index] = ''.join(parts).strip()
+
+    def _close_title(self) -> None:
+        self._title_done = True
+        self.fields.title = ''.join(self._title).strip()
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, collector: _Collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {name: '' if value is None else value for name, value in attrs})
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class PageExtractor:
+    """Incremental extractor: ``feed`` the HTML in one or more chunks, then ``close``."""
+
+    def __init__(self, backend: str = 'html.parser'):
+        self._collector = _Collector()
+        backend = resolve_backend(backend)
+        if backend == 'lxml':
+            self._parser = etree.HTMLParser(target=_LxmlTarget(self._collector))
+        else:
+            self._parser = _StdlibParser(self._collector)
+
+    def feed(self, chunk: str) -> None:
+        self._parser.feed(chunk)
+
+    def close(self) -> PageFields:
+        self._parser.close()
+        return self._collector.close()
+
+
+class _LxmlTarget:
+    def __init__(self, collector: _Collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def close(self):
+        return None
+
+
+def available_backends() -> List[str]:
+    return ['html.parser'] + (['lxml'] if etree is not None else [])
+
+
+def resolve_backend(backend: str) -> str:
+    """Map ``'auto'`` to lxml when it is installed, else html.parser."""
+    if backend == 'auto':
+        return 'lxml' if etree is not None else 'html.parser'
+    if backend not in ('html.parser', 'lxml'):
+        raise ValueError(f"Unknown parser backend: {backend}")
+    if backend == 'lxml' and etree is None:
+        raise ValueError("The lxml parser backend needs the lxml package")
+    return backend
+
+
+def extract_page(html: str, backend: str = 'html.parser') -> PageFields:
+    extractor = PageExtractor(backend)
+    extractor.feed(html)
+    return extractor.close()
@@ -0,0 +1,119 @@
+"""Content-addressed cache of parsed DataFrames, kept as Parquet files on disk.
+
+Keys are derived from the upload's content hash, so the same upload reuses the
+parsed and type-coerced frame across Streamlit reruns and sessions. The most
+recently used frames are also kept in memory. The directory is trimmed to
+``max_bytes`` by evicting the least recently used files.
+
+The disk tier needs pyarrow; without it only the in-memory tier is used.
+"""
+import importlib.util
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple, Union
+
+import pandas as pd
+
+from seo_tools.instrument import stage
+
+DEFAULT_DIRECTORY = os.environ.get('PATRICKS_TOOLS_CACHE', os.path.join(tempfile.gettempdir(), 'patricks-tools-cache'))
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+def trim_directory(directory: str, max_bytes: int, suffix: Union[str, Tuple[str, ...]]) -> None:
+    """Delete the least recently used ``suffix`` files until the rest fit in ``max_bytes``."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+class FrameCache:
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES, memory_entries: int = 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.disk = HAS_PYARROW
+        self._memory: 'OrderedDict[str, pd.DataFrame]' = OrderedDict()
+        self._lock = threading.Lock()
+        if self.disk:
+            os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached frame, or None."""
+        with self._lock:
+            frame = self._memory.get(key)
+            if frame is not None:
+                self._memory.move_to_end(key)
+                return frame.copy()
+        if not self.disk:
+            return None
+        path = self._path(key)
+        try:
+            frame = pd.read_parquet(path)
+            # The modification time doubles as the last-used time for eviction
+            os.utime(path)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        self._remember(key, frame)
+        return frame.copy()
+
+    def put(self, key: str, frame: pd.DataFrame) -> None:
+        self._remember(key, frame)
+        if not self.disk:
+            return
+        path = self._path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            frame.to_parquet(temporary, index=False)
+            os.replace(temporary, path)
+        except (OSError, ValueError, TypeError):
+            # Frames Arrow cannot store (e.g. mixed-type object columns) stay memory-only
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            return
+        trim_directory(self.directory, self.max_bytes, '.parquet')
+
+    def get_or_build(self, key: str, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        with stage('frame cache') as lookup:
+            frame = self.get(key)
+            if frame is not None:
+                lookup.rows = len(frame)
+        if frame is None:
+            frame = build()
+            with stage('frame cache store', rows=len(frame)):
+                self.put(key, frame)
+            frame = frame.copy()
+        return frame
+
+    def _remember(self, key: str, frame: pd.DataFrame) -> None:
+        with self._lock:
+            self._memory[key] = frame
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self.disk:
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.parquet'):
+                    os.remove(entry.path)
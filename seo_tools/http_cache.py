@@ -0,0 +1,89 @@
+"""Conditional-request cache for the audit's page downloads.
+
+Weekly re-audits mostly fetch pages that have not changed. Pages served with
+an ``ETag`` or ``Last-Modified`` validator are stored in a sqlite file with
+their body (zlib-compressed) and the fields extracted from it. The next audit
+sends ``If-None-Match`` / ``If-Modified-Since``; on a ``304 Not Modified`` the
+stored fields are reused without downloading or parsing the page again. The
+stored body is re-parsed only when the audit uses another HTML parser.
+"""
+import importlib.util
+import json
+import sqlite3
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+
+HAS_BROTLI = any(importlib.util.find_spec(name) is not None for name in ('brotli', 'brotlicffi'))
+# Brotli is only advertised when a decoder is installed; requests and aiohttp then decode it
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+NOT_MODIFIED = 304
+
+
+@dataclass
+class CachedPage:
+    body: str
+    # Fields extracted from ``body`` by ``parser``
+    fields: Dict[str, Any]
+    parser: str
+
+
+class HttpCache:
+    def __init__(self, path: str, max_age: float = 60 * 24 * 3600):
+        self.path = path
+        self.requests = 0
+        self.revalidated = 0
+        self.stored = 0
+        self.bytes_saved = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("CREATE TABLE IF NOT EXISTS http_cache ("
+                         "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, stored REAL NOT NULL, "
+                         "parser TEXT NOT NULL, fields TEXT NOT NULL, body BLOB NOT NULL)")
+        self._db.execute("DELETE FROM http_cache WHERE stored < ?", (time.time() - max_age,))
+        self._db.commit()
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Headers for a page request: accepted encodings and the stored validators, if any."""
+        self.requests += 1
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        row = self._db.execute("SELECT etag, last_modified FROM http_cache WHERE url = ?", (url,)).fetchone()
+        if row is not None:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def not_modified(self, url: str) -> Optional[CachedPage]:
+        """The stored page after a 304 response, or None if it is gone."""
+        row = self._db.execute("SELECT parser, fields, body FROM http_cache WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        body = zlib.decompress(row[2]).decode('utf-8')
+        self.revalidated += 1
+        self.bytes_saved += len(body)
+        self._db.execute("UPDATE http_cache SET stored = ? WHERE url = ?", (time.time(), url))
+        self._db.commit()
+        return CachedPage(body=body, fields=json.loads(row[1]), parser=row[0])
+
+    def store(self, url: str, headers: Mapping[str, str], body: str, fields: Dict[str, Any], parser: str) -> None:
+        """Keep a 200 response that carries a validator; others could never be revalidated."""
+        etag, last_modified = headers.get('ETag'), headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        self._db.execute(
+            "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, stored, parser, fields, body) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, time.time(), parser, json.dumps(fields), zlib.compress(body.encode('utf-8'), 6)))
+        self._db.commit()
+        self.stored += 1
+
+    def summary(self) -> str:
+        rate = self.revalidated / self.requests if self.requests else 0.0
+        return (f"HTTP cache: {self.revalidated} of {self.requests} pages not modified ({rate:.0%}), "
+                f"{self.bytes_saved / 1e6:.1f} MB not downloaded; {self.stored} pages stored")
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
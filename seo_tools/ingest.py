@@ -0,0 +1,259 @@
+"""Shared CSV ingestion for all tools.
+
+Encoding and dialect are sniffed from a bounded sample instead of the whole
+upload, a UTF-8 BOM is stripped, and the data is parsed with pandas' C engine
+(or pyarrow on request). The Python engine is only used when the fast engines
+cannot parse the file. Parsed frames are memoized per upload content hash, so
+a Streamlit rerun with the same upload does not parse it again.
+
+``compact_dtypes`` is the schema pass run after parsing: metrics stored as
+float64 (``29.0``) become the smallest nullable integer type that holds them,
+and text columns become Arrow strings or categoricals.
+"""
+import codecs
+import csv
+import hashlib
+import importlib.util
+import io
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+
+import pandas as pd
+
+from seo_tools.instrument import stage, staged
+
+try:
+    import chardet
+except ImportError:  # chardet is optional; non-UTF-8 files are then read as latin-1
+    chardet = None
+
+SAMPLE_SIZE = 64 * 1024
+DELIMITERS = ',;\t|'
+MAX_CACHED_FRAMES = 4
+# Rough in-memory size of a parsed CSV relative to its size on disk
+MEMORY_EXPANSION = 4
+# Text columns with fewer distinct values than this share of the rows become categoricals
+CATEGORY_RATIO = 0.5
+
+HAS_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+Source = Union[bytes, BinaryIO]
+# Files too large to hold in memory are read from a path or an open binary file
+StreamSource = Union[str, BinaryIO]
+
+
+@dataclass(frozen=True)
+class CsvFormat:
+    encoding: str
+    delimiter: str
+    quotechar: str = '"'
+
+
+def detect_encoding(sample: bytes) -> str:
+    """Guess the encoding from a sample: UTF-8 (with or without BOM), else chardet's guess or latin-1."""
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    try:
+        # Not final: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    if chardet is not None:
+        guess = chardet.detect(sample)['encoding']
+        if guess and guess.lower() not in ('ascii', 'utf-8'):
+            return guess
+    return 'latin-1'
+
+
+def sniff_dialect(sample: str) -> type:
+    """Detect the dialect from complete lines of ``sample``; defaults to comma-separated."""
+    if '\n' in sample:
+        sample = sample[:sample.rindex('\n')]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS)
+    except csv.Error:
+        first_line = sample.split('\n', 1)[0]
+        delimiter = max(DELIMITERS, key=first_line.count)
+        return type('SniffedDialect', (csv.excel,), {'delimiter': delimiter if first_line.count(delimiter) else ','})
+
+
+def sniff_format(sample: bytes) -> CsvFormat:
+    encoding = detect_encoding(sample)
+    dialect = sniff_dialect(sample.decode(encoding, errors='ignore'))
+    return CsvFormat(encoding=encoding, delimiter=dialect.delimiter, quotechar=dialect.quotechar or '"')
+
+
+def read_sample(source: BinaryIO, size: int = SAMPLE_SIZE) -> bytes:
+    """Read up to ``size`` bytes from the start of ``source`` and rewind it."""
+    sample = source.read(size)
+    source.seek(0)
+    return sample
+
+
+def _read_bytes(source: Source) -> bytes:
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+def parse_csv(data: bytes, csv_format: CsvFormat, engine: str = 'c') -> pd.DataFrame:
+    """Parse ``data`` with ``engine``, falling back to the Python engine if it fails."""
+    options = {'sep': csv_format.delimiter, 'encoding': csv_format.encoding, 'quotechar': csv_format.quotechar}
+    if engine == 'pyarrow':
+        try:
+            return pd.read_csv(io.BytesIO(data), engine='pyarrow', **options)
+        except (ImportError, ValueError):
+            engine = 'c'
+    try:
+        return pd.read_csv(io.BytesIO(data), engine='c', low_memory=False, **options)
+    except UnicodeDecodeError:
+        # The sample was valid UTF-8 but a later part of the file is not
+        if csv_format.encoding == 'latin-1':
+            raise
+        return parse_csv(data, replace(csv_format, encoding='latin-1'), engine)
+    except (pd.errors.ParserError, ValueError):
+        return pd.read_csv(io.BytesIO(data), engine='python', **options)
+
+
+_cache: 'OrderedDict[tuple, pd.DataFrame]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def upload_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def read_csv(source: Source, engine: str = 'c') -> pd.DataFrame:
+    """Sniff and parse an uploaded CSV. Returns a copy the caller is free to modify."""
+    with stage('read_csv') as reading:
+        data = _read_bytes(source)
+        with stage('hash upload'):
+            key = (upload_hash(data), engine)
+        with _cache_lock:
+            cached = _cache.get(key)
+            if cached is not None:
+                _cache.move_to_end(key)
+                reading.rows = len(cached)
+                return cached.copy()
+
+        with stage('sniff'):
+            csv_format = sniff_format(data[:SAMPLE_SIZE])
+        with stage('parse') as parsing:
+            frame = parse_csv(data, csv_format, engine)
+            parsing.rows = reading.rows = len(frame)
+    with _cache_lock:
+        _cache[key] = frame
+        while len(_cache) > MAX_CACHED_FRAMES:
+            _cache.popitem(last=False)
+    return frame.copy()
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _stream_format(source: StreamSource) -> CsvFormat:
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return sniff_format(f.read(SAMPLE_SIZE))
+    return sniff_format(read_sample(source))
+
+
+def read_header(source: StreamSource) -> List[str]:
+    """Column names of a CSV file, without reading its rows. File objects are rewound."""
+    csv_format = _stream_format(source)
+    header = pd.read_csv(source, sep=csv_format.delimiter, encoding=csv_format.encoding,
+                         quotechar=csv_format.quotechar, nrows=0).columns.tolist()
+    if not isinstance(source, str):
+        source.seek(0)
+    return header
+
+
+def read_csv_chunks(source: StreamSource, chunk_rows: int, as_text: bool = True) -> Iterator[pd.DataFrame]:
+    """Stream a CSV in chunks of ``chunk_rows`` rows.
+
+    With ``as_text`` values are kept as text, empty fields as empty strings,
+    so rows can be written back verbatim; otherwise pandas infers the types.
+    """
+    csv_format = _stream_format(source)
+    options = {'dtype': str, 'keep_default_na': False} if as_text else {}
+    yield from pd.read_csv(source, sep=csv_format.delimiter, encoding=csv_format.encoding,
+                           quotechar=csv_format.quotechar, chunksize=chunk_rows, **options)
+
+
+def exceeds_memory_budget(total_bytes: int, memory_budget: int) -> bool:
+    """Whether parsing ``total_bytes`` of CSV would likely take more than ``memory_budget`` bytes."""
+    return total_bytes * MEMORY_EXPANSION > memory_budget
+
+
+@dataclass
+class CompactReport:
+    before: int = 0
+    after: int = 0
+    # Column -> (old dtype, new dtype) for every converted column
+    changed: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+
+    @property
+    def saved(self) -> int:
+        return self.before - self.after
+
+
+INTEGER_TYPES = [('Int8', np.int8), ('Int16', np.int16), ('Int32', np.int32), ('Int64', np.int64)]
+
+
+def _integer_type(values: np.ndarray) -> Union[str, None]:
+    # Smallest nullable integer type holding every (non-missing, integral) value
+    present = values[~np.isnan(values)]
+    if len(present) and not np.array_equal(present, np.floor(present)):
+        return None
+    low, high = (present.min(), present.max()) if len(present) else (0, 0)
+    for name, numpy_type in INTEGER_TYPES:
+        if np.iinfo(numpy_type).min <= low and high <= np.iinfo(numpy_type).max:
+            return name
+    return None
+
+
+def _compact_column(name: str, column: pd.Series) -> Union[str, None]:
+    if pd.api.types.is_bool_dtype(column):
+        return None
+    if pd.api.types.is_numeric_dtype(column):
+        values = column.to_numpy(dtype=float, na_value=np.nan)
+        integer_type = _integer_type(values)
+        if integer_type is not None:
+            return integer_type
+        # float32 only when it holds the values exactly, so thresholds compare the same
+        if pd.api.types.is_float_dtype(column) and np.array_equal(values.astype(np.float32), values, equal_nan=True):
+            return 'Float32'
+        return None
+    if not (pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)):
+        return None
+    if 'url' not in name.lower() and column.nunique() < CATEGORY_RATIO * len(column):
+        return 'category'
+    if pd.api.types.is_object_dtype(column) and HAS_PYARROW:
+        return 'string[pyarrow]'
+    return None
+
+
+@staged('compact dtypes')
+def compact_dtypes(frame: pd.DataFrame, skip: Tuple[str, ...] = ()) -> CompactReport:
+    """Convert ``frame``'s columns in place to the most compact type that holds their values."""
+    report = CompactReport(before=int(frame.memory_usage(deep=True).sum()))
+    for name in frame.columns:
+        if name in skip:
+            continue
+        dtype = _compact_column(str(name), frame[name])
+        if dtype is not None and dtype != str(frame[name].dtype):
+            report.changed[name] = (str(frame[name].dtype), dtype)
+            frame[name] = frame[name].astype(dtype)
+    report.after = int(frame.memory_usage(deep=True).sum())
+    return report
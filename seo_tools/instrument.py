@@ -0,0 +1,206 @@
+"""Per-stage timing and memory instrumentation for all tools.
+
+Library code marks its pipeline stages with ``stage('parse')``. Outside a
+recording that is a no-op. Inside ``recording(recorder)`` every stage records
+wall time, CPU time, peak traced memory (tracemalloc) and, where the code
+sets it, a row count. Stages may nest; an outer stage's peak includes its
+inner stages.
+
+Records can be summarized per stage for the pages' Performance panel and
+appended to a JSON lines file to track regressions across runs.
+"""
+import contextlib
+import contextvars
+import datetime
+import functools
+import json
+import threading
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass
+from typing import IO, Callable, Iterator, List, Optional, Union
+
+import pandas as pd
+
+_current: contextvars.ContextVar = contextvars.ContextVar('seo_tools_recorder', default=None)
+# tracemalloc is process-wide: it runs while any recording traces memory, and
+# stage peaks are only measured while a single recording does (concurrent
+# sessions of the Streamlit server would reset and mix each other's peaks)
+_tracing_lock = threading.Lock()
+_tracers = 0
+# Counts recordings that started tracing, to notice one that came and went during a stage
+_tracer_starts = 0
+_started_tracing = False
+
+
+@dataclass
+class StageRecord:
+    run_id: str
+    tool: str
+    stage: str
+    started: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    # None when memory tracing was off
+    peak_bytes: Optional[int] = None
+    rows: Optional[int] = None
+    depth: int = 0
+
+
+class _Stage:
+    def __init__(self, record: StageRecord):
+        self.record = record
+        self.peak = 0
+
+    @property
+    def rows(self) -> Optional[int]:
+        return self.record.rows
+
+    @rows.setter
+    def rows(self, value: int) -> None:
+        self.record.rows = (self.record.rows or 0) + int(value)
+
+
+class _NullStage:
+    rows = None
+
+
+class Recorder:
+    def __init__(self, tool: str, trace_memory: bool = True, listener: Optional[Callable[[StageRecord], None]] = None):
+        self.tool = tool
+        self.trace_memory = trace_memory
+        # Called with each record as its stage ends, e.g. to report a background job's progress
+        self.listener = listener
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records: List[StageRecord] = []
+        self._stack: List[_Stage] = []
+        # Set by ``recording`` while this recorder holds memory tracing on
+        self._tracing = False
+
+    def _measures_memory(self) -> bool:
+        return self._tracing and _tracers == 1
+
+    @contextlib.contextmanager
+    def stage(self, name: str, rows: Optional[int] = None) -> Iterator[_Stage]:
+        record = StageRecord(self.run_id, self.tool, name, datetime.datetime.now().isoformat(timespec='seconds'),
+                             rows=rows, depth=len(self._stack))
+        current = _Stage(record)
+        # Kept in start order, so outer stages come before the stages inside them
+        self.records.append(record)
+        tracing = self._measures_memory()
+        starts = _tracer_starts
+        if tracing:
+            # The reset below would lose the enclosing stage's peak so far
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        self._stack.append(current)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield current
+        finally:
+            record.wall_seconds = time.perf_counter() - wall
+            record.cpu_seconds = time.process_time() - cpu
+            self._stack.pop()
+            # Another recording that traced meanwhile has reset the peak or added its own memory to it
+            if tracing and self._measures_memory() and _tracer_starts == starts:
+                peak = max(current.peak, tracemalloc.get_traced_memory()[1])
+                record.peak_bytes = peak - baseline
+                if self._stack:
+                    self._stack[-1].peak = max(self._stack[-1].peak, peak)
+            if self.listener is not None:
+                self.listener(record)
+
+    def summary(self) -> pd.DataFrame:
+        """One row per stage, in order of first use: calls, total times, largest peak and total rows."""
+        if not self.records:
+            return pd.DataFrame(columns=['stage', 'calls', 'wall_seconds', 'cpu_seconds', 'peak_mb', 'rows'])
+        frame = pd.DataFrame([asdict(record) for record in self.records])
+        frame['order'] = range(len(frame))
+        summary = frame.groupby('stage', sort=False).agg(
+            calls=('stage', 'size'), wall_seconds=('wall_seconds', 'sum'), cpu_seconds=('cpu_seconds', 'sum'),
+            peak_bytes=('peak_bytes', 'max'), rows=('rows', lambda rows: rows.sum(min_count=1)), depth=('depth', 'min'), order=('order', 'min'))
+        summary['peak_mb'] = summary['peak_bytes'] / 1e6
+        summary = summary.sort_values('order').reset_index()
+        # Indent nested stages so the table reads like the pipeline
+        summary['stage'] = ['  ' * depth + name for depth, name in zip(summary['depth'], summary['stage'])]
+        return summary[['stage', 'calls', 'wall_seconds', 'cpu_seconds', 'peak_mb', 'rows']]
+
+    @classmethod
+    def read_jsonl(cls, path: str) -> 'Recorder':
+        """A recorder holding the records in the JSON lines file ``path``, e.g. a background job's profile."""
+        with open(path, encoding='utf-8') as f:
+            records = [StageRecord(**json.loads(line)) for line in f if line.strip()]
+        recorder = cls(tool=records[0].tool if records else '', trace_memory=False)
+        recorder.records = records
+        if records:
+            recorder.run_id = records[0].run_id
+        return recorder
+
+    def to_jsonl(self) -> str:
+        return ''.join(json.dumps(asdict(record)) + '\n' for record in self.records)
+
+    def write_jsonl(self, target: Union[str, IO[str]]) -> None:
+        """Append the records to ``target``, a path or an open text file."""
+        if isinstance(target, str):
+            with open(target, 'a', encoding='utf-8') as f:
+                f.write(self.to_jsonl())
+        else:
+            target.write(self.to_jsonl())
+
+
+@contextlib.contextmanager
+def recording(recorder: Recorder) -> Iterator[Recorder]:
+    """Make ``recorder`` collect the stages run inside this block, tracing memory if it asks for that."""
+    global _tracers, _tracer_starts, _started_tracing
+    if recorder.trace_memory:
+        with _tracing_lock:
+            if _tracers == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _started_tracing = True
+            _tracers += 1
+            _tracer_starts += 1
+        recorder._tracing = True
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+        if recorder.trace_memory:
+            recorder._tracing = False
+            with _tracing_lock:
+                _tracers -= 1
+                if _tracers == 0 and _started_tracing:
+                    tracemalloc.stop()
+                    _started_tracing = False
+
+
+def current_recorder() -> Optional[Recorder]:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def stage(name: str, rows: Optional[int] = None):
+    """Record a pipeline stage in the active recording; a no-op without one.
+
+    The yielded handle's ``rows`` may be set (it accumulates) to the rows processed.
+    """
+    recorder = _current.get()
+    if recorder is None:
+        yield _NullStage()
+        return
+    with recorder.stage(name, rows) as current:
+        yield current
+
+
+def staged(name: str):
+    """Decorator form of ``stage``."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
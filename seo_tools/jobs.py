@@ -0,0 +1,353 @@
+"""Background jobs for the Streamlit pages: a local queue, a worker process pool and sqlite state.
+
+A page copies its uploads into a new job directory and submits a
+``seo_tools.batch.Job`` that reads them from there and writes its results to
+the job's ``outputs`` directory. The job runs in a worker process, so the
+page's script run returns at once and polls the job's state on later reruns.
+State lives in a sqlite file next to the job directories, so a job outlives
+the browser tab that started it, and its results stay downloadable under its
+id until they are trimmed.
+
+At most ``workers`` jobs run at once, at a lower CPU priority than the
+server. The rest wait in the queue, so big jobs from several users do not
+compete with each other or with the pages. Progress comes from the
+instrumented stages (``seo_tools.instrument``): the rows the job has
+processed so far, against the number of lines in its inputs.
+"""
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from seo_tools.batch import Job
+from seo_tools.instrument import Recorder, StageRecord, recording
+
+DEFAULT_DIRECTORY = os.environ.get('PATRICKS_TOOLS_JOBS', os.path.join(tempfile.gettempdir(), 'patricks-tools-jobs'))
+DEFAULT_WORKERS = int(os.environ.get('PATRICKS_TOOLS_JOB_WORKERS', 2))
+# Finished jobs and their files are removed after a week
+KEEP_SECONDS = 7 * 24 * 3600
+STATE_FILE = 'jobs.sqlite'
+JOB_FILE = 'job.pickle'
+PROFILE_FILE = 'profile.jsonl'
+INPUTS = 'inputs'
+OUTPUTS = 'outputs'
+# Progress is written to the state file at most this often
+PROGRESS_SECONDS = 0.5
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass
+class JobState:
+    id: str
+    tool: str
+    name: str
+    status: str
+    submitted: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    progress: float = 0.0
+    # The stage the job is in
+    message: str = ''
+    summary: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def ended(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    @property
+    def seconds(self) -> float:
+        """Time spent running so far, or in total once finished."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobStore:
+    """The jobs' states in a sqlite file, shared by the server and the worker processes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        # Streamlit sessions are threads sharing one store
+        self._lock = threading.Lock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs ("
+                         "id TEXT PRIMARY KEY, tool TEXT NOT NULL, name TEXT NOT NULL, status TEXT NOT NULL, "
+                         "submitted REAL NOT NULL, started REAL, finished REAL, progress REAL NOT NULL DEFAULT 0, "
+                         "message TEXT NOT NULL DEFAULT '', summary TEXT, error TEXT, "
+                         "owner INTEGER NOT NULL, pid INTEGER)")
+        self._db.commit()
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> List[tuple]:
+        with self._lock:
+            rows = self._db.execute(sql, parameters).fetchall()
+            self._db.commit()
+            return rows
+
+    def add(self, job_id: str, tool: str, name: str) -> None:
+        # owner: the server process whose pool runs the job
+        self._execute("INSERT INTO jobs (id, tool, name, status, submitted, owner) VALUES (?, ?, ?, ?, ?, ?)",
+                      (job_id, tool, name, QUEUED, time.time(), os.getpid()))
+
+    def start(self, job_id: str) -> None:
+        self._execute("UPDATE jobs SET status = ?, started = ?, pid = ? WHERE id = ?", (RUNNING, time.time(), os.getpid(), job_id))
+
+    def progress(self, job_id: str, fraction: float, message: str) -> None:
+        self._execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ? AND status = ?", (fraction, message, job_id, RUNNING))
+
+    def finish(self, job_id: str, summary: Dict[str, Any]) -> None:
+        self._execute("UPDATE jobs SET status = ?, finished = ?, progress = 1, message = '', summary = ? WHERE id = ?",
+                      (DONE, time.time(), json.dumps(summary, default=str), job_id))
+
+    def fail(self, job_id: str, error: str) -> None:
+        # A job that already finished keeps its result
+        self._execute("UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ? AND status IN (?, ?)",
+                      (FAILED, time.time(), error, job_id, QUEUED, RUNNING))
+
+    def get(self, job_id: str) -> Optional[JobState]:
+        rows = self._execute(f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,))
+        return _state(rows[0]) if rows else None
+
+    def jobs(self, tool: Optional[str] = None, limit: int = 20) -> List[JobState]:
+        """The most recently submitted jobs, of ``tool`` or of every tool."""
+        where, parameters = ("WHERE tool = ?", (tool,)) if tool else ("", ())
+        rows = self._execute(f"SELECT {_COLUMNS} FROM jobs {where} ORDER BY submitted DESC LIMIT ?", (*parameters, limit))
+        return [_state(row) for row in rows]
+
+    def orphans(self) -> List[tuple]:
+        """``(id, status)`` of the unfinished jobs whose server process is gone."""
+        rows = self._execute("SELECT id, status, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING))
+        return [(job_id, status) for job_id, status, owner in rows if not _alive(owner)]
+
+    def adopt(self, job_id: str) -> None:
+        self._execute("UPDATE jobs SET owner = ? WHERE id = ?", (os.getpid(), job_id))
+
+    def expired(self, before: float) -> List[str]:
+        rows = self._execute("SELECT id FROM jobs WHERE status IN (?, ?) AND finished < ?", (DONE, FAILED, before))
+        return [row[0] for row in rows]
+
+    def remove(self, job_id: str) -> None:
+        self._execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+_COLUMNS = "id, tool, name, status, submitted, started, finished, progress, message, summary, error"
+
+
+def _state(row: tuple) -> JobState:
+    *fields, summary, error = row
+    return JobState(*fields, summary=json.loads(summary) if summary else {}, error=error)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def count_lines(directory: str) -> int:
+    """Lines in the files in ``directory``: the rows a job will read, give or take the headers."""
+    lines = 0
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            with open(entry.path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    lines += block.count(b'\n')
+    return lines
+
+
+class _ProgressListener:
+    """Turns finished stages into progress updates: the most rows any one stage has handled, out of ``total``."""
+
+    def __init__(self, store: JobStore, job_id: str, total: int):
+        self.store = store
+        self.job_id = job_id
+        self.total = total
+        self.rows: Counter = Counter()
+        self.reported = 0.0
+
+    def __call__(self, record: StageRecord) -> None:
+        if record.rows:
+            self.rows[record.stage] += record.rows
+        now = time.monotonic()
+        if now - self.reported < PROGRESS_SECONDS:
+            return
+        self.reported = now
+        # Never 1 before the job is actually done
+        fraction = min(max(self.rows.values(), default=0) / self.total, 0.99) if self.total else 0.0
+        self.store.progress(self.job_id, fraction, record.stage)
+
+
+def _lower_priority() -> None:
+    try:
+        os.nice(10)
+    except (AttributeError, OSError):
+        pass
+
+
+def _execute(state_path: str, directory: str, job_id: str, job: Job) -> None:
+    """Run ``job`` in a worker process, recording its state, progress and stage timings."""
+    store = JobStore(state_path)
+    try:
+        store.start(job_id)
+        listener = _ProgressListener(store, job_id, count_lines(os.path.join(directory, INPUTS)))
+        recorder = Recorder(tool=job.name, trace_memory=False, listener=listener)
+        try:
+            with recording(recorder):
+                summary = job.function(*job.args, **job.kwargs)
+        except Exception as e:
+            store.fail(job_id, f"{type(e).__name__}: {e}")
+        else:
+            store.finish(job_id, summary)
+        finally:
+            recorder.write_jsonl(os.path.join(directory, PROFILE_FILE))
+    finally:
+        store.close()
+
+
+def _context():
+    # Forking the threaded Streamlit server is unsafe; forkserver starts workers from a clean process
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class JobQueue:
+    """Runs ``batch.Job``s in a pool of ``workers`` processes; one per Streamlit server."""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, workers: int = DEFAULT_WORKERS, keep_seconds: float = KEEP_SECONDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.workers = workers
+        self.store = JobStore(os.path.join(directory, STATE_FILE))
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+        self._recover()
+        self.trim(keep_seconds)
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=_context(), initializer=_lower_priority)
+
+    def job_directory(self, job_id: str) -> str:
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            raise ValueError(f"Not a job id: {job_id!r}")
+        return os.path.join(self.directory, job_id)
+
+    def create(self) -> str:
+        """A new job id with empty ``inputs`` and ``outputs`` directories."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.job_directory(job_id), INPUTS))
+        os.makedirs(os.path.join(self.job_directory(job_id), OUTPUTS))
+        return job_id
+
+    def output_directory(self, job_id: str) -> str:
+        return os.path.join(self.job_directory(job_id), OUTPUTS)
+
+    def save_input(self, job_id: str, name: str, data: BinaryIO) -> str:
+        """Copy an upload into the job's inputs under its own file name (made unique); returns the path."""
+        stem, suffix = os.path.splitext(re.sub(r'[^\w.-]+', '_', os.path.basename(name)) or 'input.csv')
+        inputs = os.path.join(self.job_directory(job_id), INPUTS)
+        path, number = os.path.join(inputs, stem + suffix), 1
+        while os.path.exists(path):
+            number += 1
+            path = os.path.join(inputs, f"{stem}_{number}{suffix}")
+        data.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(data, f, 1024 * 1024)
+        return path
+
+    def submit(self, job_id: str, tool: str, job: Job) -> None:
+        """Queue ``job``, which reads the job's inputs and writes to its outputs directory."""
+        with open(os.path.join(self.job_directory(job_id), JOB_FILE), 'wb') as f:
+            pickle.dump(job, f)
+        self.store.add(job_id, tool, job.name)
+        self._dispatch(job_id, job)
+
+    def _dispatch(self, job_id: str, job: Job) -> None:
+        with self._lock:
+            pool = self._pool
+            future = pool.submit(_execute, self.store.path, self.job_directory(job_id), job_id, job)
+        future.add_done_callback(lambda done: self._settle(job_id, pool, done))
+
+    def _settle(self, job_id: str, pool: ProcessPoolExecutor, future: Future) -> None:
+        error = future.exception()
+        if error is None:
+            return
+        # The worker died (killed, out of memory) or the job could not be sent to it
+        self.store.fail(job_id, f"{type(error).__name__}: {error}")
+        if isinstance(error, BrokenProcessPool):
+            with self._lock:
+                # Every job of the broken pool ends up here; only the first replaces it
+                if self._pool is pool:
+                    pool.shutdown(wait=False)
+                    self._pool = self._new_pool()
+
+    def _recover(self) -> None:
+        # Jobs of a server that stopped: queued ones run here, running ones were cut off
+        for job_id, status in self.store.orphans():
+            if status == RUNNING:
+                self.store.fail(job_id, "Interrupted: the server stopped while the job ran")
+                continue
+            try:
+                with open(os.path.join(self.job_directory(job_id), JOB_FILE), 'rb') as f:
+                    job = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+                self.store.fail(job_id, f"Could not resume the job: {e}")
+                continue
+            self.store.adopt(job_id)
+            self._dispatch(job_id, job)
+
+    def state(self, job_id: str) -> Optional[JobState]:
+        return self.store.get(job_id)
+
+    def jobs(self, tool: Optional[str] = None, limit: int = 20) -> List[JobState]:
+        return self.store.jobs(tool, limit)
+
+    def outputs(self, job_id: str) -> List[str]:
+        """Paths of the files the job wrote, by name."""
+        directory = self.output_directory(job_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(entry.path for entry in os.scandir(directory) if entry.is_file())
+
+    def profile(self, job_id: str) -> Optional[str]:
+        path = os.path.join(self.job_directory(job_id), PROFILE_FILE)
+        return path if os.path.exists(path) else None
+
+    def remove(self, job_id: str) -> None:
+        self.store.remove(job_id)
+        shutil.rmtree(self.job_directory(job_id), ignore_errors=True)
+
+    def trim(self, keep_seconds: float = KEEP_SECONDS) -> None:
+        """Remove the jobs that finished more than ``keep_seconds`` ago, with their files."""
+        for job_id in self.store.expired(time.time() - keep_seconds):
+            self.remove(job_id)
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self.store.close()
@@ -0,0 +1,146 @@
+"""Checkpoint journal for resumable audit crawls.
+
+Every audited URL is recorded in a sqlite file with its extracted fields as
+soon as it is done, so an interrupted run loses at most the URLs in flight.
+A restarted run (or a run on a list that is mostly the same) plans its work
+against the journal: URLs that completed are skipped, URLs that failed are
+retried while the retry policy allows it, and duplicate input URLs are
+fetched once. The output CSV is rebuilt from the journal at the end, in input
+order, so it always covers every input URL.
+"""
+import csv
+import json
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from seo_tools.audit import AUDIT_COLUMNS, audit_row, empty_result
+
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass
+class RetryPolicy:
+    # Attempts per URL, over all runs, before a failing URL is left as it is
+    max_attempts: int = 3
+    # Seconds after a failed attempt before the URL is tried again
+    retry_after: float = 0.0
+
+
+@dataclass
+class CrawlPlan:
+    # Input URLs in order, without duplicates
+    urls: List[str] = field(default_factory=list)
+    # The URLs to fetch in this run
+    todo: List[str] = field(default_factory=list)
+    duplicates: int = 0
+    done: int = 0
+    # Failed URLs that are not retried (out of attempts, or retried too recently)
+    failed: int = 0
+    retries: int = 0
+
+    def summary(self) -> str:
+        return (f"{len(self.urls)} URLs ({self.duplicates} duplicates dropped): {len(self.todo)} to fetch "
+                f"({self.retries} retries), {self.done} already done, {self.failed} failed and not retried")
+
+
+class CrawlPlanner:
+    """Builds a CrawlPlan one URL at a time, for URLs that are still being discovered."""
+
+    def __init__(self, journal: Optional['CrawlJournal'] = None, policy: Optional[RetryPolicy] = None):
+        self.policy = policy or RetryPolicy()
+        self.plan = CrawlPlan()
+        self._known = journal.entries() if journal is not None else {}
+        self._seen = set()
+        self._now = time.time()
+
+    def add(self, url: str) -> bool:
+        """Plan ``url``; True if it is to be fetched."""
+        url = url.strip()
+        if not url:
+            return False
+        if url in self._seen:
+            self.plan.duplicates += 1
+            return False
+        self._seen.add(url)
+        self.plan.urls.append(url)
+        entry = self._known.get(url)
+        if entry is None:
+            fetch = True
+        elif entry[0] == DONE:
+            self.plan.done += 1
+            fetch = False
+        elif entry[1] < self.policy.max_attempts and self._now - entry[2] >= self.policy.retry_after:
+            self.plan.retries += 1
+            fetch = True
+        else:
+            self.plan.failed += 1
+            fetch = False
+        if fetch:
+            self.plan.todo.append(url)
+        return fetch
+
+    def todo(self, urls: Iterable[str]) -> Iterator[str]:
+        """The URLs of ``urls`` to fetch, as they come."""
+        for url in urls:
+            if self.add(url):
+                yield url.strip()
+
+
+def plan_crawl(urls: Iterable[str], journal: Optional['CrawlJournal'] = None,
+               policy: Optional[RetryPolicy] = None) -> CrawlPlan:
+    """Drop duplicate URLs and, with a journal, the URLs it says need no fetching."""
+    planner = CrawlPlanner(journal, policy)
+    for url in urls:
+        planner.add(url)
+    return planner.plan
+
+
+class CrawlJournal:
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path)
+        # A crash can lose at most the last commit, never corrupt earlier ones
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS crawl_journal ("
+                         "url TEXT PRIMARY KEY, status TEXT NOT NULL, attempts INTEGER NOT NULL, "
+                         "updated REAL NOT NULL, error TEXT, result TEXT NOT NULL)")
+        self._db.commit()
+
+    def entries(self) -> Dict[str, Tuple[str, int, float]]:
+        """``(status, attempts, updated)`` of every journaled URL."""
+        return {url: (status, attempts, updated) for url, status, attempts, updated
+                in self._db.execute("SELECT url, status, attempts, updated FROM crawl_journal")}
+
+    def record(self, url: str, result: Dict[str, Any], error: Optional[str] = None) -> None:
+        """Store the URL's audit result; with ``error`` it counts as a failed attempt."""
+        self._db.execute(
+            "INSERT INTO crawl_journal (url, status, attempts, updated, error, result) VALUES (?, ?, 1, ?, ?, ?) "
+            "ON CONFLICT (url) DO UPDATE SET status = excluded.status, attempts = attempts + 1, "
+            "updated = excluded.updated, error = excluded.error, result = excluded.result",
+            (url, FAILED if error else DONE, time.time(), error, json.dumps(result)))
+        self._db.commit()
+
+    def rows(self, urls: Iterable[str]) -> Iterator[List[Any]]:
+        """Audit rows for ``urls`` in that order; URLs without an entry get an empty row."""
+        for url in urls:
+            entry = self._db.execute("SELECT result FROM crawl_journal WHERE url = ?", (url,)).fetchone()
+            yield audit_row(json.loads(entry[0]) if entry else empty_result(url))
+
+    def write_output(self, urls: Iterable[str], output_file: str) -> None:
+        """Rewrite ``output_file`` from the journal, atomically."""
+        temporary = f"{output_file}.{os.getpid()}.tmp"
+        with open(temporary, 'w', newline='', encoding='utf-8') as output:
+            csv_writer = csv.writer(output)
+            csv_writer.writerow(AUDIT_COLUMNS)
+            csv_writer.writerows(self.rows(urls))
+        os.replace(temporary, output_file)
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
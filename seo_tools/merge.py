@@ -0,0 +1,242 @@
+"""URL normalization and N-way hash join for the CSV Merger.
+
+URLs are canonicalized with vectorized string operations. The key columns of
+all sources are factorized together into integer codes, and the join is
+computed from those codes with NumPy: matched rows and each source's unmatched
+rows come out of the same pass over the codes.
+
+Inputs that do not fit the memory budget are joined with a partitioned (Grace)
+hash join: every source is streamed in chunks and spilled to disk by key hash,
+and each partition is then joined in memory on its own.
+"""
+import math
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.ingest import MEMORY_EXPANSION, CompactReport, StreamSource, compact_dtypes, exceeds_memory_budget, read_csv_chunks
+from seo_tools.instrument import stage, staged
+
+# Scheme and leading "www." in one anchored pattern
+URL_PREFIX_PATTERN = r'^(?:https?://)?(?:www\.)?'
+
+
+def normalize_urls(urls: pd.Series) -> pd.Series:
+    """Lowercase, trim, drop the scheme and ``www.``, and drop trailing slashes.
+
+    URLs that end up empty become missing, so they never match each other.
+    """
+    urls = urls.astype('string').str.lower().str.strip()
+    urls = urls.str.replace(URL_PREFIX_PATTERN, '', regex=True).str.rstrip('/')
+    return urls.mask(urls == '')
+
+
+def find_url_column(columns: Iterable[str]) -> Optional[str]:
+    """Return the first column with 'url' in its name."""
+    return next((col for col in columns if 'url' in col), None)
+
+
+def add_page_columns(data: pd.DataFrame, columns: pd.DataFrame, url_column: str = 'url') -> pd.DataFrame:
+    """Add the columns of ``columns``, indexed by normalized URL, to the matching rows of ``data``.
+
+    Where ``data`` already has one of the columns, its values are kept for the
+    URLs ``columns`` has no value for.
+    """
+    matched = columns.reindex(normalize_urls(data[url_column]))
+    for column in columns.columns:
+        values = matched[column].array
+        if column in data.columns:
+            values = pd.Series(values, index=data.index).fillna(data[column]).array
+        data[column] = values
+    return data
+
+
+def prepare_frame(frame: pd.DataFrame) -> Tuple[str, CompactReport]:
+    """Lowercase the column names, normalize the URL column and compact the other columns, in place.
+
+    Returns the URL column's name and the compaction report.
+    """
+    frame.columns = frame.columns.str.strip().str.lower()
+    key = find_url_column(frame.columns)
+    if key is None:
+        raise ValueError("URL column not found")
+    with stage('normalize urls', rows=len(frame)):
+        frame[key] = normalize_urls(frame[key])
+    # Store float64 counts as small nullable ints and repeated text as categoricals
+    return key, compact_dtypes(frame, skip=(key,))
+
+
+def join_codes(left_codes: np.ndarray, right_codes: np.ndarray, code_count: int):
+    """Inner-join two arrays of key codes (-1 = missing key, never matches).
+
+    Returns ``(left_index, right_index, left_only, right_only)``: positional
+    indexes of every matched pair, in left order, and boolean masks of the rows
+    without a partner.
+    """
+    order = np.argsort(right_codes, kind='stable')
+    sorted_codes = right_codes[order]
+    starts = np.searchsorted(sorted_codes, left_codes, side='left')
+    counts = np.searchsorted(sorted_codes, left_codes, side='right') - starts
+    counts[left_codes < 0] = 0
+
+    left_index = np.repeat(np.arange(len(left_codes)), counts)
+    # Position of each pair inside the right rows sharing its key
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    right_index = order[np.repeat(starts, counts) + within]
+
+    in_left = np.zeros(code_count, dtype=bool)
+    in_left[left_codes[left_codes >= 0]] = True
+    right_only = (right_codes < 0) | ~in_left[np.maximum(right_codes, 0)]
+    return left_index, right_index, counts == 0, right_only
+
+
+def source_names(file_names: Iterable[str]) -> List[str]:
+    """Short, unique names for the sources, used as column suffixes and in report names."""
+    names = []
+    for file_name in file_names:
+        name = os.path.splitext(os.path.basename(file_name))[0] or 'source'
+        candidate, number = name, 2
+        while candidate in names:
+            candidate, number = f"{name}_{number}", number + 1
+        names.append(candidate)
+    return names
+
+
+@dataclass
+class MergeResult:
+    merged: pd.DataFrame
+    # Rows of each source whose URL is missing from at least one other source
+    unmatched: Dict[str, pd.DataFrame]
+
+
+def _renamed_columns(frames: List[pd.DataFrame], keys: List[str], names: List[str]) -> List[Dict[str, str]]:
+    # A column name used by more than one source gets that source's name as suffix
+    counts = Counter(col for frame, key in zip(frames, keys) for col in frame.columns if col != key)
+    counts[keys[0]] += 1
+    return [{col: f"{col}_{name}" for col in frame.columns if col != key and counts[col] > 1}
+            for frame, key, name in zip(frames, keys, names)]
+
+
+@staged('join')
+def merge_frames(frames: List[pd.DataFrame], keys: List[str], names: List[str]) -> MergeResult:
+    """Inner-join any number of frames on their (already normalized) URL key columns.
+
+    The merged frame has one key column, named after the first source's key.
+    Duplicate URLs within a source produce one merged row per combination,
+    like chained ``pd.merge`` calls would.
+    """
+    codes, uniques = pd.factorize(pd.concat([frame[key] for frame, key in zip(frames, keys)], ignore_index=True))
+    bounds = np.cumsum([0] + [len(frame) for frame in frames])
+    source_codes = [codes[bounds[i]:bounds[i + 1]] for i in range(len(frames))]
+
+    in_all = np.ones(len(uniques), dtype=bool)
+    for source in source_codes:
+        present = np.zeros(len(uniques), dtype=bool)
+        present[source[source >= 0]] = True
+        in_all &= present
+    # Without a single usable URL (blank keys only) nothing matches and every row is unmatched
+    matched = [(source >= 0) & in_all[np.maximum(source, 0)] if len(uniques) else np.zeros(len(source), dtype=bool)
+               for source in source_codes]
+
+    renames = _renamed_columns(frames, keys, names)
+    merged = frames[0].loc[matched[0]].rename(columns=renames[0]).reset_index(drop=True)
+    merged_codes = source_codes[0][matched[0]]
+    for frame, key, rename, source, mask in zip(frames[1:], keys[1:], renames[1:], source_codes[1:], matched[1:]):
+        part = frame.loc[mask].drop(columns=[key]).rename(columns=rename).reset_index(drop=True)
+        left_index, right_index, _, _ = join_codes(merged_codes, source[mask], len(uniques))
+        merged = pd.concat([merged.take(left_index).reset_index(drop=True),
+                            part.take(right_index).reset_index(drop=True)], axis=1)
+        merged_codes = merged_codes[left_index]
+
+    unmatched = {name: frame.loc[~mask].reset_index(drop=True) for frame, name, mask in zip(frames, names, matched)}
+    return MergeResult(merged=merged, unmatched=unmatched)
+
+
+CHUNK_ROWS = 200_000
+
+
+def needs_external_merge(total_bytes: int, memory_budget: int) -> bool:
+    return exceeds_memory_budget(total_bytes, memory_budget)
+
+
+@dataclass
+class ExternalMergeResult:
+    merged_path: str
+    unmatched_paths: Dict[str, str]
+    matched_rows: int = 0
+    unmatched_rows: Dict[str, int] = field(default_factory=dict)
+
+
+def _spill(path: str, frame: pd.DataFrame) -> None:
+    frame.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+
+def _load_partition(path: str, columns: List[str], key: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame({col: pd.Series(dtype=str) for col in columns})
+    frame = pd.read_csv(path, dtype=str, keep_default_na=False)
+    frame[key] = frame[key].mask(frame[key] == '')
+    return frame
+
+
+def merge_external(sources: List[StreamSource], names: List[str], workdir: str, memory_budget: int,
+                   total_bytes: Optional[int] = None, chunk_rows: int = CHUNK_ROWS) -> ExternalMergeResult:
+    """N-way merge of CSV sources that do not fit in memory together.
+
+    Every source is read in chunks, its URLs normalized, and its rows spilled
+    to one file per hash partition under ``workdir``. Partitions are then
+    merged one at a time with ``merge_frames`` and appended to
+    ``merged.csv`` and one ``unmatched_<name>.csv`` per source.
+    """
+    if total_bytes is None:
+        total_bytes = sum(os.path.getsize(source) for source in sources if isinstance(source, str))
+    # Aim for partitions that use about half the budget
+    partitions = max(2, math.ceil(2 * total_bytes * MEMORY_EXPANSION / memory_budget))
+    spill_dir = os.path.join(workdir, 'partitions')
+    os.makedirs(spill_dir, exist_ok=True)
+
+    keys, headers = [], []
+    for index, source in enumerate(sources):
+        key = None
+        with stage('partition') as partitioning:
+            for chunk in read_csv_chunks(source, chunk_rows):
+                chunk.columns = chunk.columns.str.strip().str.lower()
+                if key is None:
+                    key = find_url_column(chunk.columns)
+                    if key is None:
+                        raise ValueError(f"URL column not found in {names[index]}")
+                    keys.append(key)
+                    headers.append(list(chunk.columns))
+                chunk[key] = normalize_urls(chunk[key])
+                partition = pd.util.hash_pandas_object(chunk[key], index=False).to_numpy() % partitions
+                for number, rows in chunk.groupby(partition, sort=False):
+                    _spill(os.path.join(spill_dir, f"{number}-{index}.csv"), rows)
+                partitioning.rows = len(chunk)
+
+    result = ExternalMergeResult(
+        merged_path=os.path.join(workdir, 'merged.csv'),
+        unmatched_paths={name: os.path.join(workdir, f"unmatched_{name}.csv") for name in names},
+        unmatched_rows={name: 0 for name in names},
+    )
+    for number in range(partitions):
+        with stage('load partition') as loading:
+            frames = [_load_partition(os.path.join(spill_dir, f"{number}-{index}.csv"), headers[index], keys[index])
+                      for index in range(len(sources))]
+            loading.rows = sum(len(frame) for frame in frames)
+        merged = merge_frames(frames, keys, names)
+        with stage('write csv', rows=len(merged.merged)):
+            _spill(result.merged_path, merged.merged)
+            result.matched_rows += len(merged.merged)
+            for name, rows in merged.unmatched.items():
+                _spill(result.unmatched_paths[name], rows)
+                result.unmatched_rows[name] += len(rows)
+        for index in range(len(sources)):
+            path = os.path.join(spill_dir, f"{number}-{index}.csv")
+            if os.path.exists(path):
+                os.remove(path)
+    os.rmdir(spill_dir)
+    return result
@@ -0,0 +1,185 @@
+"""Near-duplicate pages from MinHash signatures and locality-sensitive hashing.
+
+The audit keeps a MinHash signature of every page's visible text (the
+'Content MinHash' column): for each of ``NUM_PERM`` hash functions, the
+smallest hash over the page's word shingles. The share of positions where
+two signatures agree estimates the Jaccard similarity of the two pages.
+
+``near_duplicate_clusters`` cuts every signature into ``bands`` bands. Pages
+that agree on a whole band land in the same bucket, and only pages that share
+a bucket are compared. The work therefore grows with the number of pages
+rather than the number of pairs. Pairs at or above the similarity threshold
+are joined into clusters.
+"""
+import base64
+import string
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.merge import normalize_urls
+
+NUM_PERM = 128
+SHINGLE_WORDS = 5
+# 16 bands of 8 rows: pairs from about 0.7 similarity up become candidates
+BANDS = 16
+DEFAULT_SIMILARITY = 0.8
+
+CLUSTER_COLUMN = 'Near-duplicate cluster'
+SIMILARITY_COLUMN = 'Near-duplicate similarity'
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+# Fixed seed: signatures from different runs must stay comparable
+_rng = np.random.default_rng(0x5EED)
+# Multiply-shift hash functions on 32-bit shingle hashes: (a * x + b) >> 32, a odd
+_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+# Polynomial hash of byte strings modulo 2 ** 64; the base is odd, so it has an inverse
+_BASE = 0x100000001B3
+# Bytes that end a word: ASCII other than letters and digits. UTF-8 sequences of
+# other scripts are kept as word bytes; common typographic punctuation is
+# mapped to ASCII first.
+_WORD_BYTES = np.zeros(256, dtype=bool)
+_WORD_BYTES[[ord(c) for c in string.ascii_lowercase + string.digits]] = True
+_WORD_BYTES[0x80:] = True
+_TYPOGRAPHY = str.maketrans({c: ' ' for c in '\u00a0\u2018\u2019\u201a\u201c\u201d\u201e\u2013\u2014\u2026\u00ab\u00bb'})
+_powers = np.ones(1, dtype=np.uint64)
+_inverse_powers = np.ones(1, dtype=np.uint64)
+
+
+def _power_tables(length: int):
+    global _powers, _inverse_powers
+    if len(_powers) < length:
+        size = max(length, 2 * len(_powers))
+        powers = np.cumprod(np.full(size, _BASE, dtype=np.uint64))
+        inverse_powers = np.cumprod(np.full(size, pow(_BASE, -1, 2 ** 64), dtype=np.uint64))
+        _inverse_powers = np.concatenate([np.ones(1, dtype=np.uint64), inverse_powers[:-1]])
+        _powers = np.concatenate([np.ones(1, dtype=np.uint64), powers[:-1]])
+    return _powers[:length], _inverse_powers[:length]
+
+
+def shingle_hashes(text: str, words: int = SHINGLE_WORDS) -> np.ndarray:
+    """32-bit hashes of the overlapping ``words``-word shingles of ``text``, lowercased.
+
+    The text is reduced to its words separated by single spaces, so every
+    shingle is a slice of it and its hash is taken from prefix hashes of the
+    bytes instead of hashing each word in Python.
+    """
+    data = np.frombuffer(text.lower().translate(_TYPOGRAPHY).encode('utf-8'), dtype=np.uint8)
+    word = _WORD_BYTES[data]
+    # Keep the word bytes and the first separator after each word
+    keep = word.copy()
+    keep[1:] |= word[:-1]
+    values = np.where(word, data, ord(' '))[keep].astype(np.uint64)
+    if len(values) and values[-1] == ord(' '):
+        values = values[:-1]
+    if not len(values):
+        return np.empty(0, dtype=np.uint64)
+    powers, inverse_powers = _power_tables(len(values) + 1)
+    # prefix[k] is the hash of the first k bytes
+    prefix = np.zeros(len(values) + 1, dtype=np.uint64)
+    prefix[1:] = powers[:-1] * np.cumsum(values * inverse_powers[:-1])
+    spaces = np.flatnonzero(values == ord(' '))
+    starts = np.concatenate([[0], spaces + 1])
+    ends = np.concatenate([spaces, [len(values)]])
+    # Pages shorter than one shingle are a single shingle of all their words
+    width = min(words, len(starts))
+    first, last = starts[:len(starts) - width + 1], ends[width - 1:]
+    hashes = prefix[last] - prefix[first] * powers[last - first]
+    return (hashes ^ (hashes >> np.uint64(32))) & _MASK32
+
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """The ``NUM_PERM`` MinHash signature of ``text`` as uint32, or None for a page without words."""
+    shingles = np.unique(shingle_hashes(text))
+    if not len(shingles):
+        return None
+    permuted = (_A[:, None] * shingles[None, :] + _B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def encode_signature(signature: Optional[np.ndarray]) -> str:
+    return '' if signature is None else base64.b64encode(signature.astype('<u4').tobytes()).decode('ascii')
+
+
+def decode_signatures(encoded: Iterable[str]) -> np.ndarray:
+    """A ``(pages, NUM_PERM)`` uint32 array; pages without a signature get a row of zeros."""
+    encoded = list(encoded)
+    signatures = np.zeros((len(encoded), NUM_PERM), dtype=np.uint32)
+    for row, value in enumerate(encoded):
+        if isinstance(value, str) and value:
+            signatures[row] = np.frombuffer(base64.b64decode(value), dtype='<u4')
+    return signatures
+
+
+def _band_keys(band: np.ndarray) -> np.ndarray:
+    # Any 64-bit mix of the band's values; a collision only adds a candidate that fails verification
+    keys = np.zeros(len(band), dtype=np.uint64)
+    for column in band.T:
+        keys = keys * np.uint64(0x100000001B3) + column.astype(np.uint64)
+    return keys
+
+
+def _find(parent: np.ndarray, node: int) -> int:
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+
+def near_duplicate_clusters(signatures: np.ndarray, threshold: float = DEFAULT_SIMILARITY,
+                            bands: int = BANDS) -> pd.DataFrame:
+    """Cluster pages whose signatures agree on at least ``threshold`` of their positions.
+
+    Returns one row per page with the cluster number (<NA> for pages without
+    near-duplicates) and the highest similarity to another page in the
+    cluster. Rows of zeros (pages without a signature) are never clustered.
+    """
+    pages, perms = signatures.shape
+    rows = perms // bands
+    valid = signatures.any(axis=1)
+    left, right = [], []
+    for band in range(bands):
+        keys = _band_keys(signatures[:, band * rows:(band + 1) * rows])
+        codes = pd.factorize(keys)[0]
+        codes[~valid] = -1
+        # Neighbours in a bucket become candidate pairs; joined pairs connect the whole bucket
+        order = np.argsort(codes, kind='stable')
+        ordered = codes[order]
+        same = (ordered[1:] == ordered[:-1]) & (ordered[1:] >= 0)
+        left.append(order[:-1][same])
+        right.append(order[1:][same])
+    left, right = np.concatenate(left), np.concatenate(right)
+    if len(left):
+        pairs = np.unique(np.minimum(left, right).astype(np.int64) * pages + np.maximum(left, right))
+        left, right = pairs // pages, pairs % pages
+    similarity = (signatures[left] == signatures[right]).mean(axis=1) if len(left) else np.empty(0)
+    keep = similarity >= threshold
+    left, right, similarity = left[keep], right[keep], similarity[keep]
+
+    parent = np.arange(pages)
+    for a, b in zip(left.tolist(), right.tolist()):
+        root_a, root_b = _find(parent, a), _find(parent, b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    roots = np.array([_find(parent, node) for node in range(pages)], dtype=np.int64)
+    best = np.full(pages, np.nan)
+    if len(left):
+        best[left] = -np.inf
+        best[right] = -np.inf
+        np.maximum.at(best, left, similarity)
+        np.maximum.at(best, right, similarity)
+    clustered = ~np.isnan(best)
+    # Clusters are numbered 1, 2, ... in order of their first page
+    numbers = pd.Series(pd.factorize(roots[clustered])[0] + 1)
+    cluster = pd.array([pd.NA] * pages, dtype='Int64')
+    cluster[clustered] = numbers.to_numpy()
+    return pd.DataFrame({CLUSTER_COLUMN: cluster, SIMILARITY_COLUMN: best})
+
+
+def audit_clusters(audit: pd.DataFrame, threshold: float = DEFAULT_SIMILARITY) -> pd.DataFrame:
+    """Near-duplicate clusters of the pages in an audit CSV, keyed by normalized URL."""
+    clusters = near_duplicate_clusters(decode_signatures(audit['Content MinHash'].fillna('')), threshold)
+    clusters.index = pd.Index(normalize_urls(audit['URL']), name='url')
+    return clusters[clusters.index.notna() & ~clusters.index.duplicated()]
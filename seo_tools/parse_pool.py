@@ -0,0 +1,85 @@
+"""Process pool for the CPU-bound half of the audit: extracting fields from page HTML.
+
+The concurrent crawler fetches on a single event loop, and parsing on that
+loop as well would hold the whole crawl to one core. A ParsePool hands the
+fetched bodies to worker processes instead. No more than ``max_pending``
+bodies can be queued for or inside the pool at once. Fetch workers wait for a
+free slot before handing over another body, so a slow parser holds up
+fetching rather than letting fetched pages pile up in memory.
+"""
+import asyncio
+import collections
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from seo_tools.audit import PAGE_FIELDS, empty_result, extract_page_fields
+
+
+def parse_page(url: str, html: str, backend: str = 'html.parser') -> Dict[str, Any]:
+    """The on-page fields of ``html`` as ``extract_page_fields`` fills them; runs in a worker process."""
+    result = empty_result(url)
+    extract_page_fields(url, html, result, backend)
+    return {column: result[column] for column in PAGE_FIELDS}
+
+
+def _context():
+    # The crawl runs threads (aiohttp, Streamlit); forking them can deadlock a worker on a lock held at fork time
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class ParsePool:
+    def __init__(self, workers: Optional[int] = None, backend: str = 'html.parser', max_pending: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.backend = backend
+        self.max_pending = max_pending or self.workers * 4
+        self.parsed = 0
+        # How often a body had to wait for a free slot, i.e. parsing was the bottleneck
+        self.waits = 0
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context())
+
+    async def parse(self, url: str, html: str) -> Dict[str, Any]:
+        """The on-page fields of ``html``, parsed in the pool once a slot is free."""
+        if self._slots.locked():
+            self.waits += 1
+        async with self._slots:
+            fields = await asyncio.get_running_loop().run_in_executor(self._executor, parse_page, url, html, self.backend)
+        self.parsed += 1
+        return fields
+
+    def map(self, pages: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Parse ``(url, html)`` pairs, yielding ``(url, fields)`` in input order.
+
+        ``pages`` is consumed lazily: once ``max_pending`` pages are submitted
+        the next one is only read after the oldest one is yielded.
+        """
+        pending: collections.deque = collections.deque()
+        for url, html in pages:
+            if len(pending) >= self.max_pending:
+                self.waits += 1
+                yield self._next(pending)
+            pending.append((url, self._executor.submit(parse_page, url, html, self.backend)))
+        while pending:
+            yield self._next(pending)
+
+    def _next(self, pending: collections.deque) -> Tuple[str, Dict[str, Any]]:
+        url, future = pending.popleft()
+        fields = future.result()
+        self.parsed += 1
+        return url, fields
+
+    def summary(self) -> str:
+        return (f"Parse pool: {self.parsed} pages parsed by {self.workers} processes; "
+                f"waited {self.waits} times for a free slot (max {self.max_pending} pending)")
+
+    def close(self) -> None:
+        self._executor.shutdown()
+
+    def __enter__(self) -> 'ParsePool':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
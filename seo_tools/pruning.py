@@ -0,0 +1,187 @@
+"""Content pruning: column preparation and vectorized pruning rules.
+
+The enabled thresholds and the "Older than" date are compiled once into a list
+of column comparisons and evaluated column-wise, instead of looping over the
+thresholds for every row with ``DataFrame.apply``.
+
+The pipeline the pruning page runs (``normalize_columns``, ``prepare_data``,
+``process_data``) lives here as well, so batch runs can use it without
+Streamlit; ``prune_csv`` runs it over a file in chunks.
+"""
+import datetime
+import itertools
+import operator
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.dates import parse_dates
+from seo_tools.ingest import StreamSource, compact_dtypes, read_csv_chunks
+from seo_tools.instrument import stage, staged
+from seo_tools.linkgraph import DEPTH_COLUMN
+from seo_tools.merge import add_page_columns
+from seo_tools.neardup import SIMILARITY_COLUMN
+
+DATE_COLUMN = 'Laatste wijziging'
+
+# Metrics where a higher value is worse; every other metric is "too low" below its threshold.
+HIGHER_IS_WORSE = ('Average position', SIMILARITY_COLUMN, DEPTH_COLUMN)
+
+# The pruning page's default thresholds
+DEFAULT_THRESHOLDS = {
+    'Sessions': 1000,
+    'Views': 1000,
+    'Clicks': 50,
+    'Impressions': 500,
+    'Average position': 19.0,
+    'Ahrefs Backlinks - Exact': 1,
+    'Word Count': 500,
+    'Unique Inlinks': 0,
+    'Ahrefs URL Rating - Exact': 5,
+    'Ahrefs Keywords Top 3 - Exact': 1,
+    'Ahrefs Keywords Top 10 - Exact': 2,
+}
+
+COLUMN_MAPPING = {
+    'sessions': 'Sessions',
+    'views': 'Views',
+    'clicks': 'Clicks',
+    'impressions': 'Impressions',
+    'average position': 'Average position',
+    'ahrefs backlinks - exact': 'Ahrefs Backlinks - Exact',
+    'word count': 'Word Count',
+    'laatste wijziging': 'Laatste wijziging',
+    'unique inlinks': 'Unique Inlinks',
+    'ahrefs keywords top 3 - exact': 'Ahrefs Keywords Top 3 - Exact',
+    'ahrefs keywords top 10 - exact': 'Ahrefs Keywords Top 10 - Exact',
+}
+
+# Bump when prepare_data changes, so frames cached by older code are not reused
+PREPARED_CACHE_VERSION = 3
+
+CHUNK_ROWS = 100_000
+
+Rule = Tuple[str, Callable[[pd.Series, float], pd.Series], float]
+
+
+def compile_rules(thresholds: Dict[str, float], columns: Iterable[str]) -> List[Rule]:
+    """Turn the enabled thresholds into ``(column, comparison, value)`` rules.
+
+    Thresholds without a matching column are skipped, like the row-wise check did.
+    """
+    columns = set(columns)
+    rules = []
+    for key, value in thresholds.items():
+        if key in columns:
+            compare = operator.gt if key in HIGHER_IS_WORSE else operator.lt
+            rules.append((key, compare, value))
+    return rules
+
+
+def delete_mask(data: pd.DataFrame, rules: List[Rule],
+                older_than_date: Optional[datetime.date] = None,
+                dates: Optional[pd.Series] = None) -> np.ndarray:
+    """Return a boolean array that is True for rows matching every rule.
+
+    Rows with an unknown modification date pass the date rule. ``dates`` may be
+    given as an already parsed datetime64 series to skip re-parsing the column.
+    """
+    mask = np.ones(len(data), dtype=bool)
+    for column, compare, value in rules:
+        # Missing values never satisfy a threshold, including <NA> in nullable columns
+        mask &= compare(data[column], value).to_numpy(dtype=bool, na_value=False)
+    if older_than_date:
+        if dates is None:
+            dates = pd.to_datetime(data[DATE_COLUMN], errors='coerce')
+        mask &= (dates.isna() | (dates < pd.Timestamp(older_than_date))).to_numpy(dtype=bool)
+    return mask
+
+
+def normalize_columns(data: pd.DataFrame) -> pd.DataFrame:
+    # Convert column names to lowercase for case-insensitive matching
+    data.columns = data.columns.str.lower().str.strip()
+    
+    # Rename columns if they exist
+    return data.rename(columns={k: v for k, v in COLUMN_MAPPING.items() if k in data.columns})
+
+
+@staged('prepare columns')
+def prepare_data(data: pd.DataFrame) -> pd.DataFrame:
+    # Convert columns to appropriate types; independent of the thresholds, so the result is cached per upload
+    if 'Average position' in data.columns:
+        data['Average position'] = pd.to_numeric(data['Average position'], errors='coerce')
+    # A parsed column has lost its unparsed values; parsing it again would reset their count to 0
+    if DATE_COLUMN in data.columns and not pd.api.types.is_datetime64_any_dtype(data[DATE_COLUMN]):
+        parsed = parse_dates(data[DATE_COLUMN])
+        data[DATE_COLUMN] = parsed.dates
+        # Kept with the frame (and its Parquet cache) so the page can report it
+        data.attrs['unparsed_dates'] = parsed.unparsed
+    if 'Unique Inlinks' in data.columns:
+        data['Unique Inlinks'] = pd.to_numeric(data['Unique Inlinks'], errors='coerce').astype('Int64')
+    return data
+
+
+def compact(data: pd.DataFrame) -> pd.DataFrame:
+    # Smallest nullable int types for the float64-stored counts, compact strings for text
+    report = compact_dtypes(data)
+    data.attrs['memory_before'], data.attrs['memory_after'] = report.before, report.after
+    return data
+
+
+def process_data(data: pd.DataFrame, thresholds: Dict[str, float], older_than_date: Optional[datetime.date]) -> pd.DataFrame:
+    # No-ops for frames that already went through prepare_data
+    data = prepare_data(data)
+    with stage('apply rules', rows=len(data)):
+        return _apply_rules(data, thresholds, older_than_date)
+
+
+def _apply_rules(data: pd.DataFrame, thresholds: Dict[str, float], older_than_date: Optional[datetime.date]) -> pd.DataFrame:
+    modified = data[DATE_COLUMN]
+    data[DATE_COLUMN] = modified.dt.date
+
+    rules = compile_rules(thresholds, data.columns)
+    data['To Delete'] = delete_mask(data, rules, older_than_date, dates=modified)
+    # Missing backlink counts (<NA> in nullable columns) never need checking
+    data['Backlinks controleren'] = (data['To Delete'] & 
+                                     (data['Ahrefs Backlinks - Exact'] > thresholds.get('Backlinks', float('inf'))).to_numpy(dtype=bool, na_value=False) 
+                                     if 'Ahrefs Backlinks - Exact' in data.columns else False)
+    data['Action'] = 'Geen actie'
+    data.loc[data['To Delete'], 'Action'] = 'Verwijderen'
+    data.loc[data['Backlinks controleren'], 'Action'] = 'Backlinks controleren'
+    return data
+
+
+def prune_csv(source: StreamSource, target: str, thresholds: Dict[str, float],
+              older_than_date: Optional[datetime.date], actions_only: bool = False,
+              chunk_rows: int = CHUNK_ROWS, page_columns: Optional[pd.DataFrame] = None) -> Dict[str, int]:
+    """Run the pruning pipeline over ``source`` one chunk at a time and write the result to ``target``.
+
+    Rows without a known modification date are left out, as on the page.
+    ``page_columns``, indexed by normalized URL (see
+    ``seo_tools.neardup.audit_clusters`` and ``seo_tools.linkgraph.link_metrics``),
+    are added to the matching rows first, so thresholds can use them.
+    Returns the row counts the page shows.
+    """
+    counts = {'total': 0, 'Verwijderen': 0, 'Backlinks controleren': 0, 'unparsed_dates': 0}
+    chunks = read_csv_chunks(source, chunk_rows, as_text=False)
+    for number in itertools.count():
+        with stage('read chunk') as reading:
+            chunk = next(chunks, None)
+            reading.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        chunk = compact(prepare_data(normalize_columns(chunk)))
+        if page_columns is not None:
+            with stage('page columns', rows=len(chunk)):
+                chunk = add_page_columns(chunk, page_columns)
+        counts['unparsed_dates'] += chunk.attrs.get('unparsed_dates', 0)
+        processed = process_data(chunk, thresholds, older_than_date).dropna(subset=[DATE_COLUMN])
+        counts['total'] += len(processed)
+        for action in ('Verwijderen', 'Backlinks controleren'):
+            counts[action] += int((processed['Action'] == action).sum())
+        if actions_only:
+            processed = processed[processed['Action'] != 'Geen actie']
+        with stage('write csv', rows=len(processed)):
+            processed.to_csv(target, mode='w' if number == 0 else 'a', header=number == 0, index=False)
+    return counts
@@ -0,0 +1,107 @@
+"""Paged result views and cached download files.
+
+A processed frame is shown a page at a time: filtering and sorting produce an
+array of row positions, computed once per view setting, and only the rows of
+the current page are handed to the browser. Downloads are written to disk
+once per result content hash and format, and served from the file.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.frame_cache import DEFAULT_DIRECTORY, HAS_PYARROW, trim_directory
+from seo_tools.instrument import stage
+
+# Format -> (file suffix, MIME type)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    'csv': ('.csv', 'text/csv'),
+    'csv.gz': ('.csv.gz', 'application/gzip'),
+}
+if HAS_PYARROW:
+    EXPORT_FORMATS['parquet'] = ('.parquet', 'application/vnd.apache.parquet')
+
+DEFAULT_EXPORT_DIRECTORY = os.path.join(DEFAULT_DIRECTORY, 'exports')
+DEFAULT_EXPORT_MAX_BYTES = 1024 ** 3
+MAX_CACHED_ORDERS = 8
+
+
+def frame_hash(frame: pd.DataFrame) -> str:
+    """Content hash of a frame: its column names and the hashed values of every row."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update('\x1f'.join(map(str, frame.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ExportCache:
+    def __init__(self, directory: str = DEFAULT_EXPORT_DIRECTORY, max_bytes: int = DEFAULT_EXPORT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, frame: pd.DataFrame, export_format: str, key: Optional[str] = None) -> str:
+        """Path of ``frame`` written in ``export_format``; written only if that file does not exist yet."""
+        suffix, _ = EXPORT_FORMATS[export_format]
+        path = os.path.join(self.directory, f"{key or frame_hash(frame)}{suffix}")
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)
+                return path
+            temporary = f"{path}.{os.getpid()}.tmp"
+            try:
+                with stage(f"export {export_format}", rows=len(frame)):
+                    if export_format == 'parquet':
+                        frame.to_parquet(temporary, index=False)
+                    else:
+                        frame.to_csv(temporary, index=False, compression='gzip' if export_format == 'csv.gz' else None)
+                os.replace(temporary, path)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+            trim_directory(self.directory, self.max_bytes, tuple(suffix for suffix, _ in EXPORT_FORMATS.values()))
+        return path
+
+
+class ResultPager:
+    """Filtered, sorted pages of one result frame."""
+
+    def __init__(self, frame: pd.DataFrame, key: Optional[str] = None):
+        self.frame = frame
+        self.key = key or frame_hash(frame)
+        self._orders: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+
+    def rows(self, filter_column: Optional[str] = None, values: Optional[Sequence] = None,
+             sort_by: Optional[str] = None, ascending: bool = True) -> np.ndarray:
+        """Positions of the rows whose ``filter_column`` is in ``values``, in ``sort_by`` order."""
+        setting = (filter_column, tuple(values) if values is not None else None, sort_by, ascending)
+        order = self._orders.get(setting)
+        if order is not None:
+            self._orders.move_to_end(setting)
+            return order
+        order = np.arange(len(self.frame))
+        if filter_column is not None and values is not None:
+            order = order[self.frame[filter_column].isin(values).to_numpy()]
+        if sort_by is not None:
+            column = self.frame[sort_by].take(order)
+            # Stable, with missing values last in either direction
+            order = order[column.reset_index(drop=True).sort_values(ascending=ascending, kind='stable',
+                                                                    na_position='last').index.to_numpy()]
+        self._orders[setting] = order
+        while len(self._orders) > MAX_CACHED_ORDERS:
+            self._orders.popitem(last=False)
+        return order
+
+    def page(self, number: int, size: int, **view) -> pd.DataFrame:
+        """Rows of page ``number`` (from 1) with ``size`` rows per page, for the view settings in ``view``."""
+        order = self.rows(**view)
+        start = (number - 1) * size
+        return self.frame.take(order[start:start + size])
+
+    def page_count(self, size: int, **view) -> int:
+        return max(1, -(-len(self.rows(**view)) // size))
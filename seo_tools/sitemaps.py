@@ -0,0 +1,230 @@
+"""Streaming sitemap discovery for the audit.
+
+Sitemaps and sitemap indexes are parsed while they download, a chunk at a
+time. ``XMLPullParser`` is iterparse's incremental form, and gzipped sitemaps
+(``sitemap-1.xml.gz``) are gunzipped on the fly. Each ``<url>`` or
+``<sitemap>`` entry is dropped from the tree once its ``<loc>`` is read, so
+the parse tree stays flat however large the sitemap is. A sitemap's URLs are
+handed on once its download is complete: an audit reading them while the
+response is still open would stall the download for hours, and servers drop
+stalled connections. ``discover_urls`` fetches the child sitemaps of an index
+concurrently and yields every page URL the first time it is found, so the
+crawl can start before discovery is done.
+"""
+import asyncio
+import xml.etree.ElementTree as ElementTree
+import zlib
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Tuple
+
+import aiohttp
+import requests
+
+PAGE = 'url'
+SITEMAP = 'sitemap'
+CHUNK_BYTES = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def is_url(source: str) -> bool:
+    """Whether an audit input is a sitemap URL rather than a file of URLs."""
+    return source.startswith(('http://', 'https://'))
+
+
+@dataclass
+class SitemapStats:
+    sitemaps: int = 0
+    failed: int = 0
+    urls: int = 0
+    duplicates: int = 0
+    bytes: int = 0
+
+    def summary(self) -> str:
+        return (f"Sitemaps: {self.sitemaps} read ({self.failed} failed, {self.bytes / 1e6:.1f} MB), "
+                f"{self.urls} URLs found, {self.duplicates} duplicates dropped")
+
+
+class SitemapParser:
+    """Incremental parser for one sitemap or sitemap index body, gzipped or not.
+
+    ``feed`` takes the body in chunks as they arrive and returns the
+    ``(kind, loc)`` entries completed so far, ``kind`` being ``PAGE`` or
+    ``SITEMAP``. Namespaces are ignored, since not every sitemap declares the
+    standard one.
+    """
+
+    def __init__(self):
+        self._xml = ElementTree.XMLPullParser(events=('start', 'end'))
+        self._gunzip = None
+        self._head = b''
+        self._root: Optional[ElementTree.Element] = None
+        self._depth = 0
+        self._loc: Optional[str] = None
+        self.bytes = 0
+
+    def feed(self, chunk: bytes) -> List[Tuple[str, str]]:
+        self.bytes += len(chunk)
+        if self._head is not None:
+            # Wait for enough bytes to tell a gzip stream from plain XML
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return []
+            chunk, self._head = self._head, None
+            if chunk.startswith(GZIP_MAGIC):
+                self._gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._gunzip is not None:
+            chunk = self._gunzip.decompress(chunk)
+        self._xml.feed(chunk)
+        return self._entries()
+
+    def close(self) -> List[Tuple[str, str]]:
+        if self._head:
+            chunk, self._head = self._head, None
+            self._xml.feed(chunk)
+        elif self._gunzip is not None:
+            self._xml.feed(self._gunzip.flush())
+        self._xml.close()
+        return self._entries()
+
+    def _entries(self) -> List[Tuple[str, str]]:
+        entries = []
+        for event, element in self._xml.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = element
+                self._depth += 1
+                continue
+            self._depth -= 1
+            tag = element.tag.rpartition('}')[2]
+            # <urlset><url><loc>: deeper <loc>s belong to extensions such as <image:image>
+            if tag == 'loc' and self._depth == 2:
+                self._loc = (element.text or '').strip()
+            elif tag in (PAGE, SITEMAP) and self._depth == 1:
+                if self._loc:
+                    entries.append((tag, self._loc))
+                self._loc = None
+                # Finished entries are all the root holds; dropping them keeps memory flat
+                self._root.clear()
+        return entries
+
+
+def _read(sitemap: str, chunks: Iterable[bytes], stats: SitemapStats) -> Iterator[Tuple[str, str]]:
+    parser = SitemapParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+    stats.sitemaps += 1
+    stats.bytes += parser.bytes
+
+
+def iter_sitemap_urls(sitemaps: Iterable[str], stats: Optional[SitemapStats] = None,
+                      session: Optional[requests.Session] = None) -> Iterator[str]:
+    """The page URLs in ``sitemaps`` and the sitemaps they index, one sitemap at a time, without duplicates."""
+    stats = stats or SitemapStats()
+    session = session or requests.Session()
+    pending = list(dict.fromkeys(sitemaps))
+    seen_sitemaps, seen_urls = set(pending), set()
+    while pending:
+        sitemap = pending.pop()
+        # Read the whole sitemap before yielding, so the response is not kept open while pages are audited
+        entries = []
+        try:
+            with session.get(sitemap, stream=True) as response:
+                response.raise_for_status()
+                entries.extend(_read(sitemap, response.iter_content(CHUNK_BYTES), stats))
+        except (requests.RequestException, ElementTree.ParseError, zlib.error) as e:
+            stats.failed += 1
+            print(f"Error reading sitemap {sitemap}: {e}")
+        # The entries read before an error are still used
+        for kind, loc in entries:
+            if kind == SITEMAP:
+                if loc not in seen_sitemaps:
+                    seen_sitemaps.add(loc)
+                    pending.append(loc)
+            elif loc in seen_urls:
+                stats.duplicates += 1
+            else:
+                seen_urls.add(loc)
+                stats.urls += 1
+                yield loc
+
+
+async def discover_urls(sitemaps: Iterable[str], concurrency: int = 8, stats: Optional[SitemapStats] = None,
+                        session: Optional[aiohttp.ClientSession] = None, timeout: float = 60.0,
+                        user_agent: Optional[str] = None) -> AsyncIterator[str]:
+    """Yield the page URLs in ``sitemaps`` and the sitemaps they index as they are found, without duplicates.
+
+    Up to ``concurrency`` sitemaps are downloaded and parsed at once. At most
+    a few thousand found URLs wait for the consumer; beyond that no new
+    downloads start until it catches up. A download in progress is never
+    paused, as each sitemap is read in full before its URLs are passed on.
+    """
+    stats = stats or SitemapStats()
+    owned = session is None
+    if owned:
+        session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout),
+                                        headers={'User-Agent': user_agent} if user_agent else None)
+    pending: asyncio.Queue = asyncio.Queue()
+    found: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 1000)
+    seen_sitemaps, seen_urls = set(), set()
+    for sitemap in sitemaps:
+        if sitemap not in seen_sitemaps:
+            seen_sitemaps.add(sitemap)
+            pending.put_nowait(sitemap)
+
+    async def read(sitemap: str, entries: List[Tuple[str, str]]) -> None:
+        parser = SitemapParser()
+        async with session.get(sitemap) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(CHUNK_BYTES):
+                entries.extend(parser.feed(chunk))
+        entries.extend(parser.close())
+        stats.sitemaps += 1
+        stats.bytes += parser.bytes
+
+    async def found_entry(kind: str, loc: str) -> None:
+        if kind == SITEMAP:
+            if loc not in seen_sitemaps:
+                seen_sitemaps.add(loc)
+                pending.put_nowait(loc)
+        elif loc in seen_urls:
+            stats.duplicates += 1
+        else:
+            seen_urls.add(loc)
+            stats.urls += 1
+            await found.put(loc)
+
+    async def worker() -> None:
+        while True:
+            sitemap = await pending.get()
+            entries: List[Tuple[str, str]] = []
+            try:
+                try:
+                    await read(sitemap, entries)
+                except (aiohttp.ClientError, asyncio.TimeoutError, ElementTree.ParseError, zlib.error) as e:
+                    stats.failed += 1
+                    print(f"Error reading sitemap {sitemap}: {e}")
+                # The entries read before an error are still used
+                for entry in entries:
+                    await found_entry(*entry)
+            finally:
+                pending.task_done()
+
+    async def finish() -> None:
+        # Every sitemap, including the ones found along the way, has been read
+        await pending.join()
+        await found.put(None)
+
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)] + [asyncio.create_task(finish())]
+    try:
+        while True:
+            url = await found.get()
+            if url is None:
+                return
+            yield url
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if owned:
+            await session.close()
@@ -0,0 +1,162 @@
+"""What-if threshold sweep for the content pruning tool.
+
+Every metric column is ranked once. A threshold then becomes a cut in that
+ranking, and "rows passing this threshold" is a single comparison against the
+rank array, stored as a packed bitmap. Bitmaps are cached per (column, value),
+so moving one slider builds one new bitmap and ANDs it with the cached ones
+instead of rescanning the frame.
+
+Grids of counts over two thresholds are computed from a 2D histogram of the
+rows' rank cuts and a cumulative sum, not one mask per grid cell.
+"""
+import datetime
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from seo_tools.instrument import staged
+from seo_tools.pruning import DATE_COLUMN, HIGHER_IS_WORSE
+
+BACKLINKS_COLUMN = 'Ahrefs Backlinks - Exact'
+MAX_CACHED_BITMAPS = 256
+
+
+def popcount(bitmap: np.ndarray) -> int:
+    return int(np.bitwise_count(bitmap).sum())
+
+
+@dataclass
+class SweepCounts:
+    verwijderen: int
+    backlinks_controleren: int
+    # Rows with a known modification date, the population the counts are taken from
+    total: int
+
+    @property
+    def action(self) -> int:
+        return self.verwijderen + self.backlinks_controleren
+
+
+class _RankedColumn:
+    def __init__(self, values: np.ndarray):
+        self.values = values
+        order = np.argsort(values, kind='stable')  # NaN sorts last
+        self.valid = int(np.count_nonzero(~np.isnan(values)))
+        self.sorted_values = values[order[:self.valid]]
+        self.rank = np.empty(len(values), dtype=np.int64)
+        self.rank[order] = np.arange(len(values))
+
+    def passing(self, value: float, higher_is_worse: bool) -> np.ndarray:
+        """Boolean mask of rows that satisfy the threshold; missing values never do."""
+        if higher_is_worse:
+            cut = np.searchsorted(self.sorted_values, value, side='right')
+            return (self.rank >= cut) & (self.rank < self.valid)
+        return self.rank < np.searchsorted(self.sorted_values, value, side='left')
+
+
+class ThresholdIndex:
+    """Rank arrays and cached rule bitmaps for one prepared pruning frame.
+
+    Counts follow ``process_data`` followed by dropping rows without a known
+    ``Laatste wijziging``, as the pruning page reports them.
+    """
+
+    @staged('rank columns')
+    def __init__(self, data: pd.DataFrame, columns: Optional[Iterable[str]] = None):
+        self.rows = len(data)
+        if columns is None:
+            columns = [col for col in data.columns if col != DATE_COLUMN and pd.api.types.is_numeric_dtype(data[col])]
+        self.columns = {col: _RankedColumn(self._numeric(data[col])) for col in columns if col in data.columns}
+        if BACKLINKS_COLUMN in data.columns and BACKLINKS_COLUMN not in self.columns:
+            self.columns[BACKLINKS_COLUMN] = _RankedColumn(self._numeric(data[BACKLINKS_COLUMN]))
+
+        dates = pd.to_datetime(data[DATE_COLUMN], errors='coerce') if DATE_COLUMN in data.columns else pd.Series(pd.NaT, index=data.index)
+        self._dates = dates.to_numpy(dtype='datetime64[ns]')
+        known = ~np.isnat(self._dates)
+        self.known_rows = int(known.sum())
+        self._known = np.packbits(known)
+        self._bitmaps: 'OrderedDict[tuple, np.ndarray]' = OrderedDict()
+
+    @staticmethod
+    def _numeric(column: pd.Series) -> np.ndarray:
+        return pd.to_numeric(column, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+    def _cached(self, key: tuple, build) -> np.ndarray:
+        bitmap = self._bitmaps.get(key)
+        if bitmap is None:
+            bitmap = np.packbits(build())
+            self._bitmaps[key] = bitmap
+            while len(self._bitmaps) > MAX_CACHED_BITMAPS:
+                self._bitmaps.popitem(last=False)
+        else:
+            self._bitmaps.move_to_end(key)
+        return bitmap
+
+    def rule_bitmap(self, column: str, value: float) -> np.ndarray:
+        ranked = self.columns[column]
+        return self._cached((column, float(value)), lambda: ranked.passing(value, column in HIGHER_IS_WORSE))
+
+    def date_bitmap(self, older_than_date: Optional[datetime.date]) -> np.ndarray:
+        if not older_than_date:
+            return self._known
+        cutoff = np.datetime64(pd.Timestamp(older_than_date), 'ns')
+        return self._cached((DATE_COLUMN, cutoff), lambda: self._dates < cutoff)
+
+    def backlinks_bitmap(self, backlink_threshold: float) -> Optional[np.ndarray]:
+        if BACKLINKS_COLUMN not in self.columns or np.isinf(backlink_threshold):
+            return None
+        # "More backlinks than the threshold" is the higher-is-worse direction
+        ranked = self.columns[BACKLINKS_COLUMN]
+        return self._cached(('backlinks', float(backlink_threshold)), lambda: ranked.passing(backlink_threshold, True))
+
+    def delete_bitmap(self, thresholds: Dict[str, float], older_than_date: Optional[datetime.date] = None,
+                      skip: Sequence[str] = ()) -> np.ndarray:
+        """AND of the known-date, date and threshold bitmaps; thresholds without a column are ignored."""
+        bitmap = self._known & self.date_bitmap(older_than_date)
+        for column, value in thresholds.items():
+            if column in self.columns and column not in skip:
+                bitmap = bitmap & self.rule_bitmap(column, value)
+        return bitmap
+
+    def counts(self, thresholds: Dict[str, float], older_than_date: Optional[datetime.date] = None,
+               backlink_threshold: float = float('inf')) -> SweepCounts:
+        delete = self.delete_bitmap(thresholds, older_than_date)
+        backlinks = self.backlinks_bitmap(backlink_threshold)
+        check = popcount(delete & backlinks) if backlinks is not None else 0
+        return SweepCounts(verwijderen=popcount(delete) - check, backlinks_controleren=check, total=self.known_rows)
+
+    def _start_index(self, column: str, values: np.ndarray) -> np.ndarray:
+        # Per row, the first position in ``values`` (ascending, or descending for
+        # higher-is-worse metrics) from which on the row passes; len(values) = never
+        row_values = self.columns[column].values
+        if column in HIGHER_IS_WORSE:
+            start = len(values) - np.searchsorted(values, row_values, side='left')
+        else:
+            start = np.searchsorted(values, row_values, side='right')
+        start[np.isnan(row_values)] = len(values)
+        return start
+
+    def grid(self, x: str, x_values: Sequence[float], y: str, y_values: Sequence[float],
+             thresholds: Dict[str, float], older_than_date: Optional[datetime.date] = None) -> pd.DataFrame:
+        """Rows meeting the deletion criteria for every combination of ``x`` and ``y`` thresholds.
+
+        The other thresholds are held at their values in ``thresholds``.
+        """
+        if x == y:
+            raise ValueError("The grid needs two different metrics")
+        x_values, y_values = np.sort(np.asarray(x_values, dtype=float)), np.sort(np.asarray(y_values, dtype=float))
+        base = np.unpackbits(self.delete_bitmap(thresholds, older_than_date, skip=(x, y)), count=self.rows).astype(bool)
+        x_start = self._start_index(x, x_values)[base]
+        y_start = self._start_index(y, y_values)[base]
+        # A row counts in every cell at or after its (x, y) start, hence the 2D cumulative sum
+        width = len(y_values) + 1
+        flat = np.bincount(x_start * width + y_start, minlength=(len(x_values) + 1) * width)
+        counts = flat.reshape(len(x_values) + 1, width)[:-1, :-1].cumsum(axis=0).cumsum(axis=1)
+        if x in HIGHER_IS_WORSE:
+            counts = counts[::-1]
+        if y in HIGHER_IS_WORSE:
+            counts = counts[:, ::-1]
+        return pd.DataFrame(counts, index=pd.Index(x_values, name=x), columns=pd.Index(y_values, name=y))
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from seo_tools.merge import merge_frames
+
+
+def test_merge_frames_without_usable_urls():
+    frames = [pd.DataFrame({'url': [None], 'clicks': [1]}), pd.DataFrame({'url': [None], 'links': [2]})]
+    result = merge_frames(frames, ['url', 'url'], ['a', 'b'])
+    assert result.merged.empty
+    assert list(result.merged.columns) == ['url', 'clicks', 'links']
+    assert [len(rows) for rows in result.unmatched.values()] == [1, 1]
+
+
+def test_merge_frames_empty_partition():
+    frames = [pd.DataFrame({'url': pd.Series([], dtype=object), 'clicks': pd.Series([], dtype=float)}),
+              pd.DataFrame({'url': pd.Series([], dtype=object), 'links': pd.Series([], dtype=float)})]
+    result = merge_frames(frames, ['url', 'url'], ['a', 'b'])
+    assert result.merged.empty
+    assert all(rows.empty for rows in result.unmatched.values())
+
+
+def test_merge_frames_matches_only_urls_in_every_source():
+    frames = [pd.DataFrame({'url': ['a.nl/x', 'a.nl/y', None], 'clicks': [1, 2, 3]}),
+              pd.DataFrame({'url': ['a.nl/y', 'a.nl/z'], 'links': [4, 5]})]
+    result = merge_frames(frames, ['url', 'url'], ['a', 'b'])
+    assert result.merged.to_dict('records') == [{'url': 'a.nl/y', 'clicks': 2, 'links': 4}]
+    assert result.unmatched['a']['clicks'].tolist() == [1, 3]
+    assert result.unmatched['b']['links'].tolist() == [5]
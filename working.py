@@ -1,47 +1,54 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from dateutil import parser
-import csv
-import io
+import os
+import tempfile
 import traceback
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from seo_tools.batch import Job, prune_file
+from seo_tools.delta import PruningDelta, baseline_path, load_baseline, prune_delta, save_baseline
+from seo_tools.frame_cache import FrameCache
+from job_panel import job_panel, submit_job
+from performance_panel import page_recorder, performance_panel, remember_run
+from seo_tools.ingest import exceeds_memory_budget, read_csv, read_header, upload_hash
+from seo_tools.instrument import recording, stage
+from seo_tools.pruning import PREPARED_CACHE_VERSION, compact, normalize_columns, prepare_data, process_data, prune_csv
+from seo_tools.results import EXPORT_FORMATS, ExportCache, ResultPager
+from seo_tools.sweep import ThresholdIndex
 
 ## Data Processing Functions
 
-def parse_date(date_string: str) -> pd.Timestamp:
+@st.cache_resource
+def get_frame_cache() -> FrameCache:
+    return FrameCache()
+
+def load_prepared(uploaded_file) -> tuple:
+    # Parsed and type-coerced uploads are cached by content hash, so changing a threshold only re-runs the rules
+    upload_key = f"pruning-v{PREPARED_CACHE_VERSION}-{upload_hash(uploaded_file.getvalue())}"
+    data = get_frame_cache().get_or_build(upload_key, lambda: compact(prepare_data(normalize_columns(read_csv(uploaded_file)))))
+    return upload_key, data
+
+@st.cache_resource
+def get_export_cache() -> ExportCache:
+    return ExportCache()
+
+@st.cache_resource(max_entries=4)
+def get_threshold_index(upload_key: str, _data: pd.DataFrame) -> ThresholdIndex:
+    # Ranked once per upload; every slider move afterwards only ANDs cached bitmaps
+    return ThresholdIndex(_data)
+
+def process_in_chunks(uploaded_file, thresholds: Dict[str, float], older_than_date: pd.Timestamp, actions_only: bool):
+    # For uploads over the memory budget: one chunk in memory at a time, results appended to a temporary file
+    output = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+    output.close()
+    uploaded_file.seek(0)
     try:
-        return pd.to_datetime(date_string).date()
-    except (ValueError, TypeError):
-        return pd.NaT
-
-def process_data(data: pd.DataFrame, thresholds: Dict[str, float], older_than_date: pd.Timestamp) -> pd.DataFrame:
-    # Convert columns to appropriate types
-    if 'Average position' in data.columns:
-        data['Average position'] = pd.to_numeric(data['Average position'], errors='coerce')
-    data['Laatste wijziging'] = pd.to_datetime(data['Laatste wijziging'], errors='coerce').dt.date
-    if 'Unique Inlinks' in data.columns:
-        data['Unique Inlinks'] = pd.to_numeric(data['Unique Inlinks'], errors='coerce').astype('Int64')
-
-    def should_delete(row: pd.Series) -> bool:
-        conditions = []
-        for key, value in thresholds.items():
-            if key in row:
-                if key == 'Average position':
-                    conditions.append(row[key] > value)
-                else:
-                    conditions.append(row[key] < value)
-        if older_than_date and pd.notnull(row['Laatste wijziging']):
-            conditions.append(row['Laatste wijziging'] < older_than_date)
-        return all(conditions)
-
-    data['To Delete'] = data.apply(should_delete, axis=1)
-    data['Backlinks controleren'] = (data['To Delete'] & 
-                                     (data['Ahrefs Backlinks - Exact'] > thresholds.get('Backlinks', float('inf'))) 
-                                     if 'Ahrefs Backlinks - Exact' in data.columns else False)
-    data['Action'] = 'Geen actie'
-    data.loc[data['To Delete'], 'Action'] = 'Verwijderen'
-    data.loc[data['Backlinks controleren'], 'Action'] = 'Backlinks controleren'
-    return data
+        counts = prune_csv(uploaded_file, output.name, thresholds, older_than_date, actions_only)
+    except Exception:
+        os.remove(output.name)
+        raise
+    return output.name, counts
 
 ## UI Setup Functions
 
@@ -53,36 +60,214 @@ def setup_ui():
     st.markdown("Vervolgens kun je hem hierboven uploaden en zal de tool aan de hand van de door jou ingestelde criteria de URLs die wegkunnen markeren")
     st.markdown("[het template hieronder](https://docs.google.com/spreadsheets/d/1GtaLaXO62Rf8Xo2gNiw6wkAXrHoE-bBJr8Uf3_e8lNw/edit?usp=sharing)")
 
-def display_results(data: pd.DataFrame) -> None:
-    if data.empty:
+def display_counts(total: int, to_delete: int, check_backlinks: int, unparsed_dates: int) -> None:
+    st.write(f"Total URLs processed (with known 'Laatste wijziging'): {total}")
+    if unparsed_dates:
+        st.warning(f"{unparsed_dates} values in 'Laatste wijziging' are not a recognised date and were skipped.")
+    st.write(f"URLs that meet deletion criteria: {to_delete}")
+    st.write(f"URLs that need backlink checking: {check_backlinks}")
+    st.write(f"Total URLs requiring action: {to_delete + check_backlinks}")
+
+def read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+def display_file_results(path: str) -> None:
+    preview = pd.read_csv(path, nrows=1000)
+    if preview.empty:
         st.write("No URLs require action.")
     else:
-        st.dataframe(data)
-        csv_string = data.to_csv(index=False)
+        st.write("First 1000 rows:")
+        st.dataframe(preview)
+        # The file is only read when the button is clicked
         st.download_button(
             label="Download CSV",
-            data=csv_string,
+            data=lambda: read_file(path),
             file_name="processed_data.csv",
-            mime="text/csv"
+            mime="text/csv",
+            on_click="ignore"
         )
 
-def detect_delimiter(file_content: str) -> str:
-    sniffer = csv.Sniffer()
-    try:
-        dialect = sniffer.sniff(file_content[:1024])
-        return dialect.delimiter
-    except csv.Error:
-        # If sniffer fails, try common delimiters
-        for delimiter in [',', ';', '\t', '|']:
-            try:
-                pd.read_csv(io.StringIO(file_content[:1024]), sep=delimiter, nrows=5)
-                return delimiter
-            except:
-                continue
-    return ','  # Default to comma if no delimiter is detected
+PAGE_SIZES = [50, 100, 500, 1000]
+
+def read_export(pager: ResultPager, export_format: str) -> bytes:
+    # Written once per result and format, then read from disk
+    return read_file(get_export_cache().export(pager.frame, export_format, key=pager.key))
+
+def display_results(pager: ResultPager) -> None:
+    data = pager.frame
+    if data.empty:
+        st.write("No URLs require action.")
+        return
+    # Only the current page is sent to the browser; filtering and sorting happen here
+    left, middle, right = st.columns(3)
+    actions = sorted(data['Action'].unique())
+    shown = left.multiselect("Action", actions, default=actions, key="results-actions")
+    sort_by = middle.selectbox("Sort by", [None, *data.columns], format_func=lambda col: "(file order)" if col is None else col, key="results-sort")
+    ascending = right.radio("Order", ["Ascending", "Descending"], horizontal=True, key="results-order") == "Ascending"
+    view = {'filter_column': 'Action', 'values': shown, 'sort_by': sort_by, 'ascending': ascending}
+    size = left.selectbox("Rows per page", PAGE_SIZES, index=1, key="results-page-size")
+    pages = pager.page_count(size, **view)
+    number = middle.number_input("Page", min_value=1, max_value=pages, value=1, key="results-page")
+    st.caption(f"{len(pager.rows(**view))} rows, page {number} of {pages}")
+    st.dataframe(pager.page(number, size, **view))
+
+    export_format = right.selectbox("Download format", list(EXPORT_FORMATS), key="results-format")
+    suffix, mime = EXPORT_FORMATS[export_format]
+    st.download_button(
+        label="Download",
+        data=lambda: read_export(pager, export_format),
+        file_name=f"processed_data{suffix}",
+        mime=mime,
+        on_click="ignore"
+    )
+
+def display_delta(delta: PruningDelta) -> None:
+    st.subheader("Changes since the previous run")
+    st.caption(delta.summary())
+    if delta.report.empty:
+        st.write("No URLs changed Action.")
+        return
+    st.dataframe(delta.report, hide_index=True)
+    st.download_button(
+        label="Download changes",
+        data=lambda: delta.report.to_csv(index=False).encode('utf-8'),
+        file_name="pruning_changes.csv",
+        mime="text/csv",
+        on_click="ignore"
+    )
+
+def display_view(view: dict) -> None:
+    if view.get('notice'):
+        st.caption(view['notice'])
+    display_counts(*view['counts'])
+    if view.get('delta'):
+        display_delta(view['delta'])
+    if view.get('path'):
+        display_file_results(view['path'])
+    else:
+        display_results(view['pager'])
+
+def column_top(index: ThresholdIndex, column: str) -> float:
+    ranked = index.columns[column]
+    return float(np.ceil(ranked.sorted_values[-1])) if ranked.valid else 0.0
+
+def threshold_slider(column: str, default: float, index: ThresholdIndex):
+    # Integer thresholds get an integer slider; one above the maximum still marks every URL
+    if isinstance(default, int):
+        top = max(int(column_top(index, column)) + 1, default)
+    else:
+        top = max(column_top(index, column), default)
+    return st.slider(column, min_value=type(default)(0), max_value=top, value=default, key=f"sweep-{column}")
+
+def grid_values(lower: float, upper: float, steps: int, integer: bool) -> np.ndarray:
+    values = np.linspace(lower, upper, steps)
+    return np.unique(np.round(values)) if integer else np.unique(values.round(2))
+
+def display_sweep(index: ThresholdIndex, thresholds: Dict[str, float], threshold_checks: Dict[str, bool], older_than) -> None:
+    st.subheader("What-if sweep")
+    st.write("Move the sliders to see how many URLs would be marked, without processing the whole file again.")
+    columns = [col for col in thresholds if threshold_checks[col] and col in index.columns]
+    swept = {col: threshold_slider(col, thresholds[col], index) for col in columns}
+    counts = index.counts(swept, older_than, swept.get('Backlinks', float('inf')))
+    left, middle, right = st.columns(3)
+    left.metric("Verwijderen", counts.verwijderen)
+    middle.metric("Backlinks controleren", counts.backlinks_controleren)
+    right.metric("Total URLs requiring action", f"{counts.action} / {counts.total}")
+
+    if len(columns) < 2:
+        return
+    st.markdown("**Grid of URLs requiring action**")
+    x = st.selectbox("Rows", columns, index=0, key="sweep-grid-x")
+    y = st.selectbox("Columns", [col for col in columns if col != x], index=0, key="sweep-grid-y")
+    steps = st.number_input("Grid steps", value=6, min_value=2, max_value=50)
+    axes = []
+    for column in (x, y):
+        integer = isinstance(thresholds[column], int)
+        bounds = (0, int(column_top(index, column)) + 1) if integer else (0.0, max(column_top(index, column), 1.0))
+        lower, upper = st.slider(f"{column} range", min_value=bounds[0], max_value=bounds[1], value=bounds, key=f"sweep-range-{column}")
+        axes.append(grid_values(lower, upper, steps, integer))
+    st.dataframe(index.grid(x, axes[0], y, axes[1], swept, older_than))
 
 ## Main Application Logic
 
+def has_required_columns(columns, thresholds: Dict[str, float], threshold_checks: Dict[str, bool]) -> bool:
+    required_columns = ['Laatste wijziging'] + [col for col in thresholds if threshold_checks[col]]
+    missing_columns = [col for col in required_columns if col not in columns]
+    if missing_columns:
+        st.error(f"Missing columns in CSV: {', '.join(missing_columns)}")
+        st.write("Please ensure your CSV file contains all required columns for the enabled thresholds.")
+        st.write("Available columns:", ', '.join(columns))
+    return not missing_columns
+
+def submit_pruning_job(uploaded_file, thresholds: Dict[str, float], threshold_checks: Dict[str, bool], older_than,
+                       output_mode: str) -> None:
+    # Checked here so a file the page would refuse is not queued
+    columns = normalize_columns(pd.DataFrame(columns=read_header(uploaded_file))).columns
+    if not has_required_columns(columns, thresholds, threshold_checks):
+        return
+    applied_thresholds = {k: v for k, v in thresholds.items() if threshold_checks[k]}
+
+    def make_job(paths, output_dir):
+        output = os.path.join(output_dir, "processed_data.csv")
+        return Job(uploaded_file.name, output, prune_file, args=(paths[0], output),
+                   kwargs={'thresholds': applied_thresholds, 'older_than_date': older_than,
+                           'actions_only': output_mode == "Show only URLs with actions"})
+    submit_job('pruning', [uploaded_file], make_job)
+
+def run_pruning(uploaded_file, thresholds: Dict[str, float], threshold_checks: Dict[str, bool], older_than,
+                output_mode: str, memory_budget: int, delta_site: Optional[str] = None) -> None:
+    # Uploads that would not fit the memory budget are processed in chunks instead of loaded whole
+    chunked = exceeds_memory_budget(uploaded_file.size, memory_budget)
+    if chunked:
+        columns = normalize_columns(pd.DataFrame(columns=read_header(uploaded_file))).columns
+    else:
+        _, data = load_prepared(uploaded_file)
+        columns = data.columns
+
+    if not has_required_columns(columns, thresholds, threshold_checks):
+        return
+    if chunked:
+        st.info("The upload exceeds the memory budget; processing it in chunks.")
+        if delta_site:
+            st.warning("Delta mode needs the whole upload in memory; this run is not compared with the previous one.")
+        applied_thresholds = {k: v for k, v in thresholds.items() if threshold_checks[k]}
+        result_path, counts = process_in_chunks(uploaded_file, applied_thresholds, older_than,
+                                                output_mode == "Show only URLs with actions")
+        st.session_state['pruning_view'] = {
+            'counts': (counts['total'], counts['Verwijderen'], counts['Backlinks controleren'], counts['unparsed_dates']),
+            'path': result_path,
+        }
+    else:
+        applied_thresholds = {k: v for k, v in thresholds.items() if threshold_checks[k]}
+        delta = None
+        if delta_site:
+            # Only rows that changed since this site's previous run go through the rules again
+            path = baseline_path(os.path.join(get_frame_cache().directory, 'baselines'), delta_site)
+            delta = prune_delta(data, applied_thresholds, older_than, load_baseline(path))
+            save_baseline(delta.baseline, path)
+            processed_data = delta.result
+        else:
+            processed_data = process_data(data, applied_thresholds, older_than)
+
+        with stage('filter results', rows=len(processed_data)):
+            # Filter out URLs without a known 'Laatste wijziging'
+            processed_data = processed_data.dropna(subset=['Laatste wijziging'])
+
+            # Count URLs that meet the criteria
+            urls_to_delete = processed_data[processed_data['Action'] == 'Verwijderen']
+            urls_to_check_backlinks = processed_data[processed_data['Action'] == 'Backlinks controleren']
+
+            action_data = processed_data[processed_data['Action'] != 'Geen actie'] if output_mode == "Show only URLs with actions" else processed_data
+        # Kept in the session so paging, sorting and downloading rerun the page without reprocessing
+        st.session_state['pruning_view'] = {
+            'counts': (len(processed_data), len(urls_to_delete), len(urls_to_check_backlinks), data.attrs.get('unparsed_dates', 0)),
+            'pager': ResultPager(action_data.reset_index(drop=True)),
+            'delta': delta,
+            'notice': f"Memory: {data.attrs.get('memory_before', 0) / 1e6:.1f} MB parsed, "
+                      f"{data.attrs.get('memory_after', 0) / 1e6:.1f} MB after compacting column types",
+        }
+
 def main() -> None:
     setup_ui()
     uploaded_file = st.file_uploader("Select CSV file", type="csv")
@@ -102,66 +287,49 @@ def main() -> None:
     older_than = st.date_input("Older than", value=pd.to_datetime("2023-01-01"))
     threshold_checks = {key: st.checkbox(f"Apply {key} threshold", value=True) for key in thresholds}
     output_mode = st.radio("Output mode", ["Show all URLs", "Show only URLs with actions"])
+    sweep_mode = st.checkbox("What-if sweep (live counts while tuning thresholds)")
+    delta_mode = st.checkbox("Delta mode (compare with the previous run of this site and only reprocess changed URLs)")
+    delta_site = st.text_input("Site", help="Each site keeps its own previous run, e.g. iphoned.nl") if delta_mode else None
+    memory_budget = st.number_input("Memory budget (MB)", value=1024, min_value=64) * 1024 * 1024
+    background = st.checkbox("Run in the background (for large files; the result is a CSV download)")
     start_button = st.button("Start Processing")
+
+    if sweep_mode and uploaded_file is not None:
+        try:
+            upload_key, data = load_prepared(uploaded_file)
+            display_sweep(get_threshold_index(upload_key, data), thresholds, threshold_checks, older_than)
+        except Exception as e:
+            st.error(f"Failed to build the threshold sweep: {str(e)}")
+            st.write("Error details:", traceback.format_exc())
     
-    if start_button and uploaded_file is not None:
+    if start_button or uploaded_file is None:
+        # A new run (or a removed upload) replaces the previous results
+        previous = st.session_state.pop('pruning_view', None)
+        if previous and previous.get('path') and os.path.exists(previous['path']):
+            os.remove(previous['path'])
+
+    if start_button and delta_mode and not delta_site.strip():
+        st.error("Enter the site to compare with in delta mode.")
+    elif start_button and uploaded_file is not None and background:
+        if delta_mode:
+            st.warning("Delta mode needs the whole upload in memory; the background job is not compared with the previous run.")
+        submit_pruning_job(uploaded_file, thresholds, threshold_checks, older_than, output_mode)
+    elif start_button and uploaded_file is not None:
+        recorder = page_recorder('pruning')
         try:
-            csv_content = uploaded_file.getvalue().decode('utf-8')
-            delimiter = detect_delimiter(csv_content)
-            data = pd.read_csv(io.StringIO(csv_content), sep=delimiter, engine='python', encoding='utf-8')
-            
-            # Convert column names to lowercase for case-insensitive matching
-            data.columns = data.columns.str.lower().str.strip()
-            
-            column_mapping = {
-                'sessions': 'Sessions',
-                'views': 'Views',
-                'clicks': 'Clicks',
-                'impressions': 'Impressions',
-                'average position': 'Average position',
-                'ahrefs backlinks - exact': 'Ahrefs Backlinks - Exact',
-                'word count': 'Word Count',
-                'laatste wijziging': 'Laatste wijziging',
-                'unique inlinks': 'Unique Inlinks',
-                'ahrefs keywords top 3 - exact': 'Ahrefs Keywords Top 3 - Exact',
-                'ahrefs keywords top 10 - exact': 'Ahrefs Keywords Top 10 - Exact',
-            }
-            
-            # Rename columns if they exist
-            data = data.rename(columns={k: v for k, v in column_mapping.items() if k in data.columns})
-            
-            required_columns = ['Laatste wijziging'] + [col for col in thresholds if threshold_checks[col]]
-            missing_columns = [col for col in required_columns if col not in data.columns]
-            
-            if missing_columns:
-                st.error(f"Missing columns in CSV: {', '.join(missing_columns)}")
-                st.write("Please ensure your CSV file contains all required columns for the enabled thresholds.")
-                st.write("Available columns:", ', '.join(data.columns))
-            else:
-                applied_thresholds = {k: v for k, v in thresholds.items() if threshold_checks[k]}
-                processed_data = process_data(data, applied_thresholds, older_than)
-                
-                # Filter out URLs without a known 'Laatste wijziging'
-                processed_data = processed_data.dropna(subset=['Laatste wijziging'])
-                
-                # Count URLs that meet the criteria
-                urls_to_action = processed_data[processed_data['Action'] != 'Geen actie']
-                urls_to_delete = processed_data[processed_data['Action'] == 'Verwijderen']
-                urls_to_check_backlinks = processed_data[processed_data['Action'] == 'Backlinks controleren']
-                
-                # Display counts
-                st.write(f"Total URLs processed (with known 'Laatste wijziging'): {len(processed_data)}")
-                st.write(f"URLs that meet deletion criteria: {len(urls_to_delete)}")
-                st.write(f"URLs that need backlink checking: {len(urls_to_check_backlinks)}")
-                st.write(f"Total URLs requiring action: {len(urls_to_action)}")
-
-                action_data = processed_data[processed_data['Action'] != 'Geen actie'] if output_mode == "Show only URLs with actions" else processed_data
-                display_results(action_data)
+            with recording(recorder):
+                run_pruning(uploaded_file, thresholds, threshold_checks, older_than, output_mode, memory_budget, delta_site)
         except Exception as e:
             st.error(f"Failed to process CSV file: {str(e)}")
             st.write("Error details:", traceback.format_exc())
+        remember_run(recorder)
     elif start_button and uploaded_file is None:
         st.error("Please upload a CSV file before starting the process.")
 
+    if 'pruning_view' in st.session_state:
+        display_view(st.session_state['pruning_view'])
+    job_panel('pruning')
+    performance_panel('pruning')
+
 if __name__ == "__main__":
     main()
\ No newline at end of file